@@ -3,6 +3,14 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Driver async tương ứng với từng driver sync
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
 class Settings:
     # Database
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
@@ -10,15 +18,107 @@ class Settings:
     DB_USER: str = os.getenv("DB_USER", "root")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
     DB_NAME: str = os.getenv("DB_NAME", "library_ptit")
+    # Cho phép ghi đè toàn bộ URL (vd: sqlite:///./test.db khi chạy test/benchmark)
+    DB_URL_OVERRIDE: str = os.getenv("DATABASE_URL", "")
+
+    # Connection pool (mỗi worker và mỗi engine có pool riêng): tối đa
+    # số worker x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connection tới MySQL, phải nhỏ hơn max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # giây chờ connection trước khi báo lỗi
+    # Đóng và mở lại connection đã sống quá N giây (nhỏ hơn wait_timeout của MySQL), -1 = tắt
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Kiểm tra connection trước mỗi lần checkout (pessimistic); tắt để chỉ dựa vào DB_POOL_RECYCLE
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # LIFO: dùng lại connection vừa trả để connection thừa được đóng dần khi tải giảm
+    DB_POOL_LIFO: bool = os.getenv("DB_POOL_LIFO", "false").lower() in ("1", "true", "yes")
+    # Số connection mở sẵn khi khởi động (tối đa DB_POOL_SIZE), 0 = tắt
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "0"))
+
+    # Chạy migration khi khởi động (chỉ nên bật khi chạy một process, vd môi trường dev);
+    # mặc định chạy riêng bằng python scripts/migrate.py trước khi khởi động các worker
+    MIGRATE_ON_STARTUP: bool = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+    # Read replica (tùy chọn): các URL cách nhau bởi dấu phẩy, cùng dạng với DATABASE_URL.
+    # Các API chỉ đọc (catalogue, danh sách admin, export) đọc từ replica; mọi ghi vẫn vào primary.
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # Sau khi một client ghi, các lần đọc của client đó đi primary trong N giây (read-your-writes)
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # Replica trễ quá N giây (Seconds_Behind_Source) hoặc lỗi kết nối thì tạm bỏ qua, đọc từ primary
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_CHECK_INTERVAL: float = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))  # giây
 
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # Password hashing (bcrypt)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+    # Cache
+    CACHE_BROADCAST_URL: str = os.getenv("CACHE_BROADCAST_URL", "")  # vd: redis://localhost:6379/0
+    # Giây, 0 = tắt. Mặc định chỉ bật khi có CACHE_BROADCAST_URL: không có broadcast thì user bị khóa / xóa
+    # vẫn được worker khác xác thực từ cache tới khi hết TTL
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", "60" if CACHE_BROADCAST_URL else "0"))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    CATEGORY_CACHE_TTL: int = int(os.getenv("CATEGORY_CACHE_TTL", "300"))  # giây, 0 = tắt
+    # Cache response GET /api/books dùng chung (theo query string), 0 = tắt
+    BOOK_LIST_CACHE_TTL: int = int(os.getenv("BOOK_LIST_CACHE_TTL", "60"))
+    BOOK_LIST_CACHE_SIZE: int = int(os.getenv("BOOK_LIST_CACHE_SIZE", "1000"))
+
+    # Import sách: số bản ghi mỗi lô (mỗi lô một giao dịch)
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+    # Danh sách sách/phiếu mượn đầy đủ: dựng từ Core select và serialize thẳng (orjson nếu có),
+    # bỏ qua ORM và validate response_model. Response giữ nguyên định dạng.
+    FAST_LIST_RESPONSES: bool = os.getenv("FAST_LIST_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+    # Export: số dòng mỗi lô đọc từ server-side cursor và ghi ra response
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Debug: trả số câu SQL / thời gian DB của request trong header X-DB-* và Server-Timing
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    # Ghi log (logger app.sql.slow) các câu SQL chạy lâu hơn ngưỡng này, kèm route và tham số (ms, 0 = tắt)
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+    # Dashboard: chu kỳ đối chiếu lại bộ đếm (giây, 0 = tắt; khởi động chỉ đếm khi bộ đếm chưa có)
+    STATS_CHECK_INTERVAL: int = int(os.getenv("STATS_CHECK_INTERVAL", "3600"))
+    # Job gắn cờ phiếu mượn quá hạn: chu kỳ (giây, 0 = tắt) và số phiếu mỗi lô (mỗi lô một giao dịch)
+    OVERDUE_SWEEP_INTERVAL: int = int(os.getenv("OVERDUE_SWEEP_INTERVAL", "300"))
+    OVERDUE_SWEEP_BATCH_SIZE: int = int(os.getenv("OVERDUE_SWEEP_BATCH_SIZE", "500"))
+    # Lưu trữ phiếu đã trả / từ chối cũ hơn ARCHIVE_AFTER_DAYS ngày sang bảng *_archive (0 = không lưu trữ),
+    # theo lô ARCHIVE_BATCH_SIZE phiếu mỗi giao dịch. Chu kỳ chạy nền (giây, 0 = tắt: chạy scripts/archive_borrows.py)
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    ARCHIVE_INTERVAL: int = int(os.getenv("ARCHIVE_INTERVAL", "0"))
+    # Server-Sent Events (/api/events): số kết nối tối đa mỗi worker, chu kỳ heartbeat (giây, 0 = tắt),
+    # số sự kiện gần nhất giữ để client kết nối lại nhận tiếp (Last-Event-ID), thời gian chờ kết nối lại (ms)
+    SSE_MAX_CONNECTIONS: int = int(os.getenv("SSE_MAX_CONNECTIONS", "10000"))
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", "25"))
+    SSE_HISTORY: int = int(os.getenv("SSE_HISTORY", "1000"))
+    SSE_RETRY_MS: int = int(os.getenv("SSE_RETRY_MS", "3000"))
+
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_URL_OVERRIDE:
+            return self.DB_URL_OVERRIDE
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
-settings = Settings()
+    @property
+    def REPLICA_URLS(self) -> list:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """URL cho async engine (aiomysql cho MySQL, aiosqlite cho SQLite)"""
+        return to_async_url(self.DATABASE_URL)
+
+def to_async_url(url: str) -> str:
+    """Đổi driver sync trong URL sang driver async tương ứng"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+settings = Settings()
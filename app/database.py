@@ -1,22 +1,74 @@
+import asyncio
+import hashlib
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
 from .config import settings
 
+def pool_options(url: str) -> dict:
+    """Tham số pool từ Settings; SQLite in-memory dùng pool riêng của SQLAlchemy nên chỉ nhận pre-ping/recycle"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if url.startswith("sqlite") and (":memory:" in url or url.split("://", 1)[-1] in ("", "/")):
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_use_lifo=settings.DB_POOL_LIFO,
+    )
+    return options
+
+# Engine sync - dùng cho scripts (init_data, ...)
 engine = create_engine(
     settings.DATABASE_URL,
     echo=False,
-    pool_pre_ping=True
+    **pool_options(settings.DATABASE_URL)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine async - dùng cho các route handler để không chặn event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    echo=False,
+    **pool_options(settings.ASYNC_DATABASE_URL)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def client_key(request: Request) -> str:
+    """Định danh client cho read-your-writes: token Bearer hoặc địa chỉ IP (băm, không giữ token gốc)"""
+    source = request.headers.get("authorization") or (request.client.host if request.client else "")
+    return hashlib.sha1(source.encode()).hexdigest()
+
+async def get_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        # Để đánh dấu client vừa ghi khi session commit (xem app/utils/replicas.py)
+        db.info["client"] = client_key(request)
         yield db
-    finally:
-        db.close()
 
+async def warm_up_pool(connections: int) -> int:
+    """
+    Mở sẵn tối đa DB_POOL_SIZE connection song song rồi trả lại pool,
+    để các request đầu tiên sau khi khởi động không phải chờ bắt tay với MySQL. Trả về số connection đã mở.
+    """
+    connections = min(connections, settings.DB_POOL_SIZE)
+    if connections <= 0:
+        return 0
+    opened = [async_engine.connect() for _ in range(connections)]
+    try:
+        await asyncio.gather(*(connection.start() for connection in opened))
+    finally:
+        await asyncio.gather(*(connection.close() for connection in opened))
+    return connections
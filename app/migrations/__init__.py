@@ -0,0 +1,100 @@
+"""
+Migration có đánh số phiên bản cho schema database.
+
+Mỗi migration là một module vNNNN_<mô tả>.py trong package này, có docstring (mô tả) và hàm
+upgrade(conn) nhận Connection sync. Phiên bản đã chạy được ghi vào bảng schema_migrations;
+chạy bằng: python scripts/migrate.py. Các migration phải chạy lại được an toàn trên database
+được tạo từ sql/init.sql hoặc create_all trước đây (dùng create_index_if_missing, checkfirst).
+"""
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# MetaData riêng: bảng này chỉ do migration quản lý, không nằm trong Base.metadata
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime, server_default=func.now()),
+)
+
+def load_migrations() -> List[Tuple[int, str, object]]:
+    """Danh sách (phiên bản, mô tả, module) theo thứ tự phiên bản"""
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("v") or not info.name[1:5].isdigit():
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        description = (module.__doc__ or info.name).strip().splitlines()[0]
+        migrations.append((int(info.name[1:5]), description, module))
+    migrations.sort(key=lambda item: item[0])
+    return migrations
+
+def applied_versions(conn: Connection) -> List[int]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return []
+    return list(conn.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+def current_version(conn: Connection) -> Optional[int]:
+    """Phiên bản schema hiện tại (một truy vấn, dùng lúc khởi động); None nếu chưa chạy migration nào"""
+    try:
+        return conn.scalar(select(func.max(schema_migrations.c.version)))
+    except DBAPIError:
+        # Chưa có bảng schema_migrations
+        conn.rollback()
+        return None
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Chạy các migration chưa áp dụng (tới target nếu có), mỗi migration một giao dịch; trả về các phiên bản đã chạy"""
+    with engine.begin() as conn:
+        migration_metadata.create_all(conn)
+        done = set(applied_versions(conn))
+    ran = []
+    for version, description, module in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        logger.info("Migration %04d: %s", version, description)
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(insert(schema_migrations), {
+                "version": version, "description": description[:255], "applied_at": datetime.utcnow()
+            })
+        ran.append(version)
+    return ran
+
+def create_index_if_missing(conn: Connection, name: str, table: str, columns: Sequence[str], unique: bool = False) -> bool:
+    """
+    Tạo index nếu bảng chưa có index nào bắt đầu đúng bằng các cột này (bất kể tên,
+    vd idx_user_id của sql/init.sql hay ix_borrow_requests_user_id của create_all). Trả về True nếu đã tạo.
+    """
+    inspector = inspect(conn)
+    existing = [index["column_names"] for index in inspector.get_indexes(table)]
+    existing += [constraint["column_names"] for constraint in inspector.get_unique_constraints(table)]
+    if any(list(names[:len(columns)]) == list(columns) for names in existing):
+        return False
+    target = Table(table, MetaData(), *(Column(column) for column in columns))
+    Index(name, *(target.c[column] for column in columns), unique=unique).create(conn)
+    return True
+
+def add_column_if_missing(conn: Connection, table: str, column: Column) -> bool:
+    """Thêm cột nếu bảng chưa có (cột NOT NULL cần server_default cho các dòng cũ). Trả về True nếu đã thêm."""
+    if column.name in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+        return False
+    Table(table, MetaData(), column)
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {conn.dialect.identifier_preparer.quote(table)} ADD COLUMN {ddl}"))
+    return True
+
+# Nạp sau cùng vì các module migration dùng các hàm tiện ích ở trên
+MIGRATIONS = load_migrations()
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
@@ -0,0 +1,82 @@
+"""Schema ban đầu: các bảng của app (bỏ qua bảng đã có, vd database tạo từ sql/init.sql)"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, Text, func
+)
+from sqlalchemy.engine import Connection
+
+# Schema cố định tại thời điểm có migration, không import model: đổi model sau này không làm đổi
+# phiên bản 0001 (các thay đổi sau đó nằm ở các migration tiếp theo)
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False, index=True),
+    Column("email", String(100), unique=True, nullable=False, index=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("full_name", String(100)),
+    Column("phone", String(20)),
+    Column("role", Enum("admin", "user", name="userrole"), index=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime, server_default=func.now()),
+    Column("updated_at", DateTime, server_default=func.now()),
+)
+
+# search_text có sẵn cột, index full-text do v0006 tạo
+Table(
+    "books", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False, index=True),
+    Column("author", String(100)),
+    Column("isbn", String(20), unique=True, index=True),
+    Column("category", String(50), index=True),
+    Column("description", Text),
+    Column("quantity", Integer),
+    Column("available_quantity", Integer),
+    Column("cover_image", String(255)),
+    Column("search_text", Text),
+    Column("created_at", DateTime, server_default=func.now()),
+    Column("updated_at", DateTime, server_default=func.now()),
+)
+
+Table(
+    "wishlist", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("book_id", Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False),
+    Column("quantity", Integer),
+    Column("added_at", DateTime, server_default=func.now()),
+)
+
+Table(
+    "borrow_requests", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column(
+        "status", Enum("pending", "approved", "rejected", "returned", "need_edit", name="borrowstatus"), index=True
+    ),
+    Column("note", Text),
+    Column("admin_note", Text),
+    Column("created_at", DateTime, server_default=func.now(), index=True),
+    Column("approved_at", DateTime, nullable=True),
+    Column("due_date", Date, nullable=True),
+    Column("returned_at", DateTime, nullable=True),
+)
+
+Table(
+    "borrow_items", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("request_id", Integer, ForeignKey("borrow_requests.id", ondelete="CASCADE"), nullable=False),
+    Column("book_id", Integer, ForeignKey("books.id"), nullable=False),
+    Column("quantity", Integer),
+)
+
+Table(
+    "library_stats", metadata,
+    Column("name", String(50), primary_key=True),
+    Column("value", Integer, nullable=False),
+    Column("checked_at", DateTime, nullable=True),
+)
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,9 @@
+"""Index có trong sql/init.sql nhưng trước đây model không khai báo (users.role, borrow_requests.user_id/status/created_at)"""
+from sqlalchemy.engine import Connection
+from . import create_index_if_missing
+
+def upgrade(conn: Connection):
+    create_index_if_missing(conn, "ix_users_role", "users", ["role"])
+    create_index_if_missing(conn, "ix_borrow_requests_user_id", "borrow_requests", ["user_id"])
+    create_index_if_missing(conn, "ix_borrow_requests_status", "borrow_requests", ["status"])
+    create_index_if_missing(conn, "ix_borrow_requests_created_at", "borrow_requests", ["created_at"])
@@ -0,0 +1,12 @@
+"""Index nhiều cột theo truy vấn thực tế: borrow_requests (user_id, status, created_at), borrow_items, wishlist, users (role, created_at)"""
+from sqlalchemy.engine import Connection
+from . import create_index_if_missing
+
+def upgrade(conn: Connection):
+    create_index_if_missing(conn, "ix_borrow_requests_user_status_created", "borrow_requests", ["user_id", "status", "created_at"])
+    create_index_if_missing(conn, "ix_borrow_requests_user_created", "borrow_requests", ["user_id", "created_at"])
+    create_index_if_missing(conn, "ix_borrow_requests_status_created", "borrow_requests", ["status", "created_at"])
+    create_index_if_missing(conn, "ix_borrow_items_request_id", "borrow_items", ["request_id"])
+    create_index_if_missing(conn, "ix_borrow_items_book_id", "borrow_items", ["book_id"])
+    create_index_if_missing(conn, "ix_wishlist_user_book", "wishlist", ["user_id", "book_id"])
+    create_index_if_missing(conn, "ix_users_role_created", "users", ["role", "created_at"])
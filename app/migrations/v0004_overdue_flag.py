@@ -0,0 +1,9 @@
+"""Cờ quá hạn borrow_requests.is_overdue và index (status, is_overdue, due_date) cho job quét quá hạn"""
+from sqlalchemy import Boolean, Column, false
+from sqlalchemy.engine import Connection
+from . import add_column_if_missing, create_index_if_missing
+
+def upgrade(conn: Connection):
+    # Phiếu đã quá hạn từ trước được job quét gắn cờ theo lô ở lần chạy đầu, không UPDATE cả bảng ở đây
+    add_column_if_missing(conn, "borrow_requests", Column("is_overdue", Boolean, nullable=False, server_default=false()))
+    create_index_if_missing(conn, "ix_borrow_requests_overdue", "borrow_requests", ["status", "is_overdue", "due_date"])
@@ -0,0 +1,37 @@
+"""Bảng lưu trữ borrow_requests_archive / borrow_items_archive cho phiếu đã đóng lâu ngày"""
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, ForeignKey, Index, Integer, MetaData, Table, Text, false
+from sqlalchemy.engine import Connection
+
+# Bảng cố định theo phiên bản này (không dùng model); users / books chỉ khai báo khóa để tạo foreign key
+metadata = MetaData()
+Table("users", metadata, Column("id", Integer, primary_key=True))
+Table("books", metadata, Column("id", Integer, primary_key=True))
+
+requests_archive = Table(
+    "borrow_requests_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column(
+        "status", Enum("pending", "approved", "rejected", "returned", "need_edit", name="borrowstatus"), nullable=False
+    ),
+    Column("note", Text),
+    Column("admin_note", Text),
+    Column("created_at", DateTime, index=True),
+    Column("approved_at", DateTime, nullable=True),
+    Column("due_date", Date, nullable=True),
+    Column("returned_at", DateTime, nullable=True),
+    Column("is_overdue", Boolean, nullable=False, server_default=false()),
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_borrow_requests_archive_user_created", "user_id", "created_at"),
+)
+
+items_archive = Table(
+    "borrow_items_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("request_id", Integer, ForeignKey("borrow_requests_archive.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("book_id", Integer, ForeignKey("books.id"), nullable=False),
+    Column("quantity", Integer),
+)
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, tables=[requests_archive, items_archive], checkfirst=True)
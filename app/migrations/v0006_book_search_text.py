@@ -0,0 +1,49 @@
+"""Cột books.search_text, index full-text (FULLTEXT trên MySQL, FTS5 + trigger trên SQLite) và dữ liệu tìm kiếm cho sách cũ"""
+from sqlalchemy import Column, Text, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from . import add_column_if_missing
+
+BACKFILL_BATCH_SIZE = 5000
+
+def backfill_search_text(conn: Connection, batch_size: int = BACKFILL_BATCH_SIZE, only_missing: bool = True) -> int:
+    """Tính search_text theo lô (phân trang theo id); only_missing=False tính lại toàn bộ. Trả về số sách đã cập nhật."""
+    from ..models.book import Book
+    from ..utils.search import build_book_search_text
+
+    books = Book.__table__
+    stmt = update(books).where(books.c.id == bindparam("b_id")).values(search_text=bindparam("b_text"))
+    last_id = 0
+    total = 0
+    while True:
+        query = select(books.c.id, books.c.title, books.c.author, books.c.isbn).where(books.c.id > last_id)
+        if only_missing:
+            query = query.where(books.c.search_text.is_(None))
+        rows = conn.execute(query.order_by(books.c.id).limit(batch_size)).all()
+        if not rows:
+            break
+        conn.execute(stmt, [
+            {"b_id": row.id, "b_text": build_book_search_text(row.title, row.author, row.isbn)}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+        total += len(rows)
+    return total
+
+def ensure_search_index(conn: Connection):
+    """Tạo index full-text nếu chưa có; SQLite nạp lại toàn bộ bảng FTS5 từ books.search_text"""
+    from ..models.book import SQLITE_FTS_DDL
+
+    if conn.dialect.name == "mysql":
+        if "ft_books_search" not in {index["name"] for index in inspect(conn).get_indexes("books")}:
+            conn.execute(text("ALTER TABLE books ADD FULLTEXT INDEX ft_books_search (search_text)"))
+    elif conn.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO books_fts(books_fts) VALUES ('rebuild')"))
+
+def upgrade(conn: Connection):
+    # Database tạo trước khi có tìm kiếm full-text: v0001 (create_all) không thêm cột vào bảng books đã có
+    add_column_if_missing(conn, "books", Column("search_text", Text))
+    # Tính dữ liệu trước rồi mới tạo index / trigger: không phải cập nhật index theo từng dòng
+    backfill_search_text(conn)
+    ensure_search_index(conn)
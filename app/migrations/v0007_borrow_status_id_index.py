@@ -0,0 +1,6 @@
+"""Index borrow_requests (status, id) cho export lịch sử lọc theo trạng thái (đọc theo id, không cần sort)"""
+from sqlalchemy.engine import Connection
+from . import create_index_if_missing
+
+def upgrade(conn: Connection):
+    create_index_if_missing(conn, "ix_borrow_requests_status_id", "borrow_requests", ["status", "id"])
@@ -1,5 +1,6 @@
 from .user import User
 from .book import Book
 from .wishlist import Wishlist
-from .borrow import BorrowRequest, BorrowItem
+from .borrow import BorrowRequest, BorrowItem, BorrowRequestArchive, BorrowItemArchive
 
+from .stats import LibraryStat
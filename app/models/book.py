@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..utils.search import build_book_search_text
 
 class Book(Base):
     __tablename__ = "books"
@@ -15,6 +16,8 @@ class Book(Base):
     quantity = Column(Integer, default=0)
     available_quantity = Column(Integer, default=0)
     cover_image = Column(String(255))
+    # title + author + isbn đã bỏ dấu, dùng cho full-text search
+    search_text = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -22,3 +25,35 @@ class Book(Base):
     wishlist_items = relationship("Wishlist", back_populates="book", cascade="all, delete-orphan")
     borrow_items = relationship("BorrowItem", back_populates="book")
 
+@event.listens_for(Book, "before_insert")
+@event.listens_for(Book, "before_update")
+def _update_search_text(mapper, connection, target):
+    """Cập nhật search_text mỗi khi thêm/sửa sách qua ORM"""
+    target.search_text = build_book_search_text(target.title, target.author, target.isbn)
+
+# Index full-text: FULLTEXT trên MySQL, bảng FTS5 + trigger đồng bộ trên SQLite
+event.listen(
+    Book.__table__,
+    "after_create",
+    DDL("ALTER TABLE books ADD FULLTEXT INDEX ft_books_search (search_text)").execute_if(dialect="mysql")
+)
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        search_text, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF search_text ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO books_fts(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
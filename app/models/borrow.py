@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Date, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Date, Enum, Index, Boolean, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -13,16 +13,30 @@ class BorrowStatus(str, enum.Enum):
 
 class BorrowRequest(Base):
     __tablename__ = "borrow_requests"
+    __table_args__ = (
+        # Phiếu của một độc giả (có / không lọc trạng thái), mới nhất trước: không cần sort
+        Index("ix_borrow_requests_user_status_created", "user_id", "status", "created_at"),
+        Index("ix_borrow_requests_user_created", "user_id", "created_at"),
+        # Admin lọc theo trạng thái, mới nhất trước; đếm theo trạng thái cho bộ đếm dashboard
+        Index("ix_borrow_requests_status_created", "status", "created_at"),
+        # Export lọc theo trạng thái, đọc theo thứ tự id
+        Index("ix_borrow_requests_status_id", "status", "id"),
+        # Phiếu đang mượn theo cờ quá hạn và hạn trả: job quét chỉ đọc các phiếu vừa quá hạn,
+        # danh sách quá hạn đọc theo thứ tự hạn trả không cần sort
+        Index("ix_borrow_requests_overdue", "status", "is_overdue", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(Enum(BorrowStatus), default=BorrowStatus.pending)
     note = Column(Text)
     admin_note = Column(Text)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, server_default=func.now(), index=True)
     approved_at = Column(DateTime, nullable=True)
     due_date = Column(Date, nullable=True)
     returned_at = Column(DateTime, nullable=True)
+    # Phiếu đang mượn đã quá hạn trả: do job quét quá hạn gắn, bỏ khi trả sách
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default=false())
 
     # Relationships
     user = relationship("User", back_populates="borrow_requests")
@@ -32,11 +46,42 @@ class BorrowItem(Base):
     __tablename__ = "borrow_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(Integer, ForeignKey("borrow_requests.id", ondelete="CASCADE"), nullable=False)
-    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    request_id = Column(Integer, ForeignKey("borrow_requests.id", ondelete="CASCADE"), nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
     quantity = Column(Integer, default=1)
 
     # Relationships
     request = relationship("BorrowRequest", back_populates="items")
     book = relationship("Book", back_populates="borrow_items")
 
+
+class BorrowRequestArchive(Base):
+    """
+    Phiếu đã đóng (trả / từ chối) lâu ngày được job lưu trữ chuyển khỏi borrow_requests (xem utils/archive.py).
+    Cùng cột và giữ nguyên id, thêm archived_at; chỉ có các index cho đọc lịch sử theo ngày tạo.
+    """
+    __tablename__ = "borrow_requests_archive"
+    __table_args__ = (
+        # Lịch sử của một độc giả, mới nhất trước; đếm theo trạng thái cho tổng hợp của độc giả
+        Index("ix_borrow_requests_archive_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(Enum(BorrowStatus), nullable=False)
+    note = Column(Text)
+    admin_note = Column(Text)
+    created_at = Column(DateTime, index=True)
+    approved_at = Column(DateTime, nullable=True)
+    due_date = Column(Date, nullable=True)
+    returned_at = Column(DateTime, nullable=True)
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default=false())
+    archived_at = Column(DateTime, nullable=False)
+
+class BorrowItemArchive(Base):
+    __tablename__ = "borrow_items_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    request_id = Column(Integer, ForeignKey("borrow_requests_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    quantity = Column(Integer, default=1)
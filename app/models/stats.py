@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+class LibraryStat(Base):
+    """Bộ đếm tổng hợp cho dashboard, được các router cập nhật tăng dần trong cùng giao dịch"""
+    __tablename__ = "library_stats"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    # Lần đối chiếu (đếm lại) gần nhất
+    checked_at = Column(DateTime, nullable=True)
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Wishlist(Base):
     __tablename__ = "wishlist"
+    # Giỏ mượn của một độc giả và tìm một sách trong giỏ
+    __table_args__ = (Index("ix_wishlist_user_book", "user_id", "book_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -4,3 +4,6 @@ from .users import router as users_router
 from .wishlist import router as wishlist_router
 from .borrows import router as borrows_router
 
+from .stats import router as stats_router
+from .exports import router as exports_router
+from .events import router as events_router
@@ -1,28 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from ..database import get_db
 from ..models.user import User, UserRole
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token
-from ..utils.auth import verify_password, get_password_hash, create_access_token
-from ..utils.dependencies import get_current_user
+from ..utils.auth import (
+    verify_password_async, get_password_hash_async, password_needs_rehash,
+    create_access_token, password_hasher
+)
+from ..utils.dependencies import Principal, get_current_user, get_current_admin, principal_cache
+from ..utils.stats import READERS, adjust_counters
 from ..config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Đăng ký tài khoản mới (chỉ dành cho user)"""
     # Kiểm tra username đã tồn tại
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Tên đăng nhập đã tồn tại"
         )
 
     # Kiểm tra email đã tồn tại
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email đã được sử dụng"
@@ -32,25 +37,26 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         full_name=user_data.full_name,
         phone=user_data.phone,
         role=UserRole.user
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await adjust_counters(db, {READERS: 1})
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Đăng nhập và nhận token"""
     # Tìm user theo username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Tên đăng nhập hoặc mật khẩu không đúng",
@@ -63,6 +69,11 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             detail="Tài khoản đã bị vô hiệu hóa"
         )
 
+    # Hash lại nếu BCRYPT_ROUNDS đã thay đổi
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await get_password_hash_async(form_data.password)
+        await db.commit()
+
     # Tạo access token
     access_token = create_access_token(
         data={
@@ -75,7 +86,19 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     """Lấy thông tin user hiện tại"""
-    return current_user
+    return await db.get(User, current_user.id)
+
+@router.get("/password-pool")
+async def get_password_pool_stats(current_user: Principal = Depends(get_current_admin)):
+    """Số liệu pool bcrypt: hàng đợi, thời gian chờ (Admin only)"""
+    return password_hasher.stats()
 
+@router.get("/principal-cache")
+async def get_principal_cache_stats(current_user: Principal = Depends(get_current_admin)):
+    """Số liệu cache principal: hit/miss, invalidation (Admin only)"""
+    return principal_cache.stats()
@@ -1,84 +1,249 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import Optional
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, Request, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, update
+from typing import List, Optional, Union
 from math import ceil
+from ..config import settings
 from ..database import get_db
+from ..utils.replicas import get_read_db
 from ..models.book import Book
-from ..models.user import User
-from ..schemas.book import BookCreate, BookUpdate, BookResponse, BookListResponse
-from ..utils.dependencies import get_current_user, get_current_admin
+from ..schemas.book import (
+    BookCreate, BookUpdate, BookResponse, BookListResponse, BookProjectionListResponse,
+    CategoryCount, CategoryFacet, BookImportReport
+)
+from ..utils.search import apply_book_search
+from ..utils.pagination import Keyset
+from ..utils.stats import BOOKS, BOOKS_VERSION, adjust_counters, books_version_counter
+from ..utils.catalog import (
+    book_list_cache, catalog_generation, catalog_version, invalidate_catalog, load_categories
+)
+from ..utils.http_cache import cache_headers, content_etag, etag_matches, has_validators, is_not_modified
+from ..utils.fields import parse_fields, project_rows
+from ..utils.serialization import dump_json, json_response
+from ..utils.book_import import check_conflict_mode, import_books, import_format
+from ..utils.events import queue_book_availability
+from ..utils.dependencies import Principal, get_current_user, get_current_admin
 
 router = APIRouter(prefix="/api/books", tags=["Books"])
 
-@router.get("", response_model=BookListResponse)
-async def get_books(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100),
-    search: Optional[str] = None,
-    category: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    """Lấy danh sách sách (có pagination và tìm kiếm)"""
-    query = db.query(Book)
+# Các cột client có thể chọn bằng fields=, và tập cột của view=summary (không có description)
+BOOK_FIELDS = [
+    "id", "title", "author", "isbn", "category", "description", "quantity",
+    "available_quantity", "cover_image", "created_at", "updated_at"
+]
+BOOK_SUMMARY_FIELDS = ["title", "author", "isbn", "category", "quantity", "available_quantity", "cover_image"]
+# Response đầy đủ dựng thẳng từ Core select (FAST_LIST_RESPONSES): đúng các trường và thứ tự của BookResponse
+BOOK_RESPONSE_FIELDS = list(BookResponse.model_fields)
 
-    # Tìm kiếm theo title, author, isbn
+async def category_facets(db: AsyncSession, query, search: Optional[str]) -> List[CategoryFacet]:
+    """Số kết quả theo danh mục cho bộ lọc hiện tại (chưa áp dụng lọc category)"""
+    if not search:
+        # Không tìm kiếm: dùng luôn registry trong bộ nhớ, không cần truy vấn
+        registry = await load_categories(db)
+        return [CategoryFacet(name=name, count=count) for name, count in registry.book_counts.items()]
+    matched = query.subquery()
+    rows = await db.execute(
+        select(matched.c.category, func.count())
+        .where(matched.c.category.isnot(None))
+        .group_by(matched.c.category)
+        .order_by(matched.c.category)
+    )
+    return [CategoryFacet(name=name, count=count) for name, count in rows]
+
+def book_validators(book_id: int, source):
+    """ETag và Last-Modified của một sách, từ updated_at và số lượng (không cần đọc description)"""
+    modified = source.updated_at or source.created_at
+    return content_etag([book_id, modified, source.quantity, source.available_quantity]), modified
+
+async def list_books(
+    db: AsyncSession,
+    page: int,
+    page_size: int,
+    search: Optional[str],
+    category: Optional[str],
+    cursor: Optional[str],
+    include_total: Optional[bool],
+    facets: bool,
+    fields: Optional[List[str]] = None
+) -> Union[BookListResponse, dict]:
+    """
+    Truy vấn danh sách sách (có pagination và tìm kiếm).
+    Khi có fields: chỉ SELECT các cột được chọn và trả dict, không dựng ORM object / model Pydantic.
+    """
+    query = select(Book)
+    rank = None
+    use_cursor = cursor is not None
+    if include_total is None:
+        include_total = not use_cursor
+
+    # Tìm kiếm full-text theo title, author, isbn (không phân biệt dấu)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Book.title.ilike(search_filter),
-                Book.author.ilike(search_filter),
-                Book.isbn.ilike(search_filter)
-            )
-        )
+        query, rank = apply_book_search(query, search, db.bind.dialect.name, Book.__table__)
+
+    # Facet theo danh mục tính trên kết quả tìm kiếm, trước khi lọc category
+    facet_counts = await category_facets(db, query, search) if facets else None
 
     # Lọc theo category
     if category:
-        query = query.filter(Book.category == category)
+        query = query.where(Book.category == category)
 
     # Đếm tổng số
-    total = query.count()
-    total_pages = ceil(total / page_size)
+    total = total_pages = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        total_pages = ceil(total / page_size)
+
+    async def fetch(stmt):
+        if fields is None:
+            return (await db.scalars(stmt)).all()
+        # Chỉ lấy các cột cần (thêm title cho con trỏ keyset)
+        columns = [Book.__table__.c[name] for name in dict.fromkeys(fields + ["title"])]
+        return (await db.execute(stmt.with_only_columns(*columns))).all()
+
+    next_cursor = None
+    if use_cursor:
+        # Keyset theo (title, id): không dùng OFFSET nên trang sâu không chậm hơn
+        keyset = Keyset([Book.title, Book.id])
+        books = await fetch(keyset.apply(query, cursor, page_size))
+        books, next_cursor = keyset.paginate(books, page_size)
+    else:
+        # Sắp xếp theo độ liên quan khi tìm kiếm
+        if rank is not None:
+            query = query.order_by(rank, Book.id)
 
-    # Pagination
-    books = query.offset((page - 1) * page_size).limit(page_size).all()
+        # Pagination
+        books = await fetch(query.offset((page - 1) * page_size).limit(page_size))
 
-    return BookListResponse(
-        items=books,
+    page_info = dict(
         total=total,
-        page=page,
+        page=None if use_cursor else page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
+    if fields is None:
+        return BookListResponse(items=books, facets=facet_counts, **page_info)
+    return {
+        "items": project_rows(books, fields),
+        **page_info,
+        "facets": None if facet_counts is None else [facet.model_dump() for facet in facet_counts]
+    }
+
+@router.get("", response_model=Union[BookListResponse, BookProjectionListResponse])
+async def get_books(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Phân trang theo con trỏ (title, id); để trống để lấy trang đầu. Không dùng cùng search"),
+    include_total: Optional[bool] = Query(None, description="Đếm tổng số (mặc định: có với page, không với cursor)"),
+    facets: bool = Query(False, description="Trả về số kết quả theo từng danh mục"),
+    fields: Optional[str] = Query(None, description="Chỉ trả về các trường này, vd id,title,available_quantity"),
+    view: Optional[str] = Query(None, description="summary: bỏ description và thời gian; full (mặc định)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Lấy danh sách sách (có pagination và tìm kiếm).
+    Có fields= hoặc view=summary thì items chỉ gồm id và các trường được chọn (BookProjectionListResponse).
+    ETag theo phiên bản bộ sưu tập sách: If-None-Match khớp thì trả 304 mà không truy vấn sách.
+    Response được cache dùng chung theo query string (không phụ thuộc user) theo phiên bản bộ sưu tập:
+    mỗi request chỉ đọc phiên bản (một dòng theo khóa chính), không truy vấn sách khi cache còn đúng phiên bản.
+    """
+    if cursor is not None and search:
+        # Kết quả tìm kiếm xếp theo độ liên quan (bm25/MATCH), không có trong con trỏ (title, id):
+        # phân trang theo cursor sẽ trả thứ tự khác với page
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Không hỗ trợ cursor khi tìm kiếm, hãy dùng page"
+        )
+    selected = parse_fields(fields, view, BOOK_FIELDS, BOOK_SUMMARY_FIELDS)
+    if selected is None and settings.FAST_LIST_RESPONSES:
+        selected = BOOK_RESPONSE_FIELDS
+    generation = catalog_generation()
+    version = await catalog_version(db)
+    if version is None:
+        # Chưa khởi tạo phiên bản (bảng library_stats chưa được đối chiếu) - bỏ qua cache
+        result = await list_books(db, page, page_size, search, category, cursor, include_total, facets, selected)
+        return json_response(result)
+
+    etag = f'"books-{version}"'
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+    # Mỗi entry gắn phiên bản lúc tính: worker chưa nhận invalidate (không có CACHE_BROADCAST_URL)
+    # cũng không trả response cũ sau khi sách thay đổi
+    key = tuple(sorted(request.query_params.multi_items()))
+    cached = book_list_cache.get(key)
+    if cached is not None and cached[0] == etag:
+        return Response(content=cached[1], media_type="application/json", headers=cache_headers(etag))
+
+    result = await list_books(db, page, page_size, search, category, cursor, include_total, facets, selected)
+    body = dump_json(result)
+    if generation == catalog_generation():
+        book_list_cache.set(key, (etag, body))
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
 
 @router.get("/categories")
-async def get_categories(db: Session = Depends(get_db)):
-    """Lấy danh sách các category"""
-    categories = db.query(Book.category).distinct().filter(Book.category.isnot(None)).all()
-    return [cat[0] for cat in categories]
+async def get_categories(
+    request: Request,
+    response: Response,
+    with_counts: bool = Query(False, description="Kèm số đầu sách và số cuốn còn lại của từng danh mục"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Lấy danh sách các category (từ registry trong bộ nhớ, hỗ trợ ETag / If-None-Match)"""
+    registry = await load_categories(db)
+    headers = {"ETag": registry.etag(with_counts), "Cache-Control": "public, no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    if with_counts:
+        return [
+            CategoryCount(name=name, book_count=book_count, available_count=available)
+            for name, book_count, available in registry.categories
+        ]
+    return registry.names
 
 @router.get("/{book_id}", response_model=BookResponse)
-async def get_book(book_id: int, db: Session = Depends(get_db)):
-    """Lấy chi tiết sách theo ID"""
-    book = db.query(Book).filter(Book.id == book_id).first()
+async def get_book(
+    book_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Lấy chi tiết sách theo ID (hỗ trợ ETag / Last-Modified theo updated_at)"""
+    if has_validators(request):
+        # Request có điều kiện: chỉ đọc các cột validator, trả 304 mà không nạp ORM object
+        row = (await db.execute(
+            select(Book.updated_at, Book.created_at, Book.quantity, Book.available_quantity)
+            .where(Book.id == book_id)
+        )).first()
+        if row is not None:
+            etag, modified = book_validators(book_id, row)
+            if is_not_modified(request, etag, modified):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, modified))
+
+    book = await db.scalar(select(Book).where(Book.id == book_id))
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy sách"
         )
+    response.headers.update(cache_headers(*book_validators(book.id, book)))
     return book
 
 @router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
 async def create_book(
     book_data: BookCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Thêm sách mới (Admin only)"""
     # Kiểm tra ISBN đã tồn tại
     if book_data.isbn:
-        existing = db.query(Book).filter(Book.isbn == book_data.isbn).first()
+        existing = await db.scalar(select(Book).where(Book.isbn == book_data.isbn))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -97,20 +262,55 @@ async def create_book(
     )
 
     db.add(new_book)
-    db.commit()
-    db.refresh(new_book)
+    await adjust_counters(db, {BOOKS: 1, BOOKS_VERSION: 1})
+    await db.commit()
+    await db.refresh(new_book)
+    await invalidate_catalog()
 
     return new_book
 
+@router.post("/import", response_model=BookImportReport)
+async def import_books_file(
+    file: UploadFile = File(..., description="File CSV (có dòng tiêu đề) hoặc NDJSON"),
+    format: Optional[str] = Query(None, description="csv hoặc ndjson; mặc định theo phần mở rộng của file"),
+    on_conflict: str = Query("update", description="ISBN đã tồn tại: update (cập nhật) hoặc skip (bỏ qua)"),
+    start_row: int = Query(0, ge=0, description="Bỏ qua các bản ghi <= start_row (last_row của lần chạy lỗi trước)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Import sách hàng loạt (Admin only): đọc file theo dòng, kiểm tra từng bản ghi như khi thêm sách,
+    gộp trùng ISBN và upsert theo lô IMPORT_BATCH_SIZE, commit sau mỗi lô.
+    Đọc file, parse và kiểm tra từng lô chạy trong thread nên import không chặn các request khác.
+    File rất lớn nên dùng scripts/import_books.py (có checkpoint và tiến độ).
+    """
+    fmt = import_format(file.filename, format)
+    check_conflict_mode(on_conflict)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await import_books(
+            db, stream, fmt, settings.IMPORT_BATCH_SIZE, on_conflict=on_conflict, start_row=start_row
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File phải được mã hóa UTF-8"
+        )
+    finally:
+        stream.detach()
+        # Các lô đã commit vẫn phải được phản ánh trong cache kể cả khi import dừng giữa chừng
+        await invalidate_catalog()
+    return report
+
 @router.put("/{book_id}", response_model=BookResponse)
 async def update_book(
     book_id: int,
     book_data: BookUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Cập nhật thông tin sách (Admin only)"""
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id))
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,7 +319,7 @@ async def update_book(
 
     # Kiểm tra ISBN mới có trùng không
     if book_data.isbn and book_data.isbn != book.isbn:
-        existing = db.query(Book).filter(Book.isbn == book_data.isbn).first()
+        existing = await db.scalar(select(Book).where(Book.isbn == book_data.isbn))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -127,34 +327,43 @@ async def update_book(
             )
 
     update_data = book_data.model_dump(exclude_unset=True)
+    quantity = update_data.pop("quantity", None)
 
-    # Nếu cập nhật quantity, cần cập nhật available_quantity tương ứng
-    if "quantity" in update_data:
-        diff = update_data["quantity"] - book.quantity
-        new_available = book.available_quantity + diff
-        if new_available < 0:
+    for key, value in update_data.items():
+        setattr(book, key, value)
+
+    if quantity is not None:
+        # Cập nhật quantity và available_quantity tương ứng trong một câu UPDATE có điều kiện:
+        # chênh lệch tính theo giá trị hiện tại trong database, không bị phiếu được duyệt / trả đồng thời ghi đè
+        diff = quantity - Book.quantity
+        result = await db.execute(
+            update(Book)
+            .where(Book.id == book_id, Book.available_quantity + diff >= 0)
+            .values(quantity=quantity, available_quantity=Book.available_quantity + diff)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Không thể giảm số lượng vì có sách đang được mượn"
             )
-        update_data["available_quantity"] = new_available
-
-    for key, value in update_data.items():
-        setattr(book, key, value)
+        await queue_book_availability(db, [book_id])
 
-    db.commit()
-    db.refresh(book)
+    await adjust_counters(db, {books_version_counter(book_id): 1})
+    await db.commit()
+    await db.refresh(book)
+    await invalidate_catalog()
 
     return book
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(
     book_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Xóa sách (Admin only)"""
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id))
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -168,8 +377,10 @@ async def delete_book(
             detail="Không thể xóa sách đang được mượn"
         )
 
-    db.delete(book)
-    db.commit()
+    await db.delete(book)
+    await adjust_counters(db, {BOOKS: -1, BOOKS_VERSION: 1})
+    await db.commit()
+    await invalidate_catalog()
 
     return None
 
@@ -1,83 +1,559 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
-from typing import Optional
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, delete, update, func, or_, case, true
+from typing import Dict, List, Optional, Tuple, Union
+from datetime import date, datetime
 from math import ceil
+from ..config import settings
 from ..database import get_db
+from ..utils.replicas import get_read_db
 from ..models.user import User
 from ..models.book import Book
 from ..models.wishlist import Wishlist
-from ..models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from ..models.borrow import BorrowRequest, BorrowItem, BorrowStatus, BorrowRequestArchive, BorrowItemArchive
 from ..schemas.borrow import (
     BorrowRequestCreate, BorrowRequestUpdate, BorrowRequestResponse,
-    BorrowApprove, BorrowReject, BorrowListResponse
+    BorrowApprove, BorrowReject, BorrowListResponse, BorrowProjectionListResponse,
+    BorrowBulkApprove, BorrowBulkReject, BorrowBulkReturn, BorrowBulkItemResult, BorrowBulkResponse,
+    BorrowUserSummary
 )
-from ..utils.dependencies import get_current_user, get_current_admin
+from ..utils.pagination import Keyset
+from ..schemas.book import BookResponse
+from ..schemas.user import UserResponse
+from ..utils.fields import parse_fields
+from ..utils.serialization import json_response
+from ..utils.inventory import (
+    InsufficientStock, InventoryConflict, merge_quantities, request_quantities, quantities_by_request,
+    reserve_books, release_books, reserve_for_requests, release_for_requests, run_with_retry
+)
+from ..utils.stats import OVERDUE, read_counters, shift_borrow_status
+from ..utils.overdue import clear_overdue
+from ..utils.archive import reads_archive
+from ..utils.export import date_range_filters
+from ..utils.catalog import invalidate_catalog
+from ..utils.events import queue_borrow_event, queue_borrow_status
+from ..utils.dependencies import Principal, get_current_user, get_current_admin
 
 router = APIRouter(prefix="/api/borrows", tags=["Borrows"])
 
-@router.get("", response_model=BorrowListResponse)
-async def get_borrow_requests(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100),
-    status_filter: Optional[str] = None,
-    search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Lấy danh sách phiếu mượn (Admin: tất cả, User: của mình)"""
-    query = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
+# Số phiếu tối đa trong một thao tác hàng loạt
+MAX_BULK_SIZE = 1000
+
+# Trường cho fields= / view=summary của danh sách phiếu: item_count, total_quantity và user
+# được tính từ truy vấn gộp thay vì nạp items và sách
+BORROW_FIELDS = [
+    "id", "user_id", "status", "note", "admin_note", "created_at", "approved_at",
+    "due_date", "returned_at", "is_overdue", "item_count", "total_quantity", "user"
+]
+BORROW_SUMMARY_FIELDS = [
+    "user_id", "status", "created_at", "approved_at", "due_date", "returned_at",
+    "is_overdue", "item_count", "total_quantity", "user"
+]
+
+# Response đầy đủ dựng thẳng từ Core select (FAST_LIST_RESPONSES): đúng các trường và thứ tự của schema
+BORROW_RESPONSE_COLUMNS = [name for name in BorrowRequestResponse.model_fields if name not in ("items", "user")]
+BOOK_RESPONSE_COLUMNS = list(BookResponse.model_fields)
+USER_RESPONSE_COLUMNS = list(UserResponse.model_fields)
+
+# (bảng phiếu, bảng items) của dữ liệu đang dùng và của phần lưu trữ (utils/archive.py): cùng cột nên dựng response như nhau
+HOT_TABLES = (BorrowRequest.__table__, BorrowItem.__table__)
+ARCHIVE_TABLES = (BorrowRequestArchive.__table__, BorrowItemArchive.__table__)
+
+async def load_borrow_request(db: AsyncSession, request_id: int) -> Optional[BorrowRequest]:
+    """Lấy phiếu mượn kèm items, sách và độc giả (eager load cho async session)"""
+    return await db.scalar(
+        select(BorrowRequest).options(
+            selectinload(BorrowRequest.items).selectinload(BorrowItem.book),
+            selectinload(BorrowRequest.user)
+        ).where(BorrowRequest.id == request_id).execution_options(populate_existing=True)
+    )
+
+async def check_request_status(db: AsyncSession, request_id: int, expected: BorrowStatus, detail: str):
+    """Kiểm tra nhanh phiếu tồn tại và đang ở trạng thái expected (trước khi mở giao dịch ghi)"""
+    current = await db.scalar(select(BorrowRequest.status).where(BorrowRequest.id == request_id))
+    if current is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy phiếu mượn"
+        )
+    if current != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+async def transition_request(db: AsyncSession, request_id: int, expected: BorrowStatus, detail: str, **values):
+    """Đổi trạng thái phiếu bằng UPDATE có điều kiện; báo lỗi nếu phiếu đã bị xử lý bởi request khác"""
+    result = await db.execute(
+        update(BorrowRequest)
+        .where(BorrowRequest.id == request_id, BorrowRequest.status == expected)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+    if "status" in values:
+        await shift_borrow_status(db, expected, values["status"])
+        await queue_borrow_status(db, [request_id], values["status"])
+
+async def ensure_books_exist(db: AsyncSession, book_ids: List[int]):
+    """Kiểm tra tất cả sách tồn tại bằng một truy vấn IN, báo mọi ID không tồn tại trong một lỗi"""
+    wanted = set(book_ids)
+    found = set((await db.scalars(select(Book.id).where(Book.id.in_(wanted)))).all())
+    missing = sorted(wanted - found)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Không tìm thấy sách với ID {', '.join(str(book_id) for book_id in missing)}"
+        )
+
+async def sync_request_items(db: AsyncSession, request_id: int, wanted: Dict[int, int]):
+    """
+    Đồng bộ items của phiếu với danh sách mới {book_id: quantity}:
+    xóa sách bị bỏ, cập nhật số lượng thay đổi, thêm sách mới - mỗi loại một câu lệnh.
+    """
+    existing = (await db.execute(
+        select(BorrowItem.id, BorrowItem.book_id, BorrowItem.quantity)
+        .where(BorrowItem.request_id == request_id)
+        .order_by(BorrowItem.id)
+    )).all()
+
+    kept = {}
+    to_delete = []
+    for row in existing:
+        if row.book_id in wanted and row.book_id not in kept:
+            kept[row.book_id] = row
+        else:
+            # Sách bị bỏ hoặc dòng trùng sách
+            to_delete.append(row.id)
+
+    to_update = [
+        {"id": row.id, "quantity": wanted[book_id]}
+        for book_id, row in kept.items() if row.quantity != wanted[book_id]
+    ]
+    to_insert = [
+        {"request_id": request_id, "book_id": book_id, "quantity": quantity}
+        for book_id, quantity in wanted.items() if book_id not in kept
+    ]
+
+    if to_delete:
+        await db.execute(delete(BorrowItem).where(BorrowItem.id.in_(to_delete)))
+    if to_update:
+        await db.execute(update(BorrowItem), to_update)
+    if to_insert:
+        await db.execute(insert(BorrowItem), to_insert)
+
+def unique_request_ids(request_ids: List[int]) -> List[int]:
+    """Bỏ ID trùng (giữ thứ tự) và giới hạn kích thước lô"""
+    ids = list(dict.fromkeys(request_ids))
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Danh sách phiếu mượn trống"
+        )
+    if len(ids) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chỉ xử lý tối đa {MAX_BULK_SIZE} phiếu mượn mỗi lần"
+        )
+    return ids
+
+async def partition_requests(
+    db: AsyncSession, request_ids: List[int], expected: BorrowStatus, detail: str
+) -> Tuple[List[int], Dict[int, str]]:
+    """
+    Khóa các phiếu (theo thứ tự id, cùng thứ tự khóa với thao tác đơn lẻ) và chia thành
+    phiếu đúng trạng thái expected và phiếu lỗi kèm lý do.
+    """
+    rows = (await db.execute(
+        select(BorrowRequest.id, BorrowRequest.status)
+        .where(BorrowRequest.id.in_(request_ids))
+        .order_by(BorrowRequest.id)
+        .with_for_update()
+    )).all()
+    current = {row.id: row.status for row in rows}
+    eligible = []
+    failures = {}
+    for request_id in request_ids:
+        if request_id not in current:
+            failures[request_id] = "Không tìm thấy phiếu mượn"
+        elif current[request_id] != expected:
+            failures[request_id] = detail
+        else:
+            eligible.append(request_id)
+    return eligible, failures
+
+async def transition_requests(db: AsyncSession, request_ids: List[int], expected: BorrowStatus, **values):
+    """Đổi trạng thái nhiều phiếu trong một câu UPDATE; nếu có phiếu đã bị xử lý đồng thời thì thử lại cả lô"""
+    if not request_ids:
+        return
+    result = await db.execute(
+        update(BorrowRequest)
+        .where(BorrowRequest.id.in_(request_ids), BorrowRequest.status == expected)
+        .values(**values)
+        .execution_options(synchronize_session=False)
     )
+    if result.rowcount != len(request_ids):
+        raise InventoryConflict()
+    if "status" in values:
+        await shift_borrow_status(db, expected, values["status"], len(request_ids))
+        await queue_borrow_status(db, request_ids, values["status"])
+
+def bulk_response(
+    request_ids: List[int], succeeded: List[int], new_status: BorrowStatus, failures: Dict[int, str]
+) -> BorrowBulkResponse:
+    """Kết quả theo từng phiếu, giữ thứ tự ID gửi lên"""
+    done = set(succeeded)
+    results = [
+        BorrowBulkItemResult(id=request_id, success=True, status=new_status) if request_id in done
+        else BorrowBulkItemResult(id=request_id, success=False, detail=failures.get(request_id))
+        for request_id in request_ids
+    ]
+    return BorrowBulkResponse(results=results, succeeded=len(done), failed=len(results) - len(done))
+
+async def borrow_summaries(db: AsyncSession, ids: List[int], names: List[str], tables=HOT_TABLES) -> List[dict]:
+    """
+    Dựng danh sách phiếu rút gọn bằng Core select (không tạo ORM object, không qua Pydantic):
+    một truy vấn cho các cột của phiếu (join users nếu cần) và một truy vấn GROUP BY cho số sách.
+    """
+    if not ids:
+        return []
+    requests_table, items_table = tables
+    columns = [requests_table.c[name] for name in names if name in requests_table.c]
+    query = select(*columns).where(requests_table.c.id.in_(ids))
+    if "user" in names:
+        query = query.add_columns(
+            User.id.label("user_ref"), User.username, User.full_name
+        ).outerjoin(User, User.id == requests_table.c.user_id)
+    rows = {row.id: row for row in (await db.execute(query)).all()}
+
+    counts = {}
+    if "item_count" in names or "total_quantity" in names:
+        counts = {
+            request_id: (item_count, total_quantity)
+            for request_id, item_count, total_quantity in (await db.execute(
+                select(
+                    items_table.c.request_id,
+                    func.count(items_table.c.id),
+                    func.coalesce(func.sum(items_table.c.quantity), 0)
+                ).where(items_table.c.request_id.in_(ids)).group_by(items_table.c.request_id)
+            )).all()
+        }
+
+    summaries = []
+    for request_id in ids:
+        row = rows.get(request_id)
+        if row is None:
+            continue
+        item = {}
+        for name in names:
+            if name == "user":
+                item["user"] = None if row.user_ref is None else {
+                    "id": row.user_ref, "username": row.username, "full_name": row.full_name
+                }
+            elif name == "item_count":
+                item["item_count"] = counts.get(request_id, (0, 0))[0]
+            elif name == "total_quantity":
+                item["total_quantity"] = int(counts.get(request_id, (0, 0))[1])
+            elif name == "status":
+                item["status"] = None if row.status is None else BorrowStatus(row.status).value
+            else:
+                item[name] = getattr(row, name)
+        summaries.append(item)
+    return summaries
+
+async def borrow_responses(db: AsyncSession, ids: List[int], tables=HOT_TABLES) -> List[dict]:
+    """
+    Dựng response đầy đủ (giống BorrowRequestResponse) bằng 3 câu Core select: phiếu, items join sách, độc giả.
+    Không tạo ORM object và không validate Pydantic; dữ liệu đã đúng kiểu từ database.
+    """
+    if not ids:
+        return []
+    requests_table, items_table = tables
+    requests = {
+        row.id: row._asdict()
+        for row in (await db.execute(
+            select(*[requests_table.c[name] for name in BORROW_RESPONSE_COLUMNS])
+            .where(requests_table.c.id.in_(ids))
+        )).all()
+    }
+    for request in requests.values():
+        request["items"] = []
+        request["user"] = None
+
+    item_rows = await db.execute(
+        select(
+            items_table.c.id, items_table.c.request_id, items_table.c.book_id, items_table.c.quantity,
+            *[Book.__table__.c[name].label(f"book_{name}") for name in BOOK_RESPONSE_COLUMNS]
+        ).join(Book, Book.id == items_table.c.book_id)
+        .where(items_table.c.request_id.in_(ids))
+        .order_by(items_table.c.id)
+    )
+    for row in item_rows:
+        values = row._mapping
+        requests[row.request_id]["items"].append({
+            "id": row.id,
+            "book_id": row.book_id,
+            "quantity": row.quantity,
+            "book": {name: values[f"book_{name}"] for name in BOOK_RESPONSE_COLUMNS}
+        })
+
+    user_ids = {request["user_id"] for request in requests.values()}
+    users = {
+        row.id: row._asdict()
+        for row in (await db.execute(
+            select(*[User.__table__.c[name] for name in USER_RESPONSE_COLUMNS]).where(User.id.in_(user_ids))
+        )).all()
+    }
+    for request in requests.values():
+        request["user"] = users.get(request["user_id"])
+
+    return [requests[request_id] for request_id in ids if request_id in requests]
+
+def in_page_order(items: list, ids: List[int]) -> list:
+    """Sắp lại các phiếu (dict hoặc ORM object) theo đúng thứ tự ids của trang"""
+    by_id = {item["id"] if isinstance(item, dict) else item.id: item for item in items}
+    return [by_id[request_id] for request_id in ids if request_id in by_id]
+
+async def borrow_page(db: AsyncSession, ids: List[int], selected: Optional[List[str]], page_info: dict, archived=frozenset()):
+    """Dựng response danh sách cho đúng các phiếu của trang (giữ thứ tự ids); phiếu có id trong archived đọc từ bảng lưu trữ"""
+    hot_ids = [request_id for request_id in ids if request_id not in archived]
+    archived_ids = [request_id for request_id in ids if request_id in archived]
+    if selected is not None:
+        items = await borrow_summaries(db, hot_ids, selected) + await borrow_summaries(db, archived_ids, selected, ARCHIVE_TABLES)
+        return json_response({"items": in_page_order(items, ids), **page_info})
+    if settings.FAST_LIST_RESPONSES:
+        items = await borrow_responses(db, hot_ids) + await borrow_responses(db, archived_ids, ARCHIVE_TABLES)
+        return json_response({"items": in_page_order(items, ids), **page_info})
+
+    # Nạp items, sách và độc giả bằng selectinload
+    requests = []
+    if hot_ids:
+        requests = (await db.scalars(
+            select(BorrowRequest).options(
+                selectinload(BorrowRequest.items).selectinload(BorrowItem.book),
+                selectinload(BorrowRequest.user)
+            ).where(BorrowRequest.id.in_(hot_ids))
+        )).all()
+    # Bảng lưu trữ không có relationship ORM: dựng bằng Core như FAST_LIST_RESPONSES
+    requests = [*requests, *await borrow_responses(db, archived_ids, ARCHIVE_TABLES)]
+
+    return BorrowListResponse(items=in_page_order(requests, ids), **page_info)
+
+def borrow_filters(
+    model, current_user: Principal, search: Optional[str], status_filter: Optional[str],
+    date_from: Optional[date], date_to: Optional[date]
+) -> list:
+    """Điều kiện lọc danh sách phiếu trên borrow_requests hoặc bảng lưu trữ (cùng tên cột)"""
+    filters = date_range_filters(model.created_at, date_from, date_to)
 
     # Nếu không phải admin, chỉ lấy phiếu của mình
     if current_user.role.value != "admin":
-        query = query.filter(BorrowRequest.user_id == current_user.id)
+        filters.append(model.user_id == current_user.id)
     else:
         # Admin có thể tìm kiếm theo thông tin độc giả
         if search:
-            query = query.join(User).filter(
-                or_(
-                    User.username.ilike(f"%{search}%"),
-                    User.email.ilike(f"%{search}%"),
-                    User.full_name.ilike(f"%{search}%")
+            filters.append(model.user_id.in_(
+                select(User.id).where(
+                    or_(
+                        User.username.ilike(f"%{search}%"),
+                        User.email.ilike(f"%{search}%"),
+                        User.full_name.ilike(f"%{search}%")
+                    )
                 )
-            )
+            ))
 
     # Lọc theo status
     if status_filter:
-        query = query.filter(BorrowRequest.status == status_filter)
-
-    # Đếm tổng
-    total = query.count()
-    total_pages = ceil(total / page_size)
+        filters.append(model.status == status_filter)
+    return filters
 
-    # Pagination và sắp xếp theo ngày tạo mới nhất
-    requests = query.order_by(BorrowRequest.created_at.desc()).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+@router.get("", response_model=Union[BorrowListResponse, BorrowProjectionListResponse])
+async def get_borrow_requests(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    status_filter: Optional[str] = None,
+    search: Optional[str] = None,
+    date_from: Optional[date] = Query(None, description="Ngày tạo phiếu từ (YYYY-MM-DD); khoảng ngày cũ đọc cả phiếu đã lưu trữ"),
+    date_to: Optional[date] = Query(None, description="Ngày tạo phiếu đến (YYYY-MM-DD, tính cả ngày này)"),
+    cursor: Optional[str] = Query(None, description="Phân trang theo con trỏ (created_at, id); để trống để lấy trang đầu"),
+    include_total: Optional[bool] = Query(None, description="Đếm tổng số (mặc định: có với page, không với cursor)"),
+    fields: Optional[str] = Query(None, description="Chỉ trả về các trường này, vd id,status,item_count"),
+    view: Optional[str] = Query(None, description="summary: không kèm items/sách, chỉ số lượng; full (mặc định)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Lấy danh sách phiếu mượn (Admin: tất cả, User: của mình).
+    Truy vấn 2 pha: phân trang trên id của borrow_requests (chỉ dùng các cột có index),
+    sau đó nạp items, sách và độc giả cho đúng các phiếu của trang bằng selectinload
+    (hoặc chỉ các cột được chọn khi có fields/view=summary, response dạng BorrowProjectionListResponse).
+    Phiếu đã lưu trữ chỉ được đọc khi khoảng ngày date_from/date_to chạm tới phần lưu trữ.
+    """
+    selected = parse_fields(fields, view, BORROW_FIELDS, BORROW_SUMMARY_FIELDS)
+    use_cursor = cursor is not None
+    if include_total is None:
+        include_total = not use_cursor
+
+    # Pha 1: chỉ lọc trên borrow_requests (và bảng lưu trữ nếu hỏi khoảng ngày cũ)
+    sources = [BorrowRequest]
+    if await reads_archive(db, date_from, date_to):
+        sources.append(BorrowRequestArchive)
+    filters = {
+        model: borrow_filters(model, current_user, search, status_filter, date_from, date_to) for model in sources
+    }
 
-    return BorrowListResponse(
-        items=requests,
+    # Đếm tổng
+    total = total_pages = None
+    if include_total:
+        total = 0
+        for model in sources:
+            total += await db.scalar(select(func.count(model.id)).where(*filters[model]))
+        total_pages = ceil(total / page_size)
+
+    rows = []
+    archived = frozenset()
+    for model in sources:
+        id_query = select(model.id, model.created_at).where(*filters[model])
+        if use_cursor:
+            # Keyset theo (created_at, id) giảm dần - cùng thứ tự với chế độ page
+            id_query = Keyset([model.created_at, model.id], descending=True).apply(id_query, cursor, page_size)
+        elif len(sources) == 1:
+            # Pagination và sắp xếp theo ngày tạo mới nhất
+            id_query = id_query.order_by(model.created_at.desc(), model.id.desc()).offset(
+                (page - 1) * page_size
+            ).limit(page_size)
+        else:
+            # Hai bảng: mỗi bảng lấy các dòng đầu theo thứ tự index rồi trộn, không sắp xếp trên hợp của hai bảng
+            id_query = id_query.order_by(model.created_at.desc(), model.id.desc()).limit(page * page_size)
+        part = (await db.execute(id_query)).all()
+        if model is BorrowRequestArchive:
+            archived = frozenset(row.id for row in part)
+        rows.extend(part)
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+        if not use_cursor:
+            rows = rows[(page - 1) * page_size:]
+    next_cursor = None
+    if use_cursor:
+        rows, next_cursor = Keyset([BorrowRequest.created_at, BorrowRequest.id], descending=True).paginate(rows, page_size)
+    else:
+        rows = rows[:page_size]
+    ids = [row.id for row in rows]
+    page_info = dict(
         total=total,
-        page=page,
+        page=None if use_cursor else page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
 
+    # Pha 2: nạp dữ liệu chi tiết cho các phiếu của trang
+    return await borrow_page(db, ids, selected, page_info, archived)
+
+@router.get("/overdue", response_model=Union[BorrowListResponse, BorrowProjectionListResponse])
+async def get_overdue_borrows(
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Con trỏ (due_date, id) của trang trước; để trống để lấy trang đầu"),
+    fields: Optional[str] = Query(None, description="Chỉ trả về các trường này, vd id,due_date,user"),
+    view: Optional[str] = Query(None, description="summary: không kèm items/sách, chỉ số lượng; full (mặc định)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Danh sách phiếu đang mượn đã quá hạn, hạn trả cũ nhất trước (Admin only).
+    Đọc theo cờ is_overdue do job quét quá hạn gắn (index status, is_overdue, due_date), tổng số lấy từ bộ đếm.
+    Có fields= hoặc view=summary thì items chỉ gồm id và các trường được chọn (BorrowProjectionListResponse).
+    """
+    selected = parse_fields(fields, view, BORROW_FIELDS, BORROW_SUMMARY_FIELDS)
+    keyset = Keyset([BorrowRequest.due_date, BorrowRequest.id])
+    rows = (await db.execute(keyset.apply(
+        select(BorrowRequest.id, BorrowRequest.due_date).where(
+            BorrowRequest.status == BorrowStatus.approved,
+            BorrowRequest.is_overdue == true()
+        ),
+        cursor, page_size
+    ))).all()
+    rows, next_cursor = keyset.paginate(rows, page_size)
+    counters, _ = await read_counters(db)
+    page_info = dict(
+        total=counters[OVERDUE],
+        page=None,
+        page_size=page_size,
+        total_pages=ceil(counters[OVERDUE] / page_size),
+        next_cursor=next_cursor
+    )
+    return await borrow_page(db, [row.id for row in rows], selected, page_info)
+
+async def user_borrow_summary(db: AsyncSession, user_id: int) -> BorrowUserSummary:
+    """
+    Số phiếu theo trạng thái (kể cả phiếu đã lưu trữ), số phiếu quá hạn, số cuốn đang mượn
+    và hạn trả gần nhất của một độc giả
+    """
+    by_status = {s.value: 0 for s in BorrowStatus}
+    for model in (BorrowRequest, BorrowRequestArchive):
+        for borrow_status, count in await db.execute(
+            select(model.status, func.count(model.id))
+            .where(model.user_id == user_id)
+            .group_by(model.status)
+        ):
+            if borrow_status is not None:
+                by_status[BorrowStatus(borrow_status).value] += count
+
+    active = [BorrowRequest.user_id == user_id, BorrowRequest.status == BorrowStatus.approved]
+    overdue, next_due_date = (await db.execute(
+        select(
+            func.coalesce(func.sum(case((BorrowRequest.is_overdue == true(), 1), else_=0)), 0),
+            func.min(BorrowRequest.due_date)
+        ).where(*active)
+    )).one()
+    books_borrowed = await db.scalar(
+        select(func.coalesce(func.sum(BorrowItem.quantity), 0))
+        .join(BorrowRequest, BorrowRequest.id == BorrowItem.request_id)
+        .where(*active)
+    )
+    return BorrowUserSummary(
+        user_id=user_id,
+        by_status=by_status,
+        borrowing=by_status[BorrowStatus.approved.value],
+        overdue=int(overdue),
+        books_borrowed=int(books_borrowed),
+        next_due_date=next_due_date
+    )
+
+@router.get("/summary", response_model=BorrowUserSummary)
+async def get_my_borrow_summary(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Tóm tắt phiếu mượn của độc giả hiện tại (thay cho việc tải danh sách phiếu để tự đếm)"""
+    return await user_borrow_summary(db, current_user.id)
+
+@router.get("/summary/{user_id}", response_model=BorrowUserSummary)
+async def get_user_borrow_summary(
+    user_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Tóm tắt phiếu mượn của một độc giả (Admin only)"""
+    return await user_borrow_summary(db, user_id)
+
 @router.get("/{request_id}", response_model=BorrowRequestResponse)
 async def get_borrow_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Lấy chi tiết phiếu mượn"""
-    request = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == request_id).first()
+    """Lấy chi tiết phiếu mượn (cả phiếu đã lưu trữ, chỉ đọc)"""
+    request = await load_borrow_request(db, request_id)
+    if not request:
+        # Không có trong borrow_requests: thử bảng lưu trữ (một lần đọc theo khóa chính)
+        archived = await borrow_responses(db, [request_id], ARCHIVE_TABLES)
+        request = archived[0] if archived else None
 
     if not request:
         raise HTTPException(
@@ -86,7 +562,8 @@ async def get_borrow_request(
         )
 
     # User chỉ được xem phiếu của mình
-    if current_user.role.value != "admin" and request.user_id != current_user.id:
+    owner_id = request["user_id"] if isinstance(request, dict) else request.user_id
+    if current_user.role.value != "admin" and owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Bạn không có quyền xem phiếu mượn này"
@@ -97,30 +574,25 @@ async def get_borrow_request(
 @router.post("", response_model=BorrowRequestResponse, status_code=status.HTTP_201_CREATED)
 async def create_borrow_request(
     data: BorrowRequestCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Tạo phiếu mượn từ wishlist hoặc danh sách items"""
     items_to_borrow = []
 
     if data.items:
-        # Lấy từ danh sách items được cung cấp
+        # Lấy từ danh sách items được cung cấp (kiểm tra sách bằng một truy vấn)
+        await ensure_books_exist(db, [item.book_id for item in data.items])
         for item in data.items:
-            book = db.query(Book).filter(Book.id == item.book_id).first()
-            if not book:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Không tìm thấy sách với ID {item.book_id}"
-                )
             items_to_borrow.append({
                 "book_id": item.book_id,
                 "quantity": item.quantity
             })
     else:
         # Lấy từ wishlist
-        wishlist_items = db.query(Wishlist).filter(
-            Wishlist.user_id == current_user.id
-        ).all()
+        wishlist_items = (await db.scalars(
+            select(Wishlist).where(Wishlist.user_id == current_user.id)
+        )).all()
 
         if not wishlist_items:
             raise HTTPException(
@@ -142,28 +614,23 @@ async def create_borrow_request(
         due_date=data.due_date  # Ngày trả do user nhập
     )
     db.add(borrow_request)
-    db.flush()  # Để lấy ID
-
-    # Tạo các items
-    for item in items_to_borrow:
-        borrow_item = BorrowItem(
-            request_id=borrow_request.id,
-            book_id=item["book_id"],
-            quantity=item["quantity"]
-        )
-        db.add(borrow_item)
+    await db.flush()  # Để lấy ID
+
+    # Tạo các items (bulk insert)
+    await db.execute(insert(BorrowItem), [
+        {"request_id": borrow_request.id, **item} for item in items_to_borrow
+    ])
 
     # Xóa wishlist sau khi tạo phiếu
     if not data.items:
-        db.query(Wishlist).filter(Wishlist.user_id == current_user.id).delete()
+        await db.execute(delete(Wishlist).where(Wishlist.user_id == current_user.id))
 
-    db.commit()
+    await shift_borrow_status(db, None, BorrowStatus.pending)
+    queue_borrow_event(db, borrow_request.id, current_user.id, BorrowStatus.pending)
+    await db.commit()
 
     # Load relationships
-    result = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == borrow_request.id).first()
+    result = await load_borrow_request(db, borrow_request.id)
 
     return result
 
@@ -171,11 +638,11 @@ async def create_borrow_request(
 async def update_borrow_request(
     request_id: int,
     data: BorrowRequestUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Cập nhật phiếu mượn (chỉ khi status = need_edit)"""
-    request = db.query(BorrowRequest).filter(BorrowRequest.id == request_id).first()
+    request = await db.scalar(select(BorrowRequest).where(BorrowRequest.id == request_id))
 
     if not request:
         raise HTTPException(
@@ -195,39 +662,31 @@ async def update_borrow_request(
             detail="Chỉ có thể chỉnh sửa phiếu mượn đang chờ duyệt hoặc cần chỉnh sửa"
         )
 
-    # Cập nhật note và due_date
+    await ensure_books_exist(db, [item.book_id for item in data.items])
+
+    # Cập nhật note, due_date và chuyển status về pending bằng UPDATE có điều kiện theo trạng thái vừa đọc:
+    # phiếu vừa được duyệt / từ chối bởi request khác thì không bị đưa về pending (sách đã giữ không bị treo)
+    values = {"status": BorrowStatus.pending}
     if data.note is not None:
-        request.note = data.note
+        values["note"] = data.note
     if data.due_date is not None:
-        request.due_date = data.due_date
-
-    # Xóa items cũ và tạo items mới
-    db.query(BorrowItem).filter(BorrowItem.request_id == request_id).delete()
-
-    for item in data.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if not book:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Không tìm thấy sách với ID {item.book_id}"
-            )
-        borrow_item = BorrowItem(
-            request_id=request_id,
-            book_id=item.book_id,
-            quantity=item.quantity
-        )
-        db.add(borrow_item)
+        values["due_date"] = data.due_date
+    await transition_request(
+        db, request_id, request.status,
+        "Chỉ có thể chỉnh sửa phiếu mượn đang chờ duyệt hoặc cần chỉnh sửa",
+        **values
+    )
 
-    # Chuyển status về pending
-    request.status = BorrowStatus.pending
+    # Chỉ ghi những items thay đổi so với phiếu hiện tại
+    await sync_request_items(
+        db, request_id,
+        merge_quantities((item.book_id, item.quantity) for item in data.items)
+    )
 
-    db.commit()
+    await db.commit()
 
     # Load relationships
-    result = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == request_id).first()
+    result = await load_borrow_request(db, request_id)
 
     return result
 
@@ -235,52 +694,41 @@ async def update_borrow_request(
 async def approve_borrow_request(
     request_id: int,
     data: BorrowApprove,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Duyệt phiếu mượn (Admin only)"""
-    request = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items)
-    ).filter(BorrowRequest.id == request_id).first()
-
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Không tìm thấy phiếu mượn"
-        )
+    await check_request_status(
+        db, request_id, BorrowStatus.pending,
+        "Chỉ có thể duyệt phiếu mượn đang chờ duyệt"
+    )
 
-    if request.status != BorrowStatus.pending:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Chỉ có thể duyệt phiếu mượn đang chờ duyệt"
+    async def approve():
+        # Chuyển trạng thái có điều kiện để hai admin không cùng duyệt một phiếu
+        # (giữ nguyên due_date do user nhập)
+        await transition_request(
+            db, request_id, BorrowStatus.pending,
+            "Chỉ có thể duyệt phiếu mượn đang chờ duyệt",
+            status=BorrowStatus.approved,
+            approved_at=datetime.utcnow(),
+            admin_note=data.admin_note
         )
 
-    # Kiểm tra và cập nhật số lượng sách
-    for item in request.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if book.available_quantity < item.quantity:
+        # Khóa, kiểm tra và giảm số lượng available của tất cả sách trong phiếu
+        try:
+            await reserve_books(db, await request_quantities(db, request_id))
+        except InsufficientStock as exc:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Sách '{book.title}' chỉ còn {book.available_quantity} cuốn, không đủ {item.quantity} cuốn yêu cầu"
+                detail=f"Sách '{exc.title}' chỉ còn {exc.available} cuốn, không đủ {exc.requested} cuốn yêu cầu"
             )
 
-    # Giảm số lượng available
-    for item in request.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        book.available_quantity -= item.quantity
-
-    # Cập nhật trạng thái phiếu (giữ nguyên due_date do user nhập)
-    request.status = BorrowStatus.approved
-    request.approved_at = datetime.utcnow()
-    request.admin_note = data.admin_note
-
-    db.commit()
+    await run_with_retry(db, approve)
+    # Số cuốn còn lại theo danh mục đã thay đổi
+    await invalidate_catalog()
 
     # Load relationships
-    result = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == request_id).first()
+    result = await load_borrow_request(db, request_id)
 
     return result
 
@@ -288,91 +736,166 @@ async def approve_borrow_request(
 async def reject_borrow_request(
     request_id: int,
     data: BorrowReject,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Từ chối hoặc yêu cầu chỉnh sửa phiếu mượn (Admin only)"""
-    request = db.query(BorrowRequest).filter(BorrowRequest.id == request_id).first()
-
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Không tìm thấy phiếu mượn"
-        )
-
-    if request.status != BorrowStatus.pending:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Chỉ có thể xử lý phiếu mượn đang chờ duyệt"
-        )
-
-    if data.require_edit:
-        request.status = BorrowStatus.need_edit
-    else:
-        request.status = BorrowStatus.rejected
+    await check_request_status(
+        db, request_id, BorrowStatus.pending,
+        "Chỉ có thể xử lý phiếu mượn đang chờ duyệt"
+    )
 
-    request.admin_note = data.admin_note
+    # Chuyển trạng thái có điều kiện (bộ đếm dashboard được cập nhật cùng giao dịch)
+    await transition_request(
+        db, request_id, BorrowStatus.pending,
+        "Chỉ có thể xử lý phiếu mượn đang chờ duyệt",
+        status=BorrowStatus.need_edit if data.require_edit else BorrowStatus.rejected,
+        admin_note=data.admin_note
+    )
 
-    db.commit()
+    await db.commit()
 
     # Load relationships
-    result = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == request_id).first()
+    result = await load_borrow_request(db, request_id)
 
     return result
 
 @router.put("/{request_id}/return", response_model=BorrowRequestResponse)
 async def return_books(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Xác nhận trả sách (Admin only)"""
-    request = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items)
-    ).filter(BorrowRequest.id == request_id).first()
+    await check_request_status(
+        db, request_id, BorrowStatus.approved,
+        "Chỉ có thể trả sách với phiếu mượn đã được duyệt"
+    )
 
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Không tìm thấy phiếu mượn"
+    async def return_request():
+        # Bỏ cờ quá hạn (trừ bộ đếm) rồi cập nhật trạng thái
+        await clear_overdue(db, [request_id])
+        await transition_request(
+            db, request_id, BorrowStatus.approved,
+            "Chỉ có thể trả sách với phiếu mượn đã được duyệt",
+            status=BorrowStatus.returned,
+            returned_at=datetime.utcnow(),
+            is_overdue=False
         )
 
-    if request.status != BorrowStatus.approved:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Chỉ có thể trả sách với phiếu mượn đã được duyệt"
+        # Tăng số lượng available
+        await release_books(db, await request_quantities(db, request_id))
+
+    await run_with_retry(db, return_request)
+    await invalidate_catalog()
+
+    # Load relationships
+    result = await load_borrow_request(db, request_id)
+
+    return result
+
+@router.post("/bulk/approve", response_model=BorrowBulkResponse)
+async def bulk_approve_borrow_requests(
+    data: BorrowBulkApprove,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Duyệt nhiều phiếu mượn trong một giao dịch (Admin only).
+    Phiếu không tồn tại, sai trạng thái hoặc thiếu sách được báo lỗi riêng, các phiếu còn lại vẫn được duyệt.
+    """
+    request_ids = unique_request_ids(data.request_ids)
+
+    async def approve():
+        eligible, failures = await partition_requests(
+            db, request_ids, BorrowStatus.pending,
+            "Chỉ có thể duyệt phiếu mượn đang chờ duyệt"
+        )
+        # Cấp phát sách theo thứ tự gửi lên, trừ tồn kho gộp theo sách
+        accepted, shortages = await reserve_for_requests(db, await quantities_by_request(db, eligible))
+        for request_id, exc in shortages.items():
+            failures[request_id] = (
+                f"Sách '{exc.title}' chỉ còn {exc.available} cuốn, không đủ {exc.requested} cuốn yêu cầu"
+            )
+        await transition_requests(
+            db, accepted, BorrowStatus.pending,
+            status=BorrowStatus.approved,
+            approved_at=datetime.utcnow(),
+            admin_note=data.admin_note
+        )
+        return accepted, failures
+
+    accepted, failures = await run_with_retry(db, approve)
+    if accepted:
+        await invalidate_catalog()
+
+    return bulk_response(request_ids, accepted, BorrowStatus.approved, failures)
+
+@router.post("/bulk/reject", response_model=BorrowBulkResponse)
+async def bulk_reject_borrow_requests(
+    data: BorrowBulkReject,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Từ chối hoặc yêu cầu chỉnh sửa nhiều phiếu mượn trong một giao dịch (Admin only)"""
+    request_ids = unique_request_ids(data.request_ids)
+    new_status = BorrowStatus.need_edit if data.require_edit else BorrowStatus.rejected
+
+    async def reject():
+        eligible, failures = await partition_requests(
+            db, request_ids, BorrowStatus.pending,
+            "Chỉ có thể xử lý phiếu mượn đang chờ duyệt"
+        )
+        await transition_requests(
+            db, eligible, BorrowStatus.pending,
+            status=new_status,
+            admin_note=data.admin_note
         )
+        return eligible, failures
 
-    # Tăng số lượng available
-    for item in request.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        book.available_quantity += item.quantity
+    rejected, failures = await run_with_retry(db, reject)
 
-    # Cập nhật trạng thái
-    request.status = BorrowStatus.returned
-    request.returned_at = datetime.utcnow()
+    return bulk_response(request_ids, rejected, new_status, failures)
 
-    db.commit()
+@router.post("/bulk/return", response_model=BorrowBulkResponse)
+async def bulk_return_books(
+    data: BorrowBulkReturn,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Xác nhận trả sách cho nhiều phiếu mượn trong một giao dịch (Admin only)"""
+    request_ids = unique_request_ids(data.request_ids)
 
-    # Load relationships
-    result = db.query(BorrowRequest).options(
-        joinedload(BorrowRequest.items).joinedload(BorrowItem.book),
-        joinedload(BorrowRequest.user)
-    ).filter(BorrowRequest.id == request_id).first()
+    async def return_requests():
+        eligible, failures = await partition_requests(
+            db, request_ids, BorrowStatus.approved,
+            "Chỉ có thể trả sách với phiếu mượn đã được duyệt"
+        )
+        await clear_overdue(db, eligible)
+        await transition_requests(
+            db, eligible, BorrowStatus.approved,
+            status=BorrowStatus.returned,
+            returned_at=datetime.utcnow(),
+            is_overdue=False
+        )
+        # Tăng số lượng available, gộp theo sách
+        await release_for_requests(db, await quantities_by_request(db, eligible))
+        return eligible, failures
 
-    return result
+    returned, failures = await run_with_retry(db, return_requests)
+    if returned:
+        await invalidate_catalog()
+
+    return bulk_response(request_ids, returned, BorrowStatus.returned, failures)
 
 @router.delete("/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_borrow_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Xóa/Hủy phiếu mượn (chỉ khi pending hoặc need_edit)"""
-    request = db.query(BorrowRequest).filter(BorrowRequest.id == request_id).first()
+    request = await db.scalar(select(BorrowRequest).where(BorrowRequest.id == request_id))
 
     if not request:
         raise HTTPException(
@@ -393,8 +916,21 @@ async def delete_borrow_request(
             detail="Chỉ có thể xóa phiếu mượn đang chờ duyệt, cần chỉnh sửa hoặc bị từ chối"
         )
 
-    db.delete(request)
-    db.commit()
+    # DELETE có điều kiện theo trạng thái vừa đọc: phiếu vừa được duyệt (đang giữ sách) thì không bị xóa
+    result = await db.execute(
+        delete(BorrowRequest)
+        .where(BorrowRequest.id == request_id, BorrowRequest.status == request.status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chỉ có thể xóa phiếu mượn đang chờ duyệt, cần chỉnh sửa hoặc bị từ chối"
+        )
+    await db.execute(delete(BorrowItem).where(BorrowItem.request_id == request_id))
+    await shift_borrow_status(db, request.status, None)
+    queue_borrow_event(db, request_id, request.user_id, None)
+    await db.commit()
 
     return None
 
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from ..config import settings
+from ..utils.dependencies import Principal, get_stream_user
+from ..utils.events import TOPICS, event_bus
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    topics: str = Query("books,borrows", description="Các topic cần nhận, phân cách bằng dấu phẩy: books, borrows"),
+    current_user: Principal = Depends(get_stream_user)
+):
+    """
+    Server-Sent Events: số lượng còn lại của sách (event "book") và trạng thái phiếu mượn (event "borrow")
+    ngay sau khi thay đổi được commit, thay cho việc tải lại danh sách định kỳ.
+    Độc giả chỉ nhận phiếu của mình, admin nhận mọi phiếu. Event "reset": đã lỡ sự kiện, client tải lại danh sách.
+    """
+    selected = {topic.strip() for topic in topics.split(",") if topic.strip()}
+    unknown = selected - set(TOPICS.values())
+    if not selected or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Topic không hợp lệ, chọn trong: {', '.join(TOPICS.values())}"
+        )
+    if event_bus.connections >= settings.SSE_MAX_CONNECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Quá nhiều kết nối, vui lòng thử lại sau",
+            headers={"Retry-After": str(max(settings.SSE_RETRY_MS // 1000, 1))}
+        )
+
+    return StreamingResponse(
+        event_bus.stream(
+            current_user.id, current_user.role.value == "admin", selected,
+            request.headers.get("last-event-id")
+        ),
+        media_type="text/event-stream",
+        # Proxy (nginx) không được buffer hoặc cache stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,100 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.user import User, UserRole
+from ..models.book import Book
+from ..models.borrow import BorrowRequest, BorrowItem, BorrowStatus, BorrowRequestArchive, BorrowItemArchive
+from ..utils.archive import reads_archive
+from ..utils.export import check_format, date_range_filters, export_response
+from ..utils.replicas import get_read_db
+from ..utils.dependencies import Principal, get_current_admin
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+FORMAT_QUERY = Query("csv", description="csv hoặc ndjson")
+
+def borrow_export_query(requests, items, filters: list):
+    """Câu select export phiếu mượn trên borrow_requests / borrow_items hoặc cặp bảng lưu trữ (cùng cột)"""
+    columns = [
+        requests.id.label("request_id"), requests.status, requests.created_at,
+        requests.approved_at, requests.due_date, requests.returned_at,
+        requests.user_id, User.username, User.full_name,
+        items.book_id, Book.title.label("book_title"), Book.isbn, items.quantity
+    ]
+    return (
+        select(*columns)
+        .join(User, User.id == requests.user_id)
+        .outerjoin(items, items.request_id == requests.id)
+        .outerjoin(Book, Book.id == items.book_id)
+        .where(*filters)
+        .order_by(requests.id, items.id)
+    )
+
+@router.get("/borrows")
+async def export_borrows(
+    format: str = FORMAT_QUERY,
+    status_filter: Optional[BorrowStatus] = None,
+    date_from: Optional[date] = Query(None, description="Ngày tạo phiếu từ (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Ngày tạo phiếu đến (YYYY-MM-DD, tính cả ngày này)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Xuất lịch sử mượn trả (Admin): mỗi dòng là một sách trong phiếu, kèm thông tin phiếu và độc giả.
+    Phiếu không có sách vẫn có một dòng (cột sách để trống).
+    Khoảng ngày chạm tới phần lưu trữ thì xuất phiếu đã lưu trữ trước, rồi tới borrow_requests (mỗi phần theo id).
+    """
+    fmt = check_format(format)
+    sources = [(BorrowRequest, BorrowItem)]
+    if await reads_archive(db, date_from, date_to):
+        sources.insert(0, (BorrowRequestArchive, BorrowItemArchive))
+    statements = []
+    for requests, items in sources:
+        filters = date_range_filters(requests.created_at, date_from, date_to)
+        if status_filter:
+            filters.append(requests.status == status_filter)
+        statements.append(borrow_export_query(requests, items, filters))
+    names = [column.key for column in statements[0].selected_columns]
+    return export_response(statements, names, fmt, "borrows")
+
+@router.get("/books")
+async def export_books(
+    format: str = FORMAT_QUERY,
+    category: Optional[str] = None,
+    date_from: Optional[date] = Query(None, description="Ngày thêm sách từ (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Ngày thêm sách đến (YYYY-MM-DD, tính cả ngày này)"),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Xuất catalogue sách (Admin)"""
+    fmt = check_format(format)
+    names = [
+        "id", "title", "author", "isbn", "category", "description",
+        "quantity", "available_quantity", "cover_image", "created_at", "updated_at"
+    ]
+    filters = date_range_filters(Book.created_at, date_from, date_to)
+    if category:
+        filters.append(Book.category == category)
+    stmt = select(*[Book.__table__.c[name] for name in names]).where(*filters).order_by(Book.id)
+    return export_response(stmt, names, fmt, "books")
+
+@router.get("/users")
+async def export_users(
+    format: str = FORMAT_QUERY,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    date_from: Optional[date] = Query(None, description="Ngày đăng ký từ (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Ngày đăng ký đến (YYYY-MM-DD, tính cả ngày này)"),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Xuất danh sách tài khoản (Admin), không kèm mật khẩu"""
+    fmt = check_format(format)
+    names = ["id", "username", "email", "full_name", "phone", "role", "is_active", "created_at"]
+    filters = date_range_filters(User.created_at, date_from, date_to)
+    if role:
+        filters.append(User.role == role)
+    if is_active is not None:
+        filters.append(User.is_active == is_active)
+    stmt = select(*[User.__table__.c[name] for name in names]).where(*filters).order_by(User.id)
+    return export_response(stmt, names, fmt, "users")
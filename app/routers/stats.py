@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select
+from ..utils.replicas import get_read_db, replica_router
+from ..models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from ..schemas.stats import DashboardStats
+from ..utils.stats import BOOKS, OVERDUE, READERS, borrow_counter, read_counters
+from ..utils.dependencies import Principal, get_current_admin
+from ..utils.metrics import pool_monitors
+from ..utils.overdue import sweep_state
+from ..utils.archive import archive_state
+from ..utils.events import event_bus
+
+router = APIRouter(prefix="/api/stats", tags=["Stats"])
+
+# Số phiếu mượn gần đây hiển thị trên dashboard
+RECENT_BORROWS = 5
+
+@router.get("/dashboard", response_model=DashboardStats)
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Số liệu tổng hợp cho dashboard admin trong một response (Admin only).
+    Các con số đọc từ bộ đếm được duy trì tăng dần, không COUNT(*) mỗi lần tải trang.
+    """
+    counters, checked_at = await read_counters(db)
+
+    recent = (await db.scalars(
+        select(BorrowRequest).options(
+            selectinload(BorrowRequest.items).selectinload(BorrowItem.book),
+            selectinload(BorrowRequest.user)
+        ).order_by(BorrowRequest.created_at.desc(), BorrowRequest.id.desc()).limit(RECENT_BORROWS)
+    )).all()
+
+    return DashboardStats(
+        total_books=counters[BOOKS],
+        total_readers=counters[READERS],
+        pending_borrows=counters[borrow_counter(BorrowStatus.pending)],
+        active_borrows=counters[borrow_counter(BorrowStatus.approved)],
+        overdue_borrows=counters[OVERDUE],
+        borrows_by_status={s.value: counters[borrow_counter(s)] for s in BorrowStatus},
+        recent_borrows=recent,
+        checked_at=checked_at
+    )
+
+@router.get("/db-pool")
+async def get_db_pool_stats(current_user: Principal = Depends(get_current_admin)):
+    """Số liệu connection pool của worker hiện tại: đang dùng, overflow, số lần chờ, timeout (Admin only)"""
+    return [monitor.stats() for monitor in pool_monitors.values()]
+
+@router.get("/replicas")
+async def get_replica_stats(current_user: Principal = Depends(get_current_admin)):
+    """Trạng thái read replica của worker hiện tại: khỏe/trễ, số lần đọc từ replica và primary (Admin only)"""
+    return replica_router.stats()
+
+@router.get("/overdue-sweep")
+async def get_overdue_sweep_stats(current_user: Principal = Depends(get_current_admin)):
+    """Lần quét phiếu quá hạn gần nhất của worker hiện tại: thời điểm, số phiếu gắn cờ, thời gian chạy (Admin only)"""
+    return sweep_state.stats()
+
+@router.get("/archive")
+async def get_archive_stats(current_user: Principal = Depends(get_current_admin)):
+    """Lần lưu trữ phiếu đã đóng gần nhất của worker hiện tại: số phiếu đã chuyển, thời gian chạy, lô lâu nhất (Admin only)"""
+    return archive_state.stats()
+
+@router.get("/events")
+async def get_event_stats(current_user: Principal = Depends(get_current_admin)):
+    """Server-Sent Events của worker hiện tại: số kết nối đang mở / cao nhất, số sự kiện đã phát, số lần reset (Admin only)"""
+    return event_bus.stats()
@@ -1,39 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_
 from typing import Optional, List
 from math import ceil
 from ..database import get_db
+from ..utils.replicas import get_read_db
 from ..models.user import User, UserRole
 from ..schemas.user import UserResponse, UserUpdate, UserResetPassword
-from ..utils.dependencies import get_current_admin
-from ..utils.auth import get_password_hash
+from ..utils.dependencies import Principal, get_current_admin, invalidate_principal
+from ..utils.auth import get_password_hash_async
+from ..utils.pagination import Keyset
+from ..utils.stats import READERS, adjust_counters
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
 @router.get("", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     search: Optional[str] = None,
     role: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    cursor: Optional[str] = Query(None, description="Phân trang theo con trỏ (created_at, id); để trống để lấy trang đầu"),
+    include_total: bool = Query(False, description="Trả tổng số trong header X-Total-Count"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
-    """Lấy danh sách độc giả (Admin only)"""
-    query = db.query(User)
+    """
+    Lấy danh sách độc giả (Admin only).
+    Chế độ cursor: con trỏ trang kế tiếp nằm trong header X-Next-Cursor.
+    """
+    query = select(User)
 
     # Lọc theo role
     if role:
-        query = query.filter(User.role == role)
+        query = query.where(User.role == role)
     else:
         # Mặc định chỉ hiển thị user, không hiển thị admin
-        query = query.filter(User.role == UserRole.user)
+        query = query.where(User.role == UserRole.user)
 
     # Tìm kiếm theo username, email, full_name
     if search:
         search_filter = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 User.username.ilike(search_filter),
                 User.email.ilike(search_filter),
@@ -41,19 +50,31 @@ async def get_users(
             )
         )
 
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        response.headers["X-Total-Count"] = str(total)
+
+    if cursor is not None:
+        keyset = Keyset([User.created_at, User.id])
+        users = (await db.scalars(keyset.apply(query, cursor, page_size))).all()
+        users, next_cursor = keyset.paginate(users, page_size)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return users
+
     # Pagination
-    users = query.offset((page - 1) * page_size).limit(page_size).all()
+    users = (await db.scalars(query.offset((page - 1) * page_size).limit(page_size))).all()
 
     return users
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Lấy thông tin độc giả theo ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,11 +86,11 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Cập nhật thông tin độc giả (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,8 +108,9 @@ async def update_user(
     for key, value in update_data.items():
         setattr(user, key, value)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_principal(user.id)
 
     return user
 
@@ -96,30 +118,31 @@ async def update_user(
 async def reset_password(
     user_id: int,
     data: UserResetPassword,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Reset mật khẩu độc giả (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy độc giả"
         )
 
-    user.password_hash = get_password_hash(data.new_password)
-    db.commit()
+    user.password_hash = await get_password_hash_async(data.new_password)
+    await db.commit()
+    await invalidate_principal(user.id)
 
     return {"message": "Đã reset mật khẩu thành công"}
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Xóa độc giả (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -133,8 +156,11 @@ async def delete_user(
             detail="Không thể xóa tài khoản của chính mình"
         )
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    if user.role == UserRole.user:
+        await adjust_counters(db, {READERS: -1})
+    await db.commit()
+    await invalidate_principal(user_id)
 
     return None
 
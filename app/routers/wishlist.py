@@ -1,24 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from ..database import get_db
-from ..models.user import User
+from ..utils.replicas import get_read_db
 from ..models.book import Book
 from ..models.wishlist import Wishlist
 from ..schemas.wishlist import WishlistAdd, WishlistUpdate, WishlistItemResponse, WishlistResponse
-from ..utils.dependencies import get_current_user
+from ..utils.dependencies import Principal, get_current_user
 
 router = APIRouter(prefix="/api/wishlist", tags=["Wishlist"])
 
 @router.get("", response_model=WishlistResponse)
 async def get_wishlist(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Lấy danh sách wishlist của user"""
-    items = db.query(Wishlist).options(
-        joinedload(Wishlist.book)
-    ).filter(Wishlist.user_id == current_user.id).all()
+    items = (await db.scalars(
+        select(Wishlist).options(
+            selectinload(Wishlist.book)
+        ).where(Wishlist.user_id == current_user.id)
+    )).all()
 
     return WishlistResponse(
         items=items,
@@ -28,12 +32,12 @@ async def get_wishlist(
 @router.post("", response_model=WishlistItemResponse, status_code=status.HTTP_201_CREATED)
 async def add_to_wishlist(
     data: WishlistAdd,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Thêm sách vào wishlist"""
     # Kiểm tra sách tồn tại
-    book = db.query(Book).filter(Book.id == data.book_id).first()
+    book = await db.scalar(select(Book).where(Book.id == data.book_id))
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,16 +45,19 @@ async def add_to_wishlist(
         )
 
     # Kiểm tra đã có trong wishlist chưa
-    existing = db.query(Wishlist).filter(
-        Wishlist.user_id == current_user.id,
-        Wishlist.book_id == data.book_id
-    ).first()
+    existing = await db.scalar(
+        select(Wishlist).options(
+            selectinload(Wishlist.book)
+        ).where(
+            Wishlist.user_id == current_user.id,
+            Wishlist.book_id == data.book_id
+        )
+    )
 
     if existing:
         # Nếu đã có, cập nhật số lượng
         existing.quantity = data.quantity
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
         return existing
 
     # Tạo mới
@@ -61,13 +68,15 @@ async def add_to_wishlist(
     )
 
     db.add(wishlist_item)
-    db.commit()
-    db.refresh(wishlist_item)
+    await db.commit()
+    await db.refresh(wishlist_item)
 
     # Load relationship
-    wishlist_item = db.query(Wishlist).options(
-        joinedload(Wishlist.book)
-    ).filter(Wishlist.id == wishlist_item.id).first()
+    wishlist_item = await db.scalar(
+        select(Wishlist).options(
+            selectinload(Wishlist.book)
+        ).where(Wishlist.id == wishlist_item.id).execution_options(populate_existing=True)
+    )
 
     return wishlist_item
 
@@ -75,14 +84,16 @@ async def add_to_wishlist(
 async def update_wishlist_item(
     book_id: int,
     data: WishlistUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Cập nhật số lượng sách trong wishlist"""
-    item = db.query(Wishlist).filter(
-        Wishlist.user_id == current_user.id,
-        Wishlist.book_id == book_id
-    ).first()
+    item = await db.scalar(
+        select(Wishlist).where(
+            Wishlist.user_id == current_user.id,
+            Wishlist.book_id == book_id
+        )
+    )
 
     if not item:
         raise HTTPException(
@@ -92,35 +103,39 @@ async def update_wishlist_item(
 
     if data.quantity <= 0:
         # Nếu quantity = 0, xóa khỏi wishlist
-        db.delete(item)
-        db.commit()
+        await db.delete(item)
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_204_NO_CONTENT,
             detail="Đã xóa sách khỏi wishlist"
         )
 
     item.quantity = data.quantity
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
 
     # Load relationship
-    item = db.query(Wishlist).options(
-        joinedload(Wishlist.book)
-    ).filter(Wishlist.id == item.id).first()
+    item = await db.scalar(
+        select(Wishlist).options(
+            selectinload(Wishlist.book)
+        ).where(Wishlist.id == item.id).execution_options(populate_existing=True)
+    )
 
     return item
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_from_wishlist(
     book_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Xóa sách khỏi wishlist"""
-    item = db.query(Wishlist).filter(
-        Wishlist.user_id == current_user.id,
-        Wishlist.book_id == book_id
-    ).first()
+    item = await db.scalar(
+        select(Wishlist).where(
+            Wishlist.user_id == current_user.id,
+            Wishlist.book_id == book_id
+        )
+    )
 
     if not item:
         raise HTTPException(
@@ -128,19 +143,19 @@ async def remove_from_wishlist(
             detail="Không tìm thấy sách trong wishlist"
         )
 
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
 
     return None
 
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_wishlist(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Xóa toàn bộ wishlist"""
-    db.query(Wishlist).filter(Wishlist.user_id == current_user.id).delete()
-    db.commit()
+    await db.execute(delete(Wishlist).where(Wishlist.user_id == current_user.id))
+    await db.commit()
 
     return None
 
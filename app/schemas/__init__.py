@@ -3,3 +3,4 @@ from .book import *
 from .wishlist import *
 from .borrow import *
 
+from .stats import *
@@ -36,11 +36,59 @@ class BookResponse(BookBase):
     class Config:
         from_attributes = True
 
+# Schema cho danh mục kèm số lượng
+class CategoryCount(BaseModel):
+    name: str
+    book_count: int  # Số đầu sách
+    available_count: int  # Tổng số cuốn còn lại
+
+# Số kết quả theo danh mục cho kết quả tìm kiếm hiện tại
+class CategoryFacet(BaseModel):
+    name: str
+    count: int
+
 # Schema cho danh sách sách với pagination
 class BookListResponse(BaseModel):
     items: List[BookResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None khi không yêu cầu đếm (include_total=false)
+    page: Optional[int] = None  # None khi phân trang theo cursor
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Con trỏ cho trang kế tiếp (chế độ cursor)
+    facets: Optional[List[CategoryFacet]] = None  # Chỉ có khi facets=true
+
+# Sách rút gọn khi chọn trường (fields= / view=summary): chỉ có id và các trường được chọn
+class BookProjection(BaseModel):
+    id: int
+    title: Optional[str] = None
+    author: Optional[str] = None
+    isbn: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    quantity: Optional[int] = None
+    available_quantity: Optional[int] = None
+    cover_image: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# Danh sách sách khi chọn trường, cùng thông tin phân trang với BookListResponse
+class BookProjectionListResponse(BookListResponse):
+    items: List[BookProjection]
+
+
+# Lỗi của một dòng khi import sách
+class BookImportError(BaseModel):
+    row: int  # Thứ tự bản ghi trong file (bắt đầu từ 1, không tính dòng tiêu đề)
+    isbn: Optional[str] = None
+    detail: str
 
+# Kết quả import sách hàng loạt
+class BookImportReport(BaseModel):
+    processed: int = 0  # Số bản ghi đã đọc (tính từ start_row)
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0  # ISBN đã tồn tại khi on_conflict=skip
+    duplicates: int = 0  # ISBN lặp lại trong cùng lô (bản ghi sau ghi đè bản ghi trước)
+    failed: int = 0
+    last_row: int = 0  # Mọi bản ghi <= last_row đã được commit hoặc báo lỗi; truyền vào start_row để chạy tiếp
+    errors: List[BookImportError] = []  # Tối đa MAX_REPORTED_ERRORS lỗi đầu tiên
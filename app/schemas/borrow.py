@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, date
 from enum import Enum
 from .book import BookResponse
@@ -47,6 +47,31 @@ class BorrowReject(BaseModel):
     admin_note: str
     require_edit: bool = False  # True = need_edit, False = rejected
 
+# Schema cho thao tác hàng loạt (Admin)
+class BorrowBulkApprove(BaseModel):
+    request_ids: List[int]
+    admin_note: Optional[str] = None
+
+class BorrowBulkReject(BaseModel):
+    request_ids: List[int]
+    admin_note: str
+    require_edit: bool = False
+
+class BorrowBulkReturn(BaseModel):
+    request_ids: List[int]
+
+# Kết quả xử lý từng phiếu trong thao tác hàng loạt
+class BorrowBulkItemResult(BaseModel):
+    id: int
+    success: bool
+    status: Optional[BorrowStatus] = None  # Trạng thái mới nếu thành công
+    detail: Optional[str] = None  # Lý do nếu thất bại
+
+class BorrowBulkResponse(BaseModel):
+    results: List[BorrowBulkItemResult]
+    succeeded: int
+    failed: int
+
 # Schema response
 class BorrowRequestResponse(BaseModel):
     id: int
@@ -58,6 +83,7 @@ class BorrowRequestResponse(BaseModel):
     approved_at: Optional[datetime] = None
     due_date: Optional[date] = None
     returned_at: Optional[datetime] = None
+    is_overdue: bool = False  # Đang mượn và đã quá hạn trả (do job quét quá hạn gắn)
     items: List[BorrowItemResponse]
     user: Optional[UserResponse] = None
 
@@ -67,8 +93,45 @@ class BorrowRequestResponse(BaseModel):
 # Schema cho danh sách phiếu mượn
 class BorrowListResponse(BaseModel):
     items: List[BorrowRequestResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None khi không yêu cầu đếm (include_total=false)
+    page: Optional[int] = None  # None khi phân trang theo cursor
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Con trỏ cho trang kế tiếp (chế độ cursor)
+
+# Độc giả rút gọn trong phiếu khi chọn trường user
+class BorrowUserRef(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+
+# Phiếu rút gọn khi chọn trường (fields= / view=summary): chỉ có id và các trường được chọn,
+# không kèm items mà chỉ có số dòng sách và tổng số cuốn
+class BorrowProjection(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    status: Optional[BorrowStatus] = None
+    note: Optional[str] = None
+    admin_note: Optional[str] = None
+    created_at: Optional[datetime] = None
+    approved_at: Optional[datetime] = None
+    due_date: Optional[date] = None
+    returned_at: Optional[datetime] = None
+    is_overdue: Optional[bool] = None
+    item_count: Optional[int] = None
+    total_quantity: Optional[int] = None
+    user: Optional[BorrowUserRef] = None
+
+# Danh sách phiếu khi chọn trường, cùng thông tin phân trang với BorrowListResponse
+class BorrowProjectionListResponse(BorrowListResponse):
+    items: List[BorrowProjection]
+
+# Tóm tắt phiếu mượn của một độc giả (dashboard độc giả)
+class BorrowUserSummary(BaseModel):
+    user_id: int
+    by_status: Dict[str, int]
+    borrowing: int  # Số phiếu đang mượn
+    overdue: int  # Số phiếu đang mượn đã quá hạn
+    books_borrowed: int  # Tổng số cuốn đang mượn
+    next_due_date: Optional[date] = None  # Hạn trả gần nhất của các phiếu đang mượn
 
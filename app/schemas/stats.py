@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+from .borrow import BorrowRequestResponse
+
+# Schema cho dashboard admin
+class DashboardStats(BaseModel):
+    total_books: int
+    total_readers: int
+    pending_borrows: int
+    active_borrows: int
+    overdue_borrows: int = 0
+    borrows_by_status: Dict[str, int]
+    recent_borrows: List[BorrowRequestResponse]
+    checked_at: Optional[datetime] = None  # Lần đối chiếu bộ đếm gần nhất
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import DateTime, delete, func, insert, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.borrow import BorrowItem, BorrowItemArchive, BorrowRequest, BorrowRequestArchive, BorrowStatus
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái cuối: phiếu không còn thay đổi nên chuyển sang bảng lưu trữ được
+CLOSED_STATUSES = [BorrowStatus.returned, BorrowStatus.rejected]
+
+REQUEST_COLUMNS = [column.name for column in BorrowRequest.__table__.c]
+ITEM_COLUMNS = [column.name for column in BorrowItem.__table__.c]
+
+class ArchiveState:
+    """Kết quả lần lưu trữ gần nhất của worker hiện tại"""
+
+    def __init__(self):
+        self.last_run: Optional[datetime] = None
+        self.last_moved = 0
+        self.last_duration_ms = 0.0
+        self.max_batch_ms = 0.0
+        self.total_moved = 0
+
+    def stats(self) -> dict:
+        return {
+            "last_run": self.last_run,
+            "last_moved": self.last_moved,
+            "last_duration_ms": round(self.last_duration_ms, 2),
+            "max_batch_ms": round(self.max_batch_ms, 2),
+            "total_moved": self.total_moved,
+        }
+
+archive_state = ArchiveState()
+
+async def archive_batch(db: AsyncSession, borrow_status: BorrowStatus, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    """
+    Chuyển một lô phiếu borrow_status tạo và đóng trước cutoff (cũ nhất trước) cùng items sang bảng lưu trữ,
+    trong một giao dịch ngắn: chỉ khóa đúng các phiếu của lô, bộ đếm dashboard không đổi (đếm cả bảng lưu trữ).
+    Dừng giữa chừng thì chạy lại tiếp từ các phiếu còn lại.
+    """
+    ids = (await db.scalars(
+        select(BorrowRequest.id)
+        .where(
+            BorrowRequest.status == borrow_status,
+            BorrowRequest.created_at < cutoff,
+            or_(BorrowRequest.returned_at.is_(None), BorrowRequest.returned_at < cutoff),
+            # Giữ lại phiếu có id lớn nhất: SQLite (không AUTOINCREMENT) sẽ cấp lại id này cho phiếu mới
+            BorrowRequest.id < select(func.max(BorrowRequest.id)).scalar_subquery()
+        )
+        .order_by(BorrowRequest.created_at)
+        .limit(batch_size)
+    )).all()
+    if not ids:
+        return 0, 0
+    # Khóa theo khóa chính và kiểm tra lại trạng thái: worker khác có thể vừa chuyển / xóa phiếu
+    locked = (await db.scalars(
+        select(BorrowRequest.id)
+        .where(BorrowRequest.id.in_(ids), BorrowRequest.status == borrow_status)
+        .with_for_update()
+    )).all()
+    if locked:
+        await db.execute(insert(BorrowRequestArchive).from_select(
+            REQUEST_COLUMNS + ["archived_at"],
+            select(
+                *[BorrowRequest.__table__.c[name] for name in REQUEST_COLUMNS],
+                literal(datetime.utcnow(), DateTime())
+            ).where(BorrowRequest.id.in_(locked))
+        ))
+        await db.execute(insert(BorrowItemArchive).from_select(
+            ITEM_COLUMNS,
+            select(*[BorrowItem.__table__.c[name] for name in ITEM_COLUMNS]).where(BorrowItem.request_id.in_(locked))
+        ))
+        await db.execute(
+            delete(BorrowItem).where(BorrowItem.request_id.in_(locked)).execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(BorrowRequest).where(BorrowRequest.id.in_(locked)).execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return len(ids), len(locked)
+
+async def archive_closed(
+    session_factory, after_days: int, batch_size: int, now: Optional[datetime] = None, pause: float = 0.0
+) -> int:
+    """Lưu trữ các phiếu đã đóng cũ hơn after_days ngày theo lô, nghỉ pause giây giữa các lô; trả về số phiếu đã chuyển"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=after_days)
+    started = time.perf_counter()
+    moved = 0
+    async with session_factory() as db:
+        for borrow_status in CLOSED_STATUSES:
+            while True:
+                batch_started = time.perf_counter()
+                selected, count = await archive_batch(db, borrow_status, cutoff, batch_size)
+                archive_state.max_batch_ms = max(archive_state.max_batch_ms, (time.perf_counter() - batch_started) * 1000)
+                moved += count
+                if selected < batch_size:
+                    break
+                if pause:
+                    await asyncio.sleep(pause)
+    archive_state.last_run = datetime.utcnow()
+    archive_state.last_moved = moved
+    archive_state.last_duration_ms = (time.perf_counter() - started) * 1000
+    archive_state.total_moved += moved
+    return moved
+
+async def run_archive_job(session_factory, interval: int, after_days: int, batch_size: int):
+    """Chạy nền: mỗi interval giây lưu trữ các phiếu đã đóng cũ hơn after_days ngày"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            moved = await archive_closed(session_factory, after_days, batch_size)
+            if moved:
+                logger.info("Đã lưu trữ %d phiếu mượn đã đóng", moved)
+        except Exception:
+            logger.exception("Lỗi khi lưu trữ phiếu mượn")
+
+async def reads_archive(db: AsyncSession, date_from: Optional[date], date_to: Optional[date]) -> bool:
+    """
+    Danh sách / export chỉ đọc thêm bảng lưu trữ khi client hỏi một khoảng ngày (date_from / date_to)
+    bắt đầu không muộn hơn phiếu mới nhất đã lưu trữ (một lần đọc index created_at).
+    """
+    if date_from is None and date_to is None:
+        return False
+    newest = await db.scalar(select(func.max(BorrowRequestArchive.created_at)))
+    if newest is None:
+        return False
+    return date_from is None or datetime.combine(date_from, datetime.min.time()) <= newest
@@ -0,0 +1,273 @@
+import asyncio
+import csv
+import json
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import String, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.book import Book
+from ..schemas.book import BookCreate, BookImportError, BookImportReport
+from .events import queue_book_event
+from .search import build_book_search_text
+from .stats import BOOKS, BOOKS_VERSION, adjust_counters
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+CONFLICT_MODES = ("update", "skip")
+# Số lỗi tối đa giữ trong báo cáo (các lỗi sau chỉ được đếm)
+MAX_REPORTED_ERRORS = 1000
+
+# Độ dài tối đa của các cột chuỗi, kiểm tra trước để một dòng quá dài không làm hỏng cả lô
+_MAX_LENGTHS = {
+    column.name: column.type.length
+    for column in Book.__table__.columns
+    if isinstance(column.type, String) and column.type.length
+}
+
+def import_format(filename: Optional[str], fmt: Optional[str]) -> str:
+    """Định dạng file: lấy từ tham số format hoặc phần mở rộng (.csv, .ndjson, .jsonl)"""
+    if fmt is None and filename:
+        fmt = next((value for ext, value in IMPORT_FORMATS.items() if filename.lower().endswith(ext)), None)
+    if fmt not in IMPORT_FORMATS.values():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Định dạng không hỗ trợ, dùng csv hoặc ndjson"
+        )
+    return fmt
+
+def check_conflict_mode(on_conflict: str) -> str:
+    if on_conflict not in CONFLICT_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"on_conflict chỉ nhận {', '.join(CONFLICT_MODES)}"
+        )
+    return on_conflict
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Đọc từng bản ghi (không nạp cả file): trả về (số thứ tự, bản ghi, lỗi parse).
+    Số thứ tự bắt đầu từ 1, không tính dòng tiêu đề CSV và dòng trống NDJSON, nên ổn định giữa các lần chạy.
+    """
+    if fmt == "csv":
+        for row, record in enumerate(csv.DictReader(stream), start=1):
+            yield row, {key.strip().lower(): value for key, value in record.items() if key}, None
+        return
+    row = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row, None, f"JSON không hợp lệ: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Mỗi dòng phải là một object JSON"
+            continue
+        yield row, record, None
+
+def validate_record(record: dict) -> BookCreate:
+    """Kiểm tra một bản ghi theo đúng schema của API thêm sách; lỗi trả về ValueError"""
+    cleaned = {}
+    for key, value in record.items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        cleaned[key] = value
+    if cleaned.get("quantity") is None:
+        cleaned.pop("quantity", None)
+    try:
+        book = BookCreate.model_validate(cleaned)
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        ))
+    if book.quantity < 0:
+        raise ValueError("quantity: phải >= 0")
+    for name, limit in _MAX_LENGTHS.items():
+        value = getattr(book, name, None)
+        if value is not None and len(value) > limit:
+            raise ValueError(f"{name}: dài quá {limit} ký tự")
+    return book
+
+def read_batch(
+    records: Iterator[Tuple[int, Optional[dict], Optional[str]]],
+    batch: List[Tuple[int, BookCreate]],
+    start_row: int,
+    limit: int
+) -> Tuple[int, List[BookImportError], Optional[int], bool]:
+    """
+    Đọc tối đa limit bản ghi sau start_row, thêm bản ghi hợp lệ vào batch, dừng sớm khi batch đủ limit.
+    Trả về (số bản ghi đã đọc, lỗi, số thứ tự bản ghi cuối đã đọc, đã hết file chưa).
+    Hàm đồng bộ: import_books chạy trong thread để đọc file, parse và validate không chặn event loop.
+    """
+    processed, errors, last_row = 0, [], None
+    for row, record, error in records:
+        if row <= start_row:
+            continue
+        processed += 1
+        last_row = row
+        if error is None:
+            try:
+                batch.append((row, validate_record(record)))
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            isbn = (record or {}).get("isbn")
+            errors.append(BookImportError(row=row, isbn=None if isbn is None else str(isbn), detail=error))
+        if processed >= limit or len(batch) >= limit:
+            return processed, errors, last_row, False
+    return processed, errors, last_row, True
+
+async def _apply_batch(
+    db: AsyncSession,
+    items: List[Tuple[int, BookCreate]],
+    on_conflict: str
+) -> Tuple[Dict[str, int], List[BookImportError]]:
+    """Ghi một lô: một SELECT khóa các ISBN đã có, một INSERT nhiều dòng và một UPDATE nhiều dòng theo id"""
+    isbns = [book.isbn for _, book in items if book.isbn]
+    existing = {}
+    if isbns:
+        existing = {
+            row.isbn: row
+            for row in (await db.execute(
+                select(Book.id, Book.isbn, Book.quantity, Book.available_quantity)
+                .where(Book.isbn.in_(isbns))
+                .with_for_update()
+            )).all()
+        }
+
+    inserts, updates, errors = [], [], []
+    skipped = 0
+    for row, book in items:
+        values = book.model_dump()
+        values["search_text"] = build_book_search_text(book.title, book.author, book.isbn)
+        current = existing.get(book.isbn) if book.isbn else None
+        if current is None:
+            inserts.append({**values, "available_quantity": book.quantity})
+        elif on_conflict == "skip":
+            skipped += 1
+        else:
+            # Giữ nguyên số sách đang được mượn, giống PUT /api/books/{id}
+            available = current.available_quantity + book.quantity - current.quantity
+            if available < 0:
+                errors.append(BookImportError(
+                    row=row, isbn=book.isbn, detail="Không thể giảm số lượng vì có sách đang được mượn"
+                ))
+                continue
+            updates.append({**values, "id": current.id, "available_quantity": available})
+
+    if inserts:
+        await db.execute(insert(Book.__table__), inserts)
+    if updates:
+        await db.execute(update(Book), updates)
+        # Số lượng đổi: đẩy số còn lại mới tới client (/api/events) khi lô được commit
+        for values in updates:
+            if values["quantity"] != existing[values["isbn"]].quantity:
+                queue_book_event(db, values["id"], values["quantity"], values["available_quantity"])
+    if inserts or updates:
+        await adjust_counters(db, {BOOKS: len(inserts), BOOKS_VERSION: 1})
+    return {"inserted": len(inserts), "updated": len(updates), "skipped": skipped}, errors
+
+async def write_batch(
+    db: AsyncSession,
+    batch: List[Tuple[int, BookCreate]],
+    on_conflict: str
+) -> Tuple[Dict[str, int], List[BookImportError]]:
+    """
+    Dedupe theo ISBN trong lô (bản ghi sau ghi đè bản ghi trước) rồi ghi và commit cả lô.
+    Nếu database từ chối lô, ghi lại từng bản ghi trong savepoint riêng để chỉ loại các bản ghi lỗi.
+    """
+    by_isbn: Dict[str, Tuple[int, BookCreate]] = {}
+    items = []
+    for row, book in batch:
+        if book.isbn:
+            by_isbn[book.isbn] = (row, book)
+        else:
+            items.append((row, book))
+    items = list(by_isbn.values()) + items
+    duplicates = len(batch) - len(items)
+
+    try:
+        counts, errors = await _apply_batch(db, items, on_conflict)
+        await db.commit()
+    except DBAPIError:
+        await db.rollback()
+        counts, errors = {"inserted": 0, "updated": 0, "skipped": 0}, []
+        for item in items:
+            try:
+                async with db.begin_nested():
+                    item_counts, item_errors = await _apply_batch(db, [item], on_conflict)
+            except DBAPIError as exc:
+                errors.append(BookImportError(row=item[0], isbn=item[1].isbn, detail=str(exc.orig)))
+                continue
+            errors.extend(item_errors)
+            for key, value in item_counts.items():
+                counts[key] += value
+        await db.commit()
+    counts["duplicates"] = duplicates
+    return counts, errors
+
+async def import_books(
+    db: AsyncSession,
+    stream: TextIO,
+    fmt: str,
+    batch_size: int,
+    on_conflict: str = "update",
+    start_row: int = 0,
+    on_progress: Optional[Callable[[BookImportReport], None]] = None,
+    on_error: Optional[Callable[[BookImportError], None]] = None
+) -> BookImportReport:
+    """
+    Pipeline import: parse -> validate -> dedupe theo ISBN -> upsert theo lô cố định, commit sau mỗi lô.
+    Đọc và validate từng lô trong thread (read_batch), chỉ phần ghi database chạy trên event loop.
+    Bỏ qua các bản ghi <= start_row (chạy tiếp sau lỗi bằng last_row của lần trước).
+    on_progress được gọi sau mỗi lô đã commit; on_error nhận mọi lỗi (mặc định giữ MAX_REPORTED_ERRORS lỗi đầu).
+    """
+    report = BookImportReport(last_row=start_row)
+
+    def record_error(error: BookImportError):
+        report.failed += 1
+        if on_error is not None:
+            on_error(error)
+        elif len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(error)
+
+    async def flush(batch: List[Tuple[int, BookCreate]], last_row: int):
+        counts, errors = await write_batch(db, batch, on_conflict)
+        report.inserted += counts["inserted"]
+        report.updated += counts["updated"]
+        report.skipped += counts["skipped"]
+        report.duplicates += counts["duplicates"]
+        for error in errors:
+            record_error(error)
+        report.last_row = last_row
+        if on_progress is not None:
+            on_progress(report)
+
+    records = read_records(stream, fmt)
+    batch: List[Tuple[int, BookCreate]] = []
+    row = start_row
+    done = False
+    while not done:
+        processed, errors, last_row, done = await asyncio.to_thread(read_batch, records, batch, start_row, batch_size)
+        report.processed += processed
+        for error in errors:
+            record_error(error)
+        if last_row is not None:
+            row = last_row
+        if len(batch) >= batch_size:
+            await flush(batch, row)
+            batch = []
+
+    if batch or row > report.last_row:
+        await flush(batch, row)
+    logger.info(
+        "Import sách: %s bản ghi, thêm %s, cập nhật %s, lỗi %s",
+        report.processed, report.inserted, report.updated, report.failed
+    )
+    return report
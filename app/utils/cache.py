@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Cache LRU trong bộ nhớ có TTL; mỗi key có thể gắn tag để xóa theo nhóm"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, tag = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, tag: Hashable = None):
+        if not self.enabled:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + self.ttl, tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Xóa mọi key gắn với tag, trả về số key bị xóa"""
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable):
+        value, expires_at, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+Handler = Callable[[str], Any]
+
+class InvalidationBus:
+    """
+    Phát sự kiện invalidate cache giữa các worker.
+    - Không cấu hình URL: chỉ gọi handler trong process hiện tại.
+    - CACHE_BROADCAST_URL=redis://...: gọi handler tại chỗ rồi publish qua Redis pub/sub để các worker khác
+      cùng nhận (cần cài thêm: pip install redis). Message của chính worker quay lại qua Redis được bỏ qua.
+      Mất kết nối Redis thì tự kết nối lại (backoff) và xóa cache tại chỗ (on_reconnect) vì có thể đã lỡ message.
+    """
+
+    CHANNEL_PREFIX = "library_ptit:invalidate:"
+    RECONNECT_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30.0
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        # Gắn vào mỗi message để nhận ra message của chính worker này
+        self.sender = uuid.uuid4().hex[:8]
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._reconnect_handlers: List[Callable[[], Any]] = []
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], Any]):
+        """handler được gọi sau khi kết nối lại Redis (xóa cache có thể đã lỡ invalidation)"""
+        self._reconnect_handlers.append(handler)
+
+    async def publish(self, channel: str, message: Any):
+        message = str(message)
+        # Worker hiện tại invalidate ngay, không chờ message quay lại từ Redis
+        self._dispatch(channel, message)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.publish(self.CHANNEL_PREFIX + channel, f"{self.sender}|{message}")
+        except Exception:
+            logger.exception("Không publish được invalidation qua Redis")
+
+    def _dispatch(self, channel: str, message: str):
+        for handler in self._handlers.get(channel, []):
+            handler(message)
+
+    async def start(self):
+        """Kết nối Redis và lắng nghe invalidation từ các worker khác"""
+        if not self.url or self._redis is not None:
+            return
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self.url)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        delay = self.RECONNECT_DELAY
+        connected = False
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.psubscribe(self.CHANNEL_PREFIX + "*")
+                if connected:
+                    self.reconnects += 1
+                    logger.warning("Đã kết nối lại Redis pub/sub, xóa cache tại chỗ")
+                    for handler in self._reconnect_handlers:
+                        handler()
+                connected = True
+                delay = self.RECONNECT_DELAY
+                async for event in pubsub.listen():
+                    if event.get("type") == "pmessage":
+                        self._receive(event["channel"], event["data"])
+                raise ConnectionError("Redis pub/sub đã đóng")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Mất kết nối Redis pub/sub, thử lại sau %.1fs", delay)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+
+    def _receive(self, channel, data):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(data, bytes):
+            data = data.decode()
+        sender, _, message = data.partition("|")
+        if sender == self.sender:
+            return
+        try:
+            self._dispatch(channel[len(self.CHANNEL_PREFIX):], message)
+        except Exception:
+            logger.exception("Lỗi khi xử lý invalidation %s", channel)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+invalidation_bus = InvalidationBus(settings.CACHE_BROADCAST_URL)
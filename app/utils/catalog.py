@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..models.book import Book
+from ..models.stats import LibraryStat
+from .cache import TTLCache, invalidation_bus
+from .http_cache import content_etag
+from .stats import BOOKS_VERSIONS
+
+@dataclass(frozen=True)
+class CategoryRegistry:
+    """Ảnh chụp danh mục: [(tên, số đầu sách, số cuốn còn lại)] theo tên, kèm ETag theo nội dung"""
+    categories: Tuple[Tuple[str, int, int], ...]
+    names_etag: str  # Chỉ đổi khi danh sách tên đổi
+    counts_etag: str  # Đổi khi số lượng đổi
+    version: Optional[int] = None  # books_version của dữ liệu đã đọc
+
+    def etag(self, with_counts: bool = False) -> str:
+        return self.counts_etag if with_counts else self.names_etag
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _, _ in self.categories]
+
+    @property
+    def book_counts(self) -> Dict[str, int]:
+        return {name: book_count for name, book_count, _ in self.categories}
+
+CATEGORY_KEY = "categories"
+
+# Cache của catalogue trong bộ nhớ: registry danh mục và response danh sách sách (dùng chung mọi user).
+# _generation tăng mỗi lần invalidate để không cache kết quả được tính từ dữ liệu cũ
+# (đọc trước khi invalidate nhưng ghi vào cache sau đó).
+category_cache = TTLCache(settings.CATEGORY_CACHE_TTL, 1)
+book_list_cache = TTLCache(settings.BOOK_LIST_CACHE_TTL, settings.BOOK_LIST_CACHE_SIZE)
+_generation = 0
+
+def _clear_catalog(_message: str = ""):
+    global _generation
+    _generation += 1
+    category_cache.clear()
+    book_list_cache.clear()
+
+invalidation_bus.subscribe("catalog", _clear_catalog)
+invalidation_bus.on_reconnect(_clear_catalog)
+
+def catalog_generation() -> int:
+    return _generation
+
+async def invalidate_catalog():
+    """Xóa cache catalogue (mọi worker nếu có CACHE_BROADCAST_URL); gọi sau khi commit thay đổi sách/tồn kho"""
+    await invalidation_bus.publish("catalog", "")
+
+async def catalog_version(db: AsyncSession) -> Optional[int]:
+    """
+    Phiên bản của bộ sưu tập sách (tổng các dòng phiên bản, một truy vấn theo khóa chính),
+    tăng trong cùng giao dịch với mọi thay đổi sách/tồn kho
+    """
+    version = await db.scalar(select(func.sum(LibraryStat.value)).where(LibraryStat.name.in_(BOOKS_VERSIONS)))
+    # MySQL trả SUM kiểu DECIMAL
+    return None if version is None else int(version)
+
+async def load_categories(db: AsyncSession) -> CategoryRegistry:
+    """
+    Lấy registry từ bộ nhớ nếu còn đúng books_version của session (một truy vấn theo khóa chính),
+    nếu không thì tính bằng một truy vấn GROUP BY. Registry tính từ replica đang trễ không ghi đè
+    registry mới hơn trong cache, nên invalidate không bị mất tác dụng.
+    """
+    version = await catalog_version(db)
+    cached = category_cache.get(CATEGORY_KEY)
+    if cached is not None and cached.version == version:
+        return cached
+
+    generation = _generation
+    rows = (await db.execute(
+        select(
+            Book.category,
+            func.count(Book.id),
+            func.coalesce(func.sum(Book.available_quantity), 0)
+        ).where(Book.category.isnot(None)).group_by(Book.category).order_by(Book.category)
+    )).all()
+    categories = tuple((name, int(book_count), int(available)) for name, book_count, available in rows)
+    registry = CategoryRegistry(
+        categories=categories,
+        names_etag=content_etag([name for name, _, _ in categories]),
+        counts_etag=content_etag(categories),
+        version=version
+    )
+
+    stale = cached is not None and None not in (cached.version, version) and version < cached.version
+    if generation == _generation and not stale:
+        category_cache.set(CATEGORY_KEY, registry)
+    return registry
@@ -1,17 +1,55 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from ..database import get_db
-from ..models.user import User
+from ..config import settings
+from ..database import AsyncSessionLocal, get_db
+from ..models.user import User, UserRole
 from .auth import decode_token
+from .cache import TTLCache, invalidation_bus
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+@dataclass(frozen=True)
+class Principal:
+    """Thông tin tối thiểu của user đã xác thực (được cache theo token)"""
+    id: int
+    role: UserRole
+    is_active: bool
+
+# Cache principal theo (user_id, token), gắn tag user_id để invalidate
+principal_cache = TTLCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+invalidation_bus.subscribe("principal", lambda user_id: principal_cache.invalidate_tag(int(user_id)))
+invalidation_bus.on_reconnect(principal_cache.clear)
+
+async def invalidate_principal(user_id: int):
+    """Xóa principal của user khỏi cache (mọi worker nếu có CACHE_BROADCAST_URL)"""
+    await invalidation_bus.publish("principal", user_id)
+
+async def load_principal(db: AsyncSession, token: str, user_id: int) -> Optional[Principal]:
+    """Lấy principal từ cache, nếu chưa có thì đọc từ database"""
+    key = (user_id, token)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    row = (await db.execute(
+        select(User.id, User.role, User.is_active).where(User.id == user_id)
+    )).first()
+    if row is None:
+        return None
+
+    principal = Principal(id=row.id, role=row.role, is_active=bool(row.is_active))
+    principal_cache.set(key, principal, tag=user_id)
+    return principal
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
     """Lấy user hiện tại từ token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,7 +65,7 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await load_principal(db, token, user_id)
     if user is None:
         raise credentials_exception
 
@@ -40,8 +78,8 @@ async def get_current_user(
     return user
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """Kiểm tra user hiện tại là admin"""
     if current_user.role.value != "admin":
         raise HTTPException(
@@ -52,8 +90,8 @@ async def get_current_admin(
 
 async def get_optional_user(
     token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_db)
+) -> Optional[Principal]:
     """Lấy user nếu có token (optional authentication)"""
     if not token:
         return None
@@ -66,6 +104,16 @@ async def get_optional_user(
     if user_id is None:
         return None
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await load_principal(db, token, user_id)
     return user if user and user.is_active else None
 
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None, description="Token khi client không gửi được header (EventSource)")
+) -> Principal:
+    """
+    Xác thực cho kết nối giữ lâu (SSE): token lấy từ header Authorization hoặc ?access_token=.
+    Dùng session riêng đóng ngay sau khi xác thực để kết nối không giữ connection database.
+    """
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(token or access_token or "", db)
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.book import Book
+from ..models.borrow import BorrowRequest, BorrowStatus
+from .cache import invalidation_bus
+from .serialization import dump_json
+
+# Loại sự kiện -> topic client đăng ký qua ?topics=
+BOOK_EVENT = "book"
+BORROW_EVENT = "borrow"
+TOPICS = {BOOK_EVENT: "books", BORROW_EVENT: "borrows"}
+
+# Key trong session.info giữ các sự kiện chờ commit
+SESSION_KEY = "events"
+# Mọi kết nối admin chờ chung một key; độc giả chờ theo user_id
+ADMIN_KEY = "admin"
+
+class EventBus:
+    """
+    Phát sự kiện Server-Sent Events cho mọi kết nối của worker hiện tại.
+    Sự kiện được render sẵn một lần thành frame SSE và giữ trong bộ đệm vòng SSE_HISTORY sự kiện gần nhất;
+    mỗi kết nối chỉ chờ một future, đăng ký chung và theo người nhận (user_id của độc giả, hoặc chung cho admin),
+    nên publish không phải chép sự kiện vào hàng đợi riêng của từng kết nối, sự kiện phiếu mượn chỉ đánh thức
+    chủ phiếu và admin, và kết nối nhàn rỗi chỉ tốn một generator đang chờ.
+    Heartbeat cũng dùng chung một task cho mọi kết nối.
+    """
+
+    def __init__(self, history: int, heartbeat: float):
+        # Đổi sau mỗi lần khởi động: Last-Event-ID của worker / lần chạy khác không dùng lại được
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.heartbeat = heartbeat
+        self.beat = 0
+        self._history: "deque[Tuple[int, str, Optional[int], bytes]]" = deque(maxlen=max(history, 1))
+        self._waiters: List[asyncio.Future] = []
+        self._waiters_by_key: Dict[Hashable, List[asyncio.Future]] = {}
+        self._wake_keys: Set[Hashable] = set()
+        self._wake_all = False
+        self._wake_scheduled = False
+        self._ticker: Optional[asyncio.Task] = None
+        self.closed = False
+        self.connections = 0
+        self.peak_connections = 0
+        self.published = 0
+        self.resets = 0
+
+    def publish(self, kind: str, data: dict, user_id: Optional[int] = None):
+        """Thêm sự kiện (user_id: chủ phiếu, chỉ chủ phiếu và admin nhận) và đánh thức các kết nối"""
+        self.seq += 1
+        frame = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (
+            self.epoch.encode(), self.seq, kind.encode(), dump_json(data)
+        )
+        self._history.append((self.seq, kind, user_id, frame))
+        self.published += 1
+        self._wake(None if user_id is None else (user_id, ADMIN_KEY))
+
+    def publish_many(self, events: Iterable[Tuple[str, Optional[int], dict]]):
+        for kind, user_id, data in events:
+            self.publish(kind, data, user_id)
+
+    def _register(self, key: Hashable) -> asyncio.Future:
+        """Future của một kết nối, được đánh thức bởi sự kiện chung (sách, heartbeat) hoặc sự kiện gửi riêng key"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._waiters_by_key.setdefault(key, []).append(waiter)
+        return waiter
+
+    def _wake(self, keys: Optional[Iterable[Hashable]] = None):
+        """
+        Đánh thức người nhận keys (None = mọi kết nối) ở vòng lặp kế tiếp: giao dịch vừa commit không phải chờ
+        đánh thức từng kết nối, và nhiều sự kiện phát liền nhau (vd trả sách hàng loạt) chỉ đánh thức mỗi kết nối một lần
+        """
+        if keys is None:
+            self._wake_all = True
+        elif not self._wake_all:
+            self._wake_keys.update(keys)
+        if self._wake_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._wake_now()
+            return
+        self._wake_scheduled = True
+        loop.call_soon(self._wake_now)
+
+    def _wake_now(self):
+        if self._wake_all:
+            waiters = self._waiters
+            self._waiters, self._waiters_by_key = [], {}
+        else:
+            # Future đã xong vẫn nằm trong danh sách chung tới lần đánh thức tất cả kế tiếp (sự kiện sách / heartbeat)
+            waiters = [
+                waiter for key in self._wake_keys for waiter in self._waiters_by_key.pop(key, ())
+            ]
+        self._wake_scheduled = self._wake_all = False
+        self._wake_keys.clear()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def events_after(self, seq: int) -> Optional[List[Tuple[int, str, Optional[int], bytes]]]:
+        """Các sự kiện sau seq; None nếu một phần đã bị đẩy khỏi bộ đệm (client phải tải lại danh sách)"""
+        if seq >= self.seq:
+            return []
+        if not self._history or self._history[0][0] > seq + 1:
+            return None
+        return list(islice(self._history, seq + 1 - self._history[0][0], None))
+
+    def resume_from(self, last_event_id: Optional[str]) -> Optional[int]:
+        """seq tiếp tục sau Last-Event-ID của lần kết nối trước; None nếu id thuộc worker / lần chạy khác"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+    async def stream(
+        self, user_id: int, is_admin: bool, topics: Iterable[str], last_event_id: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Frame SSE cho một kết nối: sự kiện sách cho mọi user, sự kiện phiếu mượn chỉ của user (admin nhận tất cả).
+        Kết nối lại với Last-Event-ID thì gửi tiếp các sự kiện bị lỡ, không được thì gửi "reset".
+        """
+        kinds = {kind for kind, topic in TOPICS.items() if topic in topics}
+        key = ADMIN_KEY if is_admin else user_id
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            yield b"retry: %d\n\n" % settings.SSE_RETRY_MS
+            cursor = self.seq
+            if last_event_id:
+                resumed = self.resume_from(last_event_id)
+                if resumed is None:
+                    yield self._reset_frame()
+                else:
+                    cursor = resumed
+            beat = self.beat
+            waiter = None
+            while not self.closed:
+                # Đăng ký trước khi đọc bộ đệm: sự kiện publish sau đó chắc chắn đánh thức kết nối này
+                if waiter is None or waiter.done():
+                    waiter = self._register(key)
+                events = self.events_after(cursor)
+                if events is None:
+                    cursor = self.seq
+                    yield self._reset_frame()
+                    continue
+                if events:
+                    cursor = events[-1][0]
+                    frames = [
+                        frame for _, kind, owner, frame in events
+                        if kind in kinds and (is_admin or owner is None or owner == user_id)
+                    ]
+                    if frames:
+                        beat = self.beat
+                        yield b"".join(frames)
+                    continue
+                if beat != self.beat:
+                    # Giữ kết nối qua proxy / load balancer khi không có sự kiện
+                    beat = self.beat
+                    yield b": ping\n\n"
+                    continue
+                await waiter
+        finally:
+            self.connections -= 1
+
+    def _reset_frame(self) -> bytes:
+        self.resets += 1
+        return b"id: %s-%d\nevent: reset\ndata: {}\n\n" % (self.epoch.encode(), self.seq)
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self.beat += 1
+            self._wake()
+
+    def start(self):
+        self.closed = False
+        if self._ticker is None and self.heartbeat > 0:
+            self._ticker = asyncio.create_task(self._tick())
+
+    def stop(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        # Đóng các kết nối đang chờ để server tắt không phải đợi client ngắt
+        self.closed = True
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "peak_connections": self.peak_connections,
+            "max_connections": settings.SSE_MAX_CONNECTIONS,
+            "published": self.published,
+            "buffered": len(self._history),
+            "resets": self.resets,
+            "heartbeat_seconds": self.heartbeat,
+        }
+
+event_bus = EventBus(settings.SSE_HISTORY, settings.SSE_HEARTBEAT_SECONDS)
+
+# Sự kiện của worker khác (qua CACHE_BROADCAST_URL): một message cho mỗi giao dịch đã commit
+invalidation_bus.subscribe("events", lambda message: event_bus.publish_many(json.loads(message)))
+_pending_publishes = set()
+
+def queue_event(db: AsyncSession, kind: str, data: dict, user_id: Optional[int] = None):
+    """Ghi sự kiện vào giao dịch hiện tại: chỉ được phát sau khi commit, rollback / thử lại thì bỏ"""
+    db.info.setdefault(SESSION_KEY, []).append((kind, user_id, data))
+
+async def queue_book_availability(db: AsyncSession, book_ids: Iterable[int]):
+    """Sự kiện số lượng còn lại của các sách (đọc lại trong cùng giao dịch, sau UPDATE)"""
+    book_ids = sorted(set(book_ids))
+    if not book_ids:
+        return
+    rows = await db.execute(
+        select(Book.id, Book.quantity, Book.available_quantity).where(Book.id.in_(book_ids))
+    )
+    for row in rows:
+        queue_book_event(db, row.id, row.quantity, row.available_quantity)
+
+def queue_book_event(db: AsyncSession, book_id: int, quantity: int, available_quantity: int):
+    queue_event(db, BOOK_EVENT, {"id": book_id, "quantity": quantity, "available_quantity": available_quantity})
+
+async def queue_borrow_status(db: AsyncSession, request_ids: List[int], new_status: BorrowStatus):
+    """Sự kiện đổi trạng thái của các phiếu (một truy vấn theo khóa chính để lấy chủ phiếu)"""
+    if not request_ids:
+        return
+    rows = await db.execute(
+        select(BorrowRequest.id, BorrowRequest.user_id).where(BorrowRequest.id.in_(request_ids))
+    )
+    for row in rows:
+        queue_borrow_event(db, row.id, row.user_id, new_status)
+
+def queue_borrow_event(db: AsyncSession, request_id: int, user_id: int, new_status: Optional[BorrowStatus]):
+    """new_status=None: phiếu đã bị xóa"""
+    queue_event(db, BORROW_EVENT, {
+        "id": request_id,
+        "user_id": user_id,
+        "status": new_status.value if new_status is not None else None,
+    }, user_id)
+
+@event.listens_for(Session, "after_commit")
+def _publish_queued(session: Session):
+    events: List = session.info.pop(SESSION_KEY, None)
+    if not events:
+        return
+    try:
+        loop = asyncio.get_running_loop() if settings.CACHE_BROADCAST_URL else None
+    except RuntimeError:
+        # Session đồng bộ ngoài event loop (script): process này không kết nối Redis, chỉ phát tại chỗ
+        loop = None
+    if loop is None:
+        event_bus.publish_many(events)
+        return
+    # Worker hiện tại phát ngay, các worker khác nhận qua Redis; giữ tham chiếu tới task tới khi publish xong
+    message = json.dumps(events, ensure_ascii=False, separators=(",", ":"))
+    task = loop.create_task(invalidation_bus.publish("events", message))
+    _pending_publishes.add(task)
+    task.add_done_callback(_pending_publishes.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_queued(session: Session):
+    session.info.pop(SESSION_KEY, None)
@@ -0,0 +1,91 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Enum
+from ..config import settings
+from .replicas import replica_router
+from .serialization import dump_json
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def check_format(fmt: str) -> str:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Định dạng không hỗ trợ: {fmt}. Cho phép: {', '.join(EXPORT_FORMATS)}"
+        )
+    return fmt
+
+def date_range_filters(column, date_from: Optional[date], date_to: Optional[date]) -> list:
+    """Lọc theo khoảng ngày [date_from, date_to] (tính cả ngày date_to)"""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from phải trước hoặc bằng date_to"
+        )
+    filters = []
+    if date_from:
+        filters.append(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        filters.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters
+
+def _csv_rows(rows: Iterable, enum_indexes: Sequence[int]) -> Iterable:
+    """Đổi cột Enum sang giá trị; các kiểu khác để csv tự ghi (None thành rỗng, datetime dạng 2026-01-31 08:00:00)"""
+    if not enum_indexes:
+        return rows
+    converted = []
+    for row in rows:
+        row = list(row)
+        for index in enum_indexes:
+            if row[index] is not None:
+                row[index] = row[index].value
+        converted.append(row)
+    return converted
+
+async def stream_rows(statements: Sequence, columns: List[str], fmt: str) -> AsyncIterator[bytes]:
+    """
+    Đọc kết quả bằng server-side cursor (stream_results + yield_per) theo từng lô EXPORT_BATCH_SIZE dòng
+    và ghi ngay ra response, nên bộ nhớ không phụ thuộc số dòng. Nhiều câu select (cùng cột) được đọc lần lượt.
+    Generator tự mở session riêng vì session của request có thể đóng trước khi response stream xong
+    (trên replica nếu có cấu hình).
+    """
+    async with await replica_router.open_session() as db:
+        if fmt == "csv":
+            enum_indexes = [
+                index for index, column in enumerate(statements[0].selected_columns) if isinstance(column.type, Enum)
+            ]
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # BOM để Excel đọc đúng tiếng Việt
+            buffer.write("\ufeff")
+            writer.writerow(columns)
+        for stmt in statements:
+            result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                if fmt == "csv":
+                    writer.writerows(_csv_rows(rows, enum_indexes))
+                    chunk = buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                else:
+                    chunk = b"".join(dump_json(dict(zip(columns, row))) + b"\n" for row in rows)
+                yield chunk
+        if fmt == "csv" and buffer.tell():
+            yield buffer.getvalue().encode()
+
+def export_response(stmt, columns: List[str], fmt: str, name: str) -> StreamingResponse:
+    """StreamingResponse tải về dạng file, vd borrows-20260101.csv; stmt là một câu select hoặc danh sách đọc lần lượt"""
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    statements = list(stmt) if isinstance(stmt, (list, tuple)) else [stmt]
+    return StreamingResponse(
+        stream_rows(statements, columns, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
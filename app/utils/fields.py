@@ -0,0 +1,35 @@
+from typing import Iterable, List, Optional, Sequence
+from fastapi import HTTPException, status
+
+def parse_fields(
+    fields: Optional[str],
+    view: Optional[str],
+    allowed: Sequence[str],
+    summary: Sequence[str]
+) -> Optional[List[str]]:
+    """
+    Chọn các trường trả về từ fields= (danh sách cách nhau bởi dấu phẩy) hoặc view=summary.
+    Trả về None nếu client muốn response đầy đủ như cũ; id luôn có trong kết quả.
+    """
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in names if name not in allowed]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Trường không hợp lệ: {', '.join(invalid)}. Cho phép: {', '.join(allowed)}"
+            )
+    elif view == "summary":
+        names = list(summary)
+    elif view in (None, "", "full"):
+        return None
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="view chỉ nhận giá trị summary hoặc full"
+        )
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
+
+def project_rows(rows: Iterable, names: Sequence[str]) -> List[dict]:
+    """Chuyển các Row của Core select thành dict chỉ gồm các trường được chọn (không qua Pydantic)"""
+    return [{name: getattr(row, name) for name in names} for row in rows]
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Request
+
+def content_etag(value) -> str:
+    """ETag mạnh từ hash nội dung, giống nhau giữa các worker"""
+    raw = json.dumps(value, ensure_ascii=False, default=str).encode()
+    return '"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+
+def http_date(value: datetime) -> str:
+    """Định dạng datetime (lưu dạng UTC không timezone) cho header Last-Modified"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Kiểm tra If-None-Match của client có khớp ETag hiện tại không (để trả 304)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    # So sánh yếu: bỏ tiền tố W/ (proxy nén response có thể đổi ETag thành weak)
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+def has_validators(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Đánh giá request có điều kiện theo RFC 9110: If-None-Match được ưu tiên,
+    chỉ xét If-Modified-Since khi client không gửi If-None-Match.
+    """
+    if "if-none-match" in request.headers:
+        return etag_matches(request, etag)
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # Last-Modified chỉ chính xác đến giây
+    return last_modified.replace(microsecond=0) <= since
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """Header cho response có thể kiểm tra lại: client luôn hỏi lại server nhưng thường nhận 304"""
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
@@ -0,0 +1,189 @@
+import asyncio
+import random
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple, TypeVar
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.book import Book
+from ..models.borrow import BorrowItem
+from .events import queue_book_availability
+from .stats import adjust_counters, books_version_counter
+
+T = TypeVar("T")
+
+# Mã lỗi MySQL: 1213 = deadlock, 1205 = lock wait timeout
+RETRYABLE_MYSQL_ERRORS = {1205, 1213}
+
+class InsufficientStock(Exception):
+    """Không đủ sách để duyệt phiếu"""
+
+    def __init__(self, book_id: int, title: str, available: int, requested: int):
+        super().__init__(f"Sách {book_id} chỉ còn {available} cuốn, yêu cầu {requested}")
+        self.book_id = book_id
+        self.title = title
+        self.available = available
+        self.requested = requested
+
+class InventoryConflict(Exception):
+    """Số lượng sách bị thay đổi đồng thời giữa lúc kiểm tra và cập nhật - cần thử lại"""
+
+def merge_quantities(items: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Gộp số lượng theo book_id (một phiếu có thể có nhiều dòng cùng sách)"""
+    totals: Dict[int, int] = defaultdict(int)
+    for book_id, quantity in items:
+        totals[book_id] += quantity
+    return dict(totals)
+
+async def request_quantities(db: AsyncSession, request_id: int) -> Dict[int, int]:
+    """Số lượng cần cho từng sách của một phiếu mượn"""
+    rows = await db.execute(
+        select(BorrowItem.book_id, BorrowItem.quantity).where(BorrowItem.request_id == request_id)
+    )
+    return merge_quantities(rows.all())
+
+async def quantities_by_request(db: AsyncSession, request_ids: List[int]) -> Dict[int, Dict[int, int]]:
+    """Số lượng cần cho từng sách của nhiều phiếu mượn, một truy vấn IN"""
+    totals: Dict[int, Dict[int, int]] = {request_id: {} for request_id in request_ids}
+    if not request_ids:
+        return totals
+    rows = await db.execute(
+        select(BorrowItem.request_id, BorrowItem.book_id, BorrowItem.quantity)
+        .where(BorrowItem.request_id.in_(request_ids))
+    )
+    for request_id, book_id, quantity in rows:
+        totals[request_id][book_id] = totals[request_id].get(book_id, 0) + quantity
+    return totals
+
+async def lock_books(db: AsyncSession, book_ids: Iterable[int]) -> Dict[int, Tuple]:
+    """Khóa các sách bằng SELECT ... FOR UPDATE theo thứ tự id (tránh deadlock), trả về {id: (id, title, available)}"""
+    book_ids = sorted(set(book_ids))
+    if not book_ids:
+        return {}
+    rows = (await db.execute(
+        select(Book.id, Book.title, Book.available_quantity)
+        .where(Book.id.in_(book_ids))
+        .order_by(Book.id)
+        .with_for_update()
+    )).all()
+    return {row.id: row for row in rows}
+
+async def apply_deltas(db: AsyncSession, deltas: Dict[int, int]):
+    """
+    Cộng delta vào available_quantity của nhiều sách trong một câu UPDATE.
+    Điều kiện available_quantity + delta >= 0 đảm bảo không bao giờ âm kể cả khi có
+    giao dịch khác chen vào; nếu số dòng cập nhật không đủ thì báo InventoryConflict.
+    """
+    if not deltas:
+        return
+    delta = case(deltas, value=Book.id)
+    result = await db.execute(
+        update(Book)
+        .where(Book.id.in_(sorted(deltas)), Book.available_quantity + delta >= 0)
+        .values(available_quantity=Book.available_quantity + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(deltas):
+        raise InventoryConflict()
+    # Tồn kho đổi thì ETag danh sách sách cũng phải đổi. Chỉ tăng dòng phiên bản của sách id nhỏ nhất:
+    # giao dịch cùng sách đó đã phải chờ nhau ở khóa sách, giao dịch trên sách khác không chờ thêm
+    await adjust_counters(db, {books_version_counter(min(deltas)): 1})
+    # Số lượng mới được đẩy tới client (/api/events) sau khi giao dịch commit
+    await queue_book_availability(db, deltas)
+
+async def reserve_books(db: AsyncSession, quantities: Dict[int, int]):
+    """
+    Giữ sách cho phiếu được duyệt.
+    Khóa toàn bộ sách liên quan bằng một câu SELECT ... FOR UPDATE (theo thứ tự id để
+    tránh deadlock), kiểm tra tồn kho rồi trừ tất cả trong một câu UPDATE.
+    """
+    if not quantities:
+        return
+    available = await lock_books(db, quantities)
+    for book_id, requested in quantities.items():
+        row = available.get(book_id)
+        if row is None or row.available_quantity < requested:
+            raise InsufficientStock(
+                book_id,
+                row.title if row else str(book_id),
+                row.available_quantity if row else 0,
+                requested
+            )
+    await apply_deltas(db, {book_id: -quantity for book_id, quantity in quantities.items()})
+
+async def release_books(db: AsyncSession, quantities: Dict[int, int]):
+    """Trả sách về kho (khi phiếu được trả) trong một câu UPDATE"""
+    await apply_deltas(db, quantities)
+
+async def reserve_for_requests(
+    db: AsyncSession,
+    per_request: Dict[int, Dict[int, int]]
+) -> Tuple[List[int], Dict[int, InsufficientStock]]:
+    """
+    Giữ sách cho nhiều phiếu cùng lúc (duyệt hàng loạt).
+    Khóa mọi sách liên quan một lần, cấp phát lần lượt theo thứ tự phiếu; phiếu thiếu sách
+    bị bỏ qua (không ảnh hưởng phiếu khác). Tồn kho được trừ gộp theo sách trong một câu UPDATE.
+    Trả về (danh sách phiếu được giữ sách, {phiếu: InsufficientStock}).
+    """
+    available = await lock_books(db, (book_id for quantities in per_request.values() for book_id in quantities))
+    remaining = {book_id: row.available_quantity for book_id, row in available.items()}
+    accepted: List[int] = []
+    shortages: Dict[int, InsufficientStock] = {}
+    for request_id, quantities in per_request.items():
+        short = next((
+            (book_id, requested) for book_id, requested in quantities.items()
+            if remaining.get(book_id, 0) < requested
+        ), None)
+        if short:
+            book_id, requested = short
+            row = available.get(book_id)
+            shortages[request_id] = InsufficientStock(
+                book_id, row.title if row else str(book_id), remaining.get(book_id, 0), requested
+            )
+            continue
+        for book_id, requested in quantities.items():
+            remaining[book_id] -= requested
+        accepted.append(request_id)
+    await apply_deltas(db, {
+        book_id: remaining[book_id] - row.available_quantity
+        for book_id, row in available.items() if remaining[book_id] != row.available_quantity
+    })
+    return accepted, shortages
+
+async def release_for_requests(db: AsyncSession, per_request: Dict[int, Dict[int, int]]):
+    """Trả sách của nhiều phiếu về kho, gộp theo sách trong một câu UPDATE"""
+    await release_books(db, merge_quantities(
+        (book_id, quantity) for quantities in per_request.values() for book_id, quantity in quantities.items()
+    ))
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, InventoryConflict):
+        return True
+    if isinstance(exc, OperationalError):
+        orig = exc.orig
+        code = orig.args[0] if orig is not None and orig.args else None
+        if code in RETRYABLE_MYSQL_ERRORS:
+            return True
+        return "database is locked" in str(orig)
+    return False
+
+async def run_with_retry(
+    db: AsyncSession,
+    operation: Callable[[], Awaitable[T]],
+    retries: int = 5,
+    base_delay: float = 0.02
+) -> T:
+    """
+    Chạy operation rồi commit; rollback và thử lại khi gặp deadlock/lock timeout
+    hoặc xung đột tồn kho. operation phải tự đọc lại dữ liệu cần thiết mỗi lần chạy.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = await operation()
+            await db.commit()
+            return result
+        except Exception as exc:
+            await db.rollback()
+            if attempt == retries or not is_retryable(exc):
+                raise
+            await asyncio.sleep(base_delay * (2 ** attempt) * (1 + random.random()))
@@ -0,0 +1,349 @@
+import bisect
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+# Logger riêng để có thể ghi slow query ra file/handler khác
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# Mốc histogram thời gian request (giây)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Số câu chậm nhất giữ lại cho mỗi request
+SLOWEST_KEPT = 3
+_MAX_STATEMENT_LENGTH = 300
+_MAX_PARAMS_LENGTH = 500
+
+class RequestStats:
+    """Số liệu database của một request: số câu SQL, tổng thời gian, các câu chậm nhất, thời gian chờ pool"""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.query_count = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.slow_queries = 0
+        self.slowest: List[Tuple[float, str]] = []
+
+    @property
+    def route(self) -> str:
+        return route_name(self.scope) if self.scope is not None else "-"
+
+    def add_query(self, duration: float, statement: str):
+        self.query_count += 1
+        self.db_time += duration
+        if len(self.slowest) < SLOWEST_KEPT or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """Header debug: X-DB-* và Server-Timing (hiện trong tab Network của trình duyệt)"""
+        headers = [
+            (b"x-db-query-count", str(self.query_count).encode()),
+            (b"x-db-time-ms", f"{self.db_time * 1000:.2f}".encode()),
+            (b"x-db-pool-wait-ms", f"{self.pool_wait * 1000:.2f}".encode()),
+            (b"server-timing", f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"'.encode()),
+        ]
+        for duration, statement in self.slowest:
+            text = " ".join(statement.split())[:200]
+            headers.append((b"x-db-slowest", f"{duration * 1000:.2f}ms {text}".encode("latin-1", "replace")))
+        return headers
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_db_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+def route_name(scope: dict) -> str:
+    """Template của route (vd /api/books/{book_id}) để số nhãn không tăng theo id"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+class RouteMetrics:
+    def __init__(self):
+        self.responses: Dict[int, int] = {}
+        self.duration_sum = 0.0
+        self.duration_buckets = [0] * len(DURATION_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.slow_queries = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.responses.values())
+
+class MetricsRegistry:
+    """Số liệu cộng dồn theo (method, route) của process hiện tại (mỗi worker uvicorn có số liệu riêng)"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.statements = 0
+        self.statement_time = 0.0
+        self.slow_statements = 0
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status_code: int, duration: float, stats: RequestStats):
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.responses[status_code] = metrics.responses.get(status_code, 0) + 1
+        metrics.duration_sum += duration
+        index = bisect.bisect_left(DURATION_BUCKETS, duration)
+        if index < len(DURATION_BUCKETS):
+            metrics.duration_buckets[index] += 1
+        metrics.queries += stats.query_count
+        metrics.db_time += stats.db_time
+        metrics.pool_wait += stats.pool_wait
+        metrics.slow_queries += stats.slow_queries
+
+    def render(self) -> str:
+        """Xuất theo định dạng text của Prometheus"""
+        lines = [
+            "# HELP process_start_time_seconds Thời điểm process khởi động",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {self.started_at:.3f}",
+            "# HELP db_statements_total Số câu SQL đã chạy (cả ngoài request)",
+            "# TYPE db_statements_total counter",
+            f"db_statements_total {self.statements}",
+            "# HELP db_statement_duration_seconds_total Tổng thời gian chạy SQL",
+            "# TYPE db_statement_duration_seconds_total counter",
+            f"db_statement_duration_seconds_total {self.statement_time:.6f}",
+            "# HELP db_slow_statements_total Số câu SQL vượt SLOW_QUERY_MS",
+            "# TYPE db_slow_statements_total counter",
+            f"db_slow_statements_total {self.slow_statements}",
+        ]
+        routes = sorted(self.routes.items())
+
+        lines += [
+            "# HELP http_requests_total Số request theo route và status",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), metrics in routes:
+            for status_code, count in sorted(metrics.responses.items()):
+                lines.append(f"http_requests_total{_labels(method, route, status=status_code)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Thời gian xử lý request",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in routes:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, metrics.duration_buckets):
+                cumulative += count
+                lines.append(f"http_request_duration_seconds_bucket{_labels(method, route, le=bound)} {cumulative}")
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method, route, le='+Inf')} {metrics.count}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(method, route)} {metrics.duration_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{_labels(method, route)} {metrics.count}")
+
+        per_route = [
+            ("db_queries_total", "Số câu SQL theo route (chia cho http_requests_total để ra số câu mỗi request)", "queries"),
+            ("db_query_duration_seconds_total", "Tổng thời gian SQL theo route", "db_time"),
+            ("db_pool_wait_seconds_total", "Tổng thời gian chờ lấy connection từ pool theo route", "pool_wait"),
+            ("db_slow_queries_total", "Số câu SQL chậm theo route", "slow_queries"),
+        ]
+        for name, help_text, attr in per_route:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), metrics in routes:
+                value = getattr(metrics, attr)
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{name}{_labels(method, route)} {value}")
+
+        pool_metrics = [
+            ("db_pool_size", "gauge", "Số connection cố định của pool", "size"),
+            ("db_pool_checked_out", "gauge", "Số connection đang được dùng", "checked_out"),
+            ("db_pool_checked_in", "gauge", "Số connection rảnh trong pool", "checked_in"),
+            ("db_pool_overflow", "gauge", "Số connection vượt pool_size đang mở", "overflow"),
+            ("db_pool_checkouts_total", "counter", "Số lần lấy connection", "checkouts"),
+            ("db_pool_waits_total", "counter", "Số lần phải chờ vì pool đã dùng hết", "waits"),
+            ("db_pool_timeouts_total", "counter", "Số lần chờ quá DB_POOL_TIMEOUT", "timeouts"),
+            ("db_pool_connects_total", "counter", "Số connection mới được mở", "connects"),
+            ("db_pool_invalidations_total", "counter", "Số connection bị hủy (mất kết nối, lỗi)", "invalidations"),
+        ]
+        pools = [monitor.stats() for monitor in pool_monitors.values()]
+        for name, kind, help_text, key in pool_metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for pool in pools:
+                if key in pool:
+                    lines.append(f'{name}{{engine="{_escape(pool["engine"])}"}} {pool[key]}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(method: str, route: str, **extra) -> str:
+    labels = {"method": method, "route": route, **extra}
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+metrics_registry = MetricsRegistry()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    metrics_registry.statements += 1
+    metrics_registry.statement_time += duration
+    stats = _current.get()
+    if stats is not None:
+        stats.add_query(duration, statement)
+
+    threshold = settings.SLOW_QUERY_MS
+    if threshold > 0 and duration * 1000 >= threshold:
+        metrics_registry.slow_statements += 1
+        route = "-"
+        if stats is not None:
+            stats.slow_queries += 1
+            route = f"{stats.scope.get('method')} {stats.route}" if stats.scope else stats.route
+        slow_query_logger.warning(
+            "Slow query %.1fms [%s]%s: %s | params=%s",
+            duration * 1000, route, " (executemany)" if executemany else "",
+            " ".join(statement.split())[:_MAX_STATEMENT_LENGTH],
+            repr(parameters)[:_MAX_PARAMS_LENGTH]
+        )
+
+class PoolStats:
+    """
+    Số liệu pool connection của một engine: số lần checkout, số lần phải chờ vì pool đã dùng hết
+    (pool_size + max_overflow), thời gian chờ, timeout, connection mới mở và connection bị hủy (vd mất kết nối).
+    """
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.max_checked_out = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        self._wrap(engine.pool)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def _wrap(self, pool):
+        """Bọc pool.connect() để đo thời gian chờ connection (kể cả mở connection mới)"""
+        connect = pool.connect
+
+        def timed_connect():
+            exhausted = _pool_exhausted(pool)
+            started = time.perf_counter()
+            try:
+                return connect()
+            except exc.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                waited = time.perf_counter() - started
+                self.checkouts += 1
+                if exhausted:
+                    self.waits += 1
+                    self.wait_time += waited
+                    self.max_wait = max(self.max_wait, waited)
+                checked_out = _pool_status(pool).get("checked_out", 0)
+                self.max_checked_out = max(self.max_checked_out, checked_out)
+                stats = _current.get()
+                if stats is not None:
+                    stats.pool_wait += waited
+
+        pool.connect = timed_connect
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "engine": self.name,
+            "pool_class": type(pool).__name__,
+            **_pool_status(pool),
+            "max_checked_out": self.max_checked_out,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "avg_wait_ms": round(self.wait_time / self.waits * 1000, 2) if self.waits else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+        }
+
+def _pool_status(pool) -> dict:
+    """Trạng thái hiện tại (QueuePool); các pool khác như NullPool/StaticPool không có số liệu này"""
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "max_overflow": getattr(pool, "_max_overflow", 0),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+def _pool_exhausted(pool) -> bool:
+    """Không còn connection rảnh và không được mở thêm: checkout này sẽ phải chờ"""
+    if not hasattr(pool, "checkedin"):
+        return False
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    return pool.checkedin() == 0 and max_overflow > -1 and pool.overflow() >= max_overflow
+
+pool_monitors: Dict[str, PoolStats] = {}
+
+def instrument_engine(engine: Engine, name: str):
+    """Gắn hook đo SQL và pool vào engine sync (với engine async truyền async_engine.sync_engine)"""
+    if name in pool_monitors:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    pool_monitors[name] = PoolStats(name, engine)
+
+class QueryMetricsMiddleware:
+    """
+    ASGI middleware: gom số liệu database của từng request (qua ContextVar mà hook engine ghi vào),
+    cộng vào metrics_registry; khi DEBUG bật thì trả kèm trong header X-DB-* / Server-Timing.
+    Với response stream, header chỉ tính các câu SQL chạy trước khi gửi header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_stats(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    message = {**message, "headers": list(message.get("headers", [])) + stats.headers()}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            metrics_registry.observe(
+                scope["method"], stats.route, status_code, time.perf_counter() - started, stats
+            )
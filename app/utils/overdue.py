@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import false, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.borrow import BorrowRequest, BorrowStatus
+from .stats import OVERDUE, adjust_counters
+
+logger = logging.getLogger(__name__)
+
+class SweepState:
+    """Kết quả lần quét quá hạn gần nhất của worker hiện tại"""
+
+    def __init__(self):
+        self.last_run: Optional[datetime] = None
+        self.last_flagged = 0
+        self.last_duration_ms = 0.0
+        self.total_flagged = 0
+
+    def stats(self) -> dict:
+        return {
+            "last_run": self.last_run,
+            "last_flagged": self.last_flagged,
+            "last_duration_ms": round(self.last_duration_ms, 2),
+            "total_flagged": self.total_flagged,
+        }
+
+sweep_state = SweepState()
+
+async def flag_overdue_batch(db: AsyncSession, today: date, batch_size: int) -> Tuple[int, int]:
+    """
+    Gắn cờ một lô phiếu đang mượn vừa quá hạn (due_date < today, chưa gắn cờ) và cộng bộ đếm, trong một giao dịch.
+    Chỉ đọc các phiếu chưa gắn cờ qua index (status, is_overdue, due_date), nên chi phí theo số phiếu vừa quá hạn,
+    không theo toàn bộ lịch sử. UPDATE có điều kiện: nhiều worker cùng quét không đếm trùng.
+    """
+    ids = (await db.scalars(
+        select(BorrowRequest.id)
+        .where(
+            BorrowRequest.status == BorrowStatus.approved,
+            BorrowRequest.is_overdue == false(),
+            BorrowRequest.due_date < today
+        )
+        .order_by(BorrowRequest.due_date)
+        .limit(batch_size)
+    )).all()
+    if not ids:
+        return 0, 0
+    result = await db.execute(
+        update(BorrowRequest)
+        .where(
+            BorrowRequest.id.in_(ids),
+            BorrowRequest.status == BorrowStatus.approved,
+            BorrowRequest.is_overdue == false()
+        )
+        .values(is_overdue=True)
+        .execution_options(synchronize_session=False)
+    )
+    await adjust_counters(db, {OVERDUE: result.rowcount})
+    await db.commit()
+    # (số phiếu đọc được, số phiếu thực sự gắn cờ - ít hơn nếu worker khác vừa gắn)
+    return len(ids), result.rowcount
+
+async def sweep_overdue(session_factory, batch_size: int, today: Optional[date] = None) -> int:
+    """Quét đến khi hết phiếu vừa quá hạn, mỗi lô một giao dịch; trả về số phiếu đã gắn cờ"""
+    today = today or date.today()
+    started = time.perf_counter()
+    flagged = 0
+    async with session_factory() as db:
+        while True:
+            selected, updated = await flag_overdue_batch(db, today, batch_size)
+            flagged += updated
+            if selected < batch_size:
+                break
+    sweep_state.last_run = datetime.utcnow()
+    sweep_state.last_flagged = flagged
+    sweep_state.last_duration_ms = (time.perf_counter() - started) * 1000
+    sweep_state.total_flagged += flagged
+    return flagged
+
+async def clear_overdue(db: AsyncSession, request_ids: List[int]):
+    """Trả sách: bỏ cờ quá hạn của các phiếu và trừ bộ đếm (gọi trong giao dịch trả sách, trước khi đổi trạng thái)"""
+    if not request_ids:
+        return
+    result = await db.execute(
+        update(BorrowRequest)
+        .where(
+            BorrowRequest.id.in_(request_ids),
+            BorrowRequest.status == BorrowStatus.approved,
+            BorrowRequest.is_overdue == true()
+        )
+        .values(is_overdue=False)
+        .execution_options(synchronize_session=False)
+    )
+    await adjust_counters(db, {OVERDUE: -result.rowcount})
+
+async def run_overdue_sweeper(session_factory, interval: int, batch_size: int):
+    """Chạy nền: quét ngay khi khởi động rồi định kỳ mỗi interval giây"""
+    while True:
+        try:
+            flagged = await sweep_overdue(session_factory, batch_size)
+            if flagged:
+                logger.info("Đã gắn cờ %d phiếu mượn quá hạn", flagged)
+        except Exception:
+            logger.exception("Lỗi khi quét phiếu mượn quá hạn")
+        await asyncio.sleep(interval)
@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, String, bindparam, tuple_
+from sqlalchemy.types import TypeDecorator
+
+class CursorDateTime(TypeDecorator):
+    """
+    DateTime dùng cho giá trị con trỏ.
+    SQLite lưu datetime dạng chuỗi: CURRENT_TIMESTAMP cho '2024-01-01 10:00:00' còn
+    SQLAlchemy mặc định bind '2024-01-01 10:00:00.000000', nên so sánh bằng sẽ sai.
+    isoformat(sep=" ") bỏ phần micro giây khi bằng 0 nên khớp cả hai dạng.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return value.isoformat(sep=" ")
+        return value
+
+class Keyset:
+    """
+    Phân trang theo con trỏ (keyset) trên một bộ cột duy nhất, vd (created_at, id).
+    Con trỏ là giá trị các cột của dòng cuối trang trước, mã hóa base64 (opaque với client).
+    Khác OFFSET: trang sau không phụ thuộc số dòng phía trước nên ổn định khi dữ liệu thay đổi
+    và chi phí không tăng theo độ sâu trang.
+    """
+
+    def __init__(self, columns: Sequence, descending: bool = False):
+        self.columns = list(columns)
+        self.descending = descending
+
+    def apply(self, stmt, cursor: Optional[str], limit: int):
+        """Thêm điều kiện sau con trỏ, ORDER BY và LIMIT (lấy dư 1 dòng để biết còn trang sau)"""
+        if cursor:
+            values = [
+                bindparam(None, value, type_=CursorDateTime()) if isinstance(value, datetime) else value
+                for value in self.decode(cursor)
+            ]
+            key = tuple_(*self.columns)
+            stmt = stmt.where(key < tuple_(*values) if self.descending else key > tuple_(*values))
+        order = [col.desc() if self.descending else col.asc() for col in self.columns]
+        return stmt.order_by(*order).limit(limit + 1)
+
+    def paginate(self, rows: List, limit: int):
+        """Cắt dòng dư, trả về (rows, next_cursor)"""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, self.encode([getattr(last, col.key) for col in self.columns])
+
+    def encode(self, values: List) -> str:
+        raw = json.dumps([
+            value.isoformat() if isinstance(value, (datetime, date)) else value
+            for value in values
+        ], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> List:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError
+            return [self._parse(col, value) for col, value in zip(self.columns, values)]
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Con trỏ phân trang không hợp lệ"
+            )
+
+    @staticmethod
+    def _parse(column, value):
+        if value is None:
+            return None
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return python_type(value)
@@ -0,0 +1,197 @@
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from ..config import settings, to_async_url
+from ..database import AsyncSessionLocal, client_key, pool_options
+from .cache import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# Số client được nhớ tối đa cho read-your-writes (quá thì dọn các mục đã hết hạn)
+MAX_STICKY_CLIENTS = 100_000
+
+async def replication_lag(conn: AsyncConnection) -> float:
+    """
+    Độ trễ (giây) của replica. MySQL: Seconds_Behind_Source của SHOW REPLICA STATUS
+    (SHOW SLAVE STATUS với MySQL < 8.0.22, cần quyền REPLICATION CLIENT); NULL = replication đã dừng.
+    Database không phải replica (vd SQLite hoặc MySQL độc lập dùng thay khi test) coi như không trễ.
+    """
+    if conn.dialect.name != "mysql":
+        await conn.execute(text("SELECT 1"))
+        return 0.0
+    try:
+        row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+    except DBAPIError:
+        row = (await conn.execute(text("SHOW SLAVE STATUS"))).mappings().first()
+    if row is None:
+        return 0.0
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return float("inf") if lag is None else float(lag)
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_engine(to_async_url(url), echo=False, **pool_options(url))
+        self.sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+        self.reads = 0
+        self.failures = 0
+
+    def mark_down(self, error: Exception):
+        if self.healthy:
+            logger.warning("Replica %s lỗi, chuyển sang đọc từ primary: %s", self.name, error)
+        self.healthy = False
+        self.error = str(error)
+        self.failures += 1
+
+    async def check(self):
+        """Kiểm tra kết nối và độ trễ; replica được dùng lại khi kiểm tra đạt"""
+        try:
+            async with self.engine.connect() as conn:
+                self.lag = await replication_lag(conn)
+        except (DBAPIError, OSError) as exc:
+            self.mark_down(exc)
+        else:
+            healthy = self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if healthy != self.healthy:
+                logger.warning("Replica %s %s (trễ %.1fs)", self.name, "hoạt động lại" if healthy else "trễ quá ngưỡng", self.lag)
+            self.healthy = healthy
+            self.error = None if healthy else f"Trễ {self.lag}s"
+        self.checked_at = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            "reads": self.reads,
+            "failures": self.failures,
+        }
+
+class ReplicaRouter:
+    """
+    Chọn database cho session chỉ đọc: luân phiên các replica đang khỏe;
+    về primary khi không có replica, replica lỗi/trễ, hoặc client vừa ghi trong REPLICA_STICKY_SECONDS giây.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas)
+        self._writers: Dict[str, float] = {}
+        self.primary_reads = 0
+        self.sticky_reads = 0
+
+    def record_write(self, key: str):
+        now = time.monotonic()
+        if len(self._writers) >= MAX_STICKY_CLIENTS:
+            self._writers = {client: until for client, until in self._writers.items() if until > now}
+        self._writers[key] = now + settings.REPLICA_STICKY_SECONDS
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        until = self._writers.get(key) if key else None
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._writers[key]
+            return False
+        return True
+
+    def choose(self, key: Optional[str]) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        if self.is_sticky(key):
+            self.sticky_reads += 1
+            return None
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    async def open_session(self, key: Optional[str] = None) -> AsyncSession:
+        """
+        Mở session đọc. Connection của replica được lấy ngay để nếu lỗi thì chuyển sang replica khác
+        hoặc primary trước khi handler chạy.
+        """
+        replica = self.choose(key)
+        while replica is not None:
+            session = replica.sessionmaker()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError) as exc:
+                await session.close()
+                replica.mark_down(exc)
+                replica = self.choose(key)
+                continue
+            replica.reads += 1
+            session.info["replica"] = replica
+            return session
+        self.primary_reads += 1
+        return AsyncSessionLocal()
+
+    async def run_monitor(self, interval: float):
+        """Kiểm tra định kỳ mọi replica (chạy nền trong lifespan)"""
+        while True:
+            await asyncio.gather(*(replica.check() for replica in self.replicas))
+            await asyncio.sleep(interval)
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "sticky_clients": len(self._writers),
+            "sticky_seconds": settings.REPLICA_STICKY_SECONDS,
+            "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+        }
+
+replica_router = ReplicaRouter(settings.REPLICA_URLS)
+
+# Client vừa ghi ở worker khác (qua CACHE_BROADCAST_URL) cũng được đọc từ primary
+invalidation_bus.subscribe("replica-sticky", replica_router.record_write)
+_pending_publishes = set()
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session: Session):
+    """Session của request (get_db) commit: các lần đọc sau của client này đi primary trong một thời gian ngắn"""
+    key = session.info.get("client")
+    if key is None or not replica_router.replicas:
+        return
+    replica_router.record_write(key)
+    if settings.CACHE_BROADCAST_URL:
+        task = asyncio.get_running_loop().create_task(invalidation_bus.publish("replica-sticky", key))
+        _pending_publishes.add(task)
+        task.add_done_callback(_pending_publishes.discard)
+
+async def get_read_db(request: Request):
+    """Dependency cho các API chỉ đọc: session trên replica (nếu có cấu hình) hoặc primary"""
+    db = await replica_router.open_session(client_key(request))
+    try:
+        yield db
+    except DBAPIError as exc:
+        # Mất kết nối giữa chừng: các request sau chuyển sang replica khác / primary ngay, không chờ lần kiểm tra kế
+        replica = db.info.get("replica")
+        if replica is not None and (exc.connection_invalidated or isinstance(exc, OperationalError)):
+            replica.mark_down(exc)
+        raise
+    finally:
+        await db.close()
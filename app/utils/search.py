@@ -0,0 +1,71 @@
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, column, table, text
+
+# Bảng FTS5 dùng cho SQLite (MySQL dùng FULLTEXT index trên books.search_text)
+books_fts = table("books_fts", column("rowid"), column("search_text"))
+
+# MySQL mặc định bỏ qua token ngắn hơn innodb_ft_min_token_size (3)
+MYSQL_MIN_TOKEN_LEN = 3
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+def normalize_search_text(value: Optional[str]) -> str:
+    """Chuẩn hóa chuỗi để tìm kiếm: bỏ dấu tiếng Việt, chữ thường, chỉ giữ chữ và số"""
+    if not value:
+        return ""
+    value = value.replace("đ", "d").replace("Đ", "D")
+    value = unicodedata.normalize("NFD", value)
+    value = "".join(ch for ch in value if unicodedata.category(ch) != "Mn")
+    return _NON_WORD.sub(" ", value.lower()).strip()
+
+def build_book_search_text(title: Optional[str], author: Optional[str], isbn: Optional[str]) -> str:
+    """Nội dung cột books.search_text được đánh index"""
+    return " ".join(
+        part for part in (
+            normalize_search_text(title),
+            normalize_search_text(author),
+            normalize_search_text(isbn)
+        ) if part
+    )
+
+def search_terms(query: str) -> List[str]:
+    return normalize_search_text(query).split()
+
+def apply_book_search(stmt, search: str, dialect: str, book_table) -> Tuple[object, Optional[object]]:
+    """
+    Thêm điều kiện tìm kiếm vào câu select trên bảng books.
+    Trả về (stmt, rank) - rank là biểu thức sắp xếp theo độ liên quan (None nếu không có).
+    Mỗi từ khóa được so khớp theo tiền tố, không phân biệt dấu.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return stmt, None
+
+    search_col = book_table.c.search_text
+    # Từ quá ngắn so với index hoặc dialect không hỗ trợ: so khớp LIKE trên cột đã chuẩn hóa
+    like_terms = terms
+    rank = None
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = stmt.join(books_fts, books_fts.c.rowid == book_table.c.id).where(
+            text("books_fts MATCH :fts_query").bindparams(fts_query=match)
+        )
+        rank = text("bm25(books_fts)")
+        like_terms = []
+    elif dialect in ("mysql", "mariadb"):
+        ft_terms = [term for term in terms if len(term) >= MYSQL_MIN_TOKEN_LEN]
+        if ft_terms:
+            against = " ".join(f"+{term}*" for term in ft_terms)
+            score = search_col.match(against)
+            stmt = stmt.where(score)
+            rank = score.desc()
+        like_terms = [term for term in terms if len(term) < MYSQL_MIN_TOKEN_LEN]
+
+    if like_terms:
+        stmt = stmt.where(and_(*(
+            (" " + search_col).like(f"% {term}%") for term in like_terms
+        )))
+    return stmt, rank
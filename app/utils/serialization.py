@@ -0,0 +1,36 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Dict, Optional
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    # orjson là tùy chọn (pip install orjson): nhanh hơn json chuẩn nhiều lần với danh sách lớn
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Không serialize được {type(value).__name__}")
+
+def dump_json(payload) -> bytes:
+    """
+    Serialize response: model Pydantic dùng model_dump_json, dict/list (dựng từ Core select)
+    dùng orjson nếu có, không thì json chuẩn. Kết quả giống hệt model_dump_json của schema tương ứng.
+    """
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+def json_response(payload, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Trả JSON đã serialize sẵn, bỏ qua bước validate response_model và jsonable_encoder của FastAPI"""
+    return Response(content=dump_json(payload), media_type="application/json", headers=headers)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from sqlalchemy import text
+from ..config import settings
+from ..database import AsyncSessionLocal, async_engine, engine, warm_up_pool
+from ..migrations import LATEST_VERSION, current_version, upgrade
+from .catalog import load_categories
+from .stats import ensure_counters
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """
+    Trạng thái sẵn sàng nhận traffic của worker (GET /ready), tách khỏi còn sống (GET /health):
+    schema đúng phiên bản, pool đã mở sẵn connection, bộ đếm và cache danh mục đã được nạp.
+    """
+
+    STEPS = ("schema", "pool", "caches")
+
+    def __init__(self):
+        self.steps: Dict[str, bool] = {step: False for step in self.STEPS}
+        self.errors: Dict[str, str] = {}
+        self.started_at = time.monotonic()
+        self.ready_after: Optional[float] = None
+        # Các bước khởi động chạy nền đã thành công hết (bước lỗi được thử lại cho tới khi xong)
+        self.finished = False
+
+    @property
+    def ready(self) -> bool:
+        return all(self.steps.values())
+
+    def mark(self, step: str):
+        self.steps[step] = True
+        self.errors.pop(step, None)
+        if self.ready and self.ready_after is None:
+            self.ready_after = time.monotonic() - self.started_at
+            logger.info("Worker sẵn sàng sau %.2fs", self.ready_after)
+
+    def fail(self, step: str, error: str):
+        self.steps[step] = False
+        self.errors[step] = error
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "steps": self.steps,
+            "errors": self.errors,
+            "finished": self.finished,
+            "schema_version": LATEST_VERSION,
+            "ready_after_seconds": None if self.ready_after is None else round(self.ready_after, 3),
+        }
+
+readiness = Readiness()
+
+async def check_schema():
+    """Một truy vấn phiên bản thay cho việc kiểm tra từng bảng (create_all) ở mỗi worker"""
+    if settings.MIGRATE_ON_STARTUP:
+        try:
+            ran = await asyncio.to_thread(upgrade, engine)
+        finally:
+            engine.dispose()
+        if ran:
+            logger.info("Đã chạy migration %s", ran)
+    async with async_engine.connect() as conn:
+        version = await conn.run_sync(current_version)
+    if version is None or version < LATEST_VERSION:
+        readiness.fail(
+            "schema", f"Schema ở phiên bản {version or 0}, code cần {LATEST_VERSION}: chạy python scripts/migrate.py"
+        )
+        logger.error(readiness.errors["schema"])
+        return
+    readiness.mark("schema")
+
+# Thử lại các bước khởi động lỗi (database chưa sẵn sàng, schema chưa được migrate khi rolling deploy)
+PRIME_RETRY_DELAY = 1.0
+PRIME_RETRY_MAX_DELAY = 30.0
+
+async def prime():
+    """
+    Chạy nền sau khi worker bắt đầu nhận request: (tùy chọn) migration, kiểm tra phiên bản schema,
+    mở sẵn connection và nạp bộ đếm / cache danh mục. /ready trả 503 cho tới khi xong.
+    Bước lỗi được thử lại (backoff tới PRIME_RETRY_MAX_DELAY giây) cho tới khi mọi bước thành công.
+    """
+    steps = [
+        ("schema", check_schema),
+        ("pool", prime_pool),
+        ("caches", prime_caches),
+    ]
+    delay = PRIME_RETRY_DELAY
+    while True:
+        for step, func in steps:
+            if readiness.steps[step]:
+                continue
+            try:
+                await func()
+            except Exception as exc:
+                logger.exception("Khởi động: bước %s lỗi", step)
+                readiness.fail(step, str(exc) or type(exc).__name__)
+        if readiness.ready:
+            break
+        logger.warning("Khởi động: chưa sẵn sàng (%s), thử lại sau %.0fs", ", ".join(readiness.errors), delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, PRIME_RETRY_MAX_DELAY)
+    readiness.finished = True
+
+async def prime_pool():
+    await warm_up_pool(settings.DB_POOL_WARMUP)
+    readiness.mark("pool")
+
+async def prime_caches():
+    async with AsyncSessionLocal() as db:
+        if await ensure_counters(db):
+            logger.info("Đã khởi tạo bộ đếm dashboard")
+        await load_categories(db)
+    readiness.mark("caches")
+
+async def ping_database(timeout: float = 2.0) -> Optional[str]:
+    """Kiểm tra primary còn trả lời; trả về lỗi hoặc None"""
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+    except Exception as exc:
+        return str(exc) or type(exc).__name__
+    return None
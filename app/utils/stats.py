@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import case, func, insert, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.stats import LibraryStat
+from ..models.book import Book
+from ..models.user import User, UserRole
+from ..models.borrow import BorrowRequest, BorrowRequestArchive, BorrowStatus
+
+logger = logging.getLogger(__name__)
+
+BOOKS = "books"
+READERS = "readers"
+# Phiên bản bộ sưu tập sách (ETag cho danh sách sách): chỉ tăng, không bị job đối chiếu ghi đè.
+# Chia thành BOOKS_VERSION_SHARDS dòng theo book_id, phiên bản là tổng các dòng: duyệt / trả sách khác nhau
+# tăng các dòng khác nhau thay vì cùng chờ khóa một dòng (xem books_version_counter)
+BOOKS_VERSION = "books_version"
+BOOKS_VERSION_SHARDS = 16
+BOOKS_VERSIONS = [BOOKS_VERSION] + [f"{BOOKS_VERSION}_{shard}" for shard in range(1, BOOKS_VERSION_SHARDS)]
+
+def books_version_counter(book_id: int) -> str:
+    """Dòng phiên bản cần tăng khi sách book_id thay đổi"""
+    return BOOKS_VERSIONS[book_id % BOOKS_VERSION_SHARDS]
+
+def borrow_counter(status: BorrowStatus) -> str:
+    """Tên bộ đếm số phiếu mượn theo trạng thái, vd borrows_pending"""
+    return f"borrows_{BorrowStatus(status).value}"
+
+# Số phiếu đang mượn đã quá hạn (cờ is_overdue do job quét quá hạn gắn, xem utils/overdue.py)
+OVERDUE = "borrows_overdue"
+
+COUNTERS = [BOOKS, READERS, OVERDUE] + [borrow_counter(s) for s in BorrowStatus]
+
+async def adjust_counters(db: AsyncSession, deltas: Dict[str, int]):
+    """
+    Cộng delta vào các bộ đếm trong một câu UPDATE, chạy trong giao dịch của thao tác gốc
+    nên bộ đếm chỉ thay đổi khi thao tác được commit.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await db.execute(
+        update(LibraryStat)
+        .where(LibraryStat.name.in_(sorted(deltas)))
+        .values(value=LibraryStat.value + case(deltas, value=LibraryStat.name))
+        .execution_options(synchronize_session=False)
+    )
+
+async def shift_borrow_status(db: AsyncSession, old: Optional[BorrowStatus], new: Optional[BorrowStatus], count: int = 1):
+    """Chuyển count phiếu từ trạng thái old sang new (None = phiếu mới tạo / bị xóa)"""
+    deltas: Dict[str, int] = {}
+    if old is not None:
+        deltas[borrow_counter(old)] = -count
+    if new is not None:
+        deltas[borrow_counter(new)] = deltas.get(borrow_counter(new), 0) + count
+    await adjust_counters(db, deltas)
+
+async def read_counters(db: AsyncSession) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """Đọc tất cả bộ đếm trong một truy vấn, trả về ({tên: giá trị}, lần đối chiếu gần nhất)"""
+    rows = (await db.execute(select(LibraryStat.name, LibraryStat.value, LibraryStat.checked_at))).all()
+    values = {name: 0 for name in COUNTERS}
+    values.update({row.name: row.value for row in rows if row.name in values})
+    checked = [row.checked_at for row in rows if row.checked_at is not None]
+    return values, min(checked) if checked else None
+
+async def compute_counters(db: AsyncSession) -> Dict[str, int]:
+    """Đếm lại giá trị thật từ các bảng gốc (dùng cho job đối chiếu)"""
+    values = {name: 0 for name in COUNTERS}
+    values[BOOKS] = await db.scalar(select(func.count(Book.id)))
+    values[READERS] = await db.scalar(select(func.count(User.id)).where(User.role == UserRole.user))
+    # Phiếu đã lưu trữ (utils/archive.py) vẫn được tính: job lưu trữ không đổi bộ đếm
+    for model in (BorrowRequest, BorrowRequestArchive):
+        rows = await db.execute(select(model.status, func.count(model.id)).group_by(model.status))
+        for borrow_status, count in rows:
+            if borrow_status is not None:
+                values[borrow_counter(borrow_status)] += count
+    values[OVERDUE] = await db.scalar(
+        select(func.count(BorrowRequest.id))
+        .where(BorrowRequest.status == BorrowStatus.approved, BorrowRequest.is_overdue == true())
+    )
+    return values
+
+async def recompute_counters(db: AsyncSession) -> Dict[str, Tuple[int, int]]:
+    """
+    Job đối chiếu: đếm lại và sửa bộ đếm, trả về {tên: (giá trị cũ, giá trị đúng)} cho các bộ đếm bị lệch.
+    Đọc bộ đếm và đếm lại trong cùng một giao dịch không khóa (cùng snapshot), rồi cộng phần lệch
+    (giá trị đúng - giá trị đã đọc) bằng một câu UPDATE trong giao dịch ngắn: delta của các giao dịch
+    commit trong lúc đếm được giữ nguyên, và thao tác ghi không phải chờ các truy vấn COUNT.
+    """
+    for attempt in range(2):
+        try:
+            stored = {
+                row.name: row.value
+                for row in (await db.execute(select(LibraryStat.name, LibraryStat.value))).all()
+            }
+            actual = await compute_counters(db)
+            await db.commit()
+
+            now = datetime.utcnow()
+            drift = {name: actual[name] - stored[name] for name in COUNTERS if name in stored and stored[name] != actual[name]}
+            existing = [name for name in COUNTERS if name in stored]
+            if existing:
+                values = {"checked_at": now}
+                if drift:
+                    values["value"] = LibraryStat.value + case(drift, value=LibraryStat.name, else_=0)
+                await db.execute(
+                    update(LibraryStat)
+                    .where(LibraryStat.name.in_(existing))
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            missing = [{"name": name, "value": actual[name], "checked_at": now} for name in COUNTERS if name not in stored]
+            missing += [{"name": name, "value": 0, "checked_at": None} for name in BOOKS_VERSIONS if name not in stored]
+            if missing:
+                await db.execute(insert(LibraryStat), missing)
+            await db.commit()
+            return {name: (stored[name], actual[name]) for name in drift}
+        except IntegrityError:
+            # Worker khác vừa tạo các dòng bộ đếm - chạy lại để cập nhật
+            await db.rollback()
+            if attempt:
+                raise
+
+async def ensure_counters(db: AsyncSession) -> bool:
+    """
+    Dùng lúc khởi động: chỉ đếm lại khi bộ đếm chưa được khởi tạo (database mới), trả về True nếu đã đếm.
+    Đã có thì để job đối chiếu định kỳ kiểm tra, không COUNT(*) các bảng lớn mỗi lần worker khởi động.
+    """
+    names = set(await db.scalars(select(LibraryStat.name)))
+    if names.issuperset(COUNTERS + BOOKS_VERSIONS):
+        return False
+    await recompute_counters(db)
+    return True
+
+async def run_consistency_job(session_factory, interval: int):
+    """Chạy nền: định kỳ đối chiếu bộ đếm và ghi log nếu phát hiện lệch"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                drift = await recompute_counters(db)
+            if drift:
+                logger.warning("Bộ đếm dashboard bị lệch và đã được sửa: %s", drift)
+        except Exception:
+            logger.exception("Lỗi khi đối chiếu bộ đếm dashboard")
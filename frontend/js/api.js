@@ -172,10 +172,12 @@ const authAPI = {
 
 // ===== BOOKS API =====
 const booksAPI = {
-    async getBooks(page = 1, pageSize = 10, search = '', category = '') {
-        let url = `${API_URL}/books?page=${page}&page_size=${pageSize}`;
+    async getBooks(page = 1, pageSize = 10, search = '', category = '', facets = false) {
+        // Trang danh sách chỉ cần các trường rút gọn; chi tiết sách lấy bằng getBook
+        let url = `${API_URL}/books?page=${page}&page_size=${pageSize}&view=summary`;
         if (search) url += `&search=${encodeURIComponent(search)}`;
         if (category) url += `&category=${encodeURIComponent(category)}`;
+        if (facets) url += '&facets=true';
 
         const response = await fetch(url, {
             headers: getHeaders(false)
@@ -190,8 +192,9 @@ const booksAPI = {
         return handleResponse(response);
     },
 
-    async getCategories() {
-        const response = await fetch(`${API_URL}/books/categories`, {
+    async getCategories(withCounts = false) {
+        const url = `${API_URL}/books/categories${withCounts ? '?with_counts=true' : ''}`;
+        const response = await fetch(url, {
             headers: getHeaders(false)
         });
         return handleResponse(response);
@@ -334,7 +337,8 @@ const wishlistAPI = {
 // ===== BORROWS API =====
 const borrowsAPI = {
     async getBorrows(page = 1, pageSize = 10, status = '', search = '') {
-        let url = `${API_URL}/borrows?page=${page}&page_size=${pageSize}`;
+        // Danh sách chỉ cần số đầu sách (item_count); chi tiết phiếu lấy bằng getBorrow
+        let url = `${API_URL}/borrows?page=${page}&page_size=${pageSize}&view=summary`;
         if (status) url += `&status_filter=${encodeURIComponent(status)}`;
         if (search) url += `&search=${encodeURIComponent(search)}`;
 
@@ -344,6 +348,14 @@ const borrowsAPI = {
         return handleResponse(response);
     },
 
+    async getSummary() {
+        // Số phiếu theo trạng thái, số đang mượn / quá hạn của người dùng hiện tại
+        const response = await fetch(`${API_URL}/borrows/summary`, {
+            headers: getHeaders()
+        });
+        return handleResponse(response);
+    },
+
     async getBorrow(requestId) {
         const response = await fetch(`${API_URL}/borrows/${requestId}`, {
             headers: getHeaders()
@@ -402,6 +414,24 @@ const borrowsAPI = {
         return handleResponse(response);
     },
 
+    async bulkApprove(requestIds, adminNote = '') {
+        const response = await fetch(`${API_URL}/borrows/bulk/approve`, {
+            method: 'POST',
+            headers: getHeaders(),
+            body: JSON.stringify({ request_ids: requestIds, admin_note: adminNote })
+        });
+        return handleResponse(response);
+    },
+
+    async bulkReturn(requestIds) {
+        const response = await fetch(`${API_URL}/borrows/bulk/return`, {
+            method: 'POST',
+            headers: getHeaders(),
+            body: JSON.stringify({ request_ids: requestIds })
+        });
+        return handleResponse(response);
+    },
+
     async deleteBorrow(requestId) {
         const response = await fetch(`${API_URL}/borrows/${requestId}`, {
             method: 'DELETE',
@@ -415,10 +445,67 @@ const borrowsAPI = {
     }
 };
 
+// ===== STATS API =====
+const statsAPI = {
+    async getDashboard() {
+        const response = await fetch(`${API_URL}/stats/dashboard`, {
+            headers: getHeaders()
+        });
+        return handleResponse(response);
+    }
+};
+
+// ===== EXPORT API =====
+const exportAPI = {
+    // Tải file xuất dữ liệu (borrows, books, users) với bộ lọc hiện tại
+    async download(resource, params = {}, format = 'csv') {
+        const query = new URLSearchParams({ format });
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== '' && value !== null && value !== undefined) query.append(key, value);
+        });
+        const response = await fetch(`${API_URL}/export/${resource}?${query}`, {
+            headers: getHeaders()
+        });
+        if (!response.ok) {
+            return handleResponse(response);
+        }
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="([^"]+)"/);
+        const url = URL.createObjectURL(await response.blob());
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = match ? match[1] : `${resource}.${format}`;
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        URL.revokeObjectURL(url);
+    }
+};
+
+// ===== EVENTS API =====
+const eventsAPI = {
+    // Server-Sent Events: nhận số lượng sách (book) / trạng thái phiếu mượn (borrow) ngay khi thay đổi
+    // thay vì tải lại danh sách. EventSource không gửi được header nên token đi qua query string;
+    // trình duyệt tự kết nối lại và nhận tiếp sự kiện bị lỡ, không được thì server gửi reset (tải lại danh sách)
+    connect(topics, handlers) {
+        const token = localStorage.getItem('token');
+        if (!token || typeof EventSource === 'undefined') return null;
+        const query = new URLSearchParams({ topics: topics.join(','), access_token: token });
+        const source = new EventSource(`${API_URL}/events?${query}`);
+        Object.entries(handlers).forEach(([name, handler]) => {
+            source.addEventListener(name, (event) => handler(JSON.parse(event.data)));
+        });
+        return source;
+    }
+};
+
 // Export tất cả
 window.authAPI = authAPI;
 window.booksAPI = booksAPI;
 window.usersAPI = usersAPI;
 window.wishlistAPI = wishlistAPI;
 window.borrowsAPI = borrowsAPI;
+window.statsAPI = statsAPI;
+window.exportAPI = exportAPI;
+window.eventsAPI = eventsAPI;
 
@@ -1,16 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.database import engine, Base
-from app.routers import auth_router, books_router, users_router, wishlist_router, borrows_router
+from app.config import settings
+from app.database import engine, AsyncSessionLocal, async_engine
+from app.routers import auth_router, books_router, users_router, wishlist_router, borrows_router, stats_router, exports_router, events_router
+from app.utils.cache import invalidation_bus
+from app.utils.events import event_bus
+from app.utils.metrics import QueryMetricsMiddleware, instrument_engine, metrics_registry
+from app.utils.archive import run_archive_job
+from app.utils.overdue import run_overdue_sweeper
+from app.utils.replicas import replica_router
+from app.utils.startup import ping_database, prime, readiness
+from app.utils.stats import run_consistency_job
 
-# Tạo tables trong database
-Base.metadata.create_all(bind=engine)
+# Schema được tạo / nâng cấp bằng python scripts/migrate.py (app/migrations), không create_all lúc import:
+# worker khởi động chỉ kiểm tra phiên bản schema (xem app/utils/startup.py)
+
+# Đếm số câu SQL, thời gian DB và thời gian chờ pool của từng request
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+for index, replica in enumerate(replica_router.replicas):
+    instrument_engine(replica.engine.sync_engine, f"replica-{index}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lắng nghe invalidation cache từ các worker khác (nếu có CACHE_BROADCAST_URL)
+    await invalidation_bus.start()
+    # Heartbeat chung cho mọi kết nối Server-Sent Events (/api/events)
+    event_bus.start()
+    # Kiểm tra schema, mở sẵn connection, nạp bộ đếm / cache chạy nền: worker nhận request ngay,
+    # /ready trả 503 cho tới khi xong
+    prime_job = asyncio.create_task(prime())
+    # Kiểm tra định kỳ độ trễ / kết nối của read replica
+    replica_job = None
+    if replica_router.replicas:
+        replica_job = asyncio.create_task(replica_router.run_monitor(settings.REPLICA_CHECK_INTERVAL))
+    stats_job = None
+    if settings.STATS_CHECK_INTERVAL > 0:
+        stats_job = asyncio.create_task(run_consistency_job(AsyncSessionLocal, settings.STATS_CHECK_INTERVAL))
+    # Gắn cờ phiếu mượn vừa quá hạn theo lô, sau khi bộ đếm đã được khởi tạo (lần quét đầu cộng vào borrows_overdue)
+    overdue_job = None
+    if settings.OVERDUE_SWEEP_INTERVAL > 0:
+        async def sweep_after_prime():
+            await prime_job
+            await run_overdue_sweeper(
+                AsyncSessionLocal, settings.OVERDUE_SWEEP_INTERVAL, settings.OVERDUE_SWEEP_BATCH_SIZE
+            )
+        overdue_job = asyncio.create_task(sweep_after_prime())
+    # Chuyển phiếu đã đóng lâu ngày sang bảng lưu trữ (tắt mặc định, thường chạy scripts/archive_borrows.py bằng cron)
+    archive_job = None
+    if settings.ARCHIVE_INTERVAL > 0 and settings.ARCHIVE_AFTER_DAYS > 0:
+        archive_job = asyncio.create_task(run_archive_job(
+            AsyncSessionLocal, settings.ARCHIVE_INTERVAL, settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_BATCH_SIZE
+        ))
+    yield
+    event_bus.stop()
+    prime_job.cancel()
+    if overdue_job:
+        overdue_job.cancel()
+    if archive_job:
+        archive_job.cancel()
+    if stats_job:
+        stats_job.cancel()
+    if replica_job:
+        replica_job.cancel()
+        await replica_router.dispose()
+    await invalidation_bus.stop()
 
 app = FastAPI(
     title="Thư viện PTIT API",
     description="API cho hệ thống quản lý thư viện PTIT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - cho phép frontend truy cập API
@@ -22,6 +86,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Số liệu database theo request (/metrics, header X-DB-* khi DEBUG)
+app.add_middleware(QueryMetricsMiddleware)
+
 # Mount static files cho frontend
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
@@ -31,6 +98,9 @@ app.include_router(books_router)
 app.include_router(users_router)
 app.include_router(wishlist_router)
 app.include_router(borrows_router)
+app.include_router(stats_router)
+app.include_router(exports_router)
+app.include_router(events_router)
 
 
 @app.get("/")
@@ -40,9 +110,28 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: process còn chạy (không truy cập database)"""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: schema đúng phiên bản, pool và cache đã sẵn sàng, primary còn trả lời; 503 nếu chưa"""
+    data = readiness.stats()
+    if data["ready"]:
+        error = await ping_database()
+        if error:
+            data["ready"] = False
+            data["errors"] = {**data["errors"], "database": error}
+    return JSONResponse(data, status_code=200 if data["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Số liệu request và database của worker hiện tại theo định dạng Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,66 @@
+"""
+Chuyển phiếu mượn đã đóng (trả / từ chối) cũ hơn --after-days ngày cùng items sang bảng
+borrow_requests_archive / borrow_items_archive, theo lô --batch-size phiếu, mỗi lô một giao dịch ngắn.
+Dừng giữa chừng (Ctrl+C, lỗi kết nối) thì chạy lại: các lô đã commit giữ nguyên, lần sau tiếp từ phiếu còn lại.
+Bộ đếm dashboard không đổi (job đối chiếu đếm cả bảng lưu trữ). Database cần đã chạy migration.
+
+Dùng cho cron thay cho job nền (ARCHIVE_INTERVAL=0), vd mỗi đêm:
+    0 2 * * * cd /app && python scripts/archive_borrows.py
+
+Usage:
+    python scripts/archive_borrows.py
+    python scripts/archive_borrows.py --after-days 180 --batch-size 500 --pause-ms 50
+    python scripts/archive_borrows.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, or_, select
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.borrow import BorrowRequest, BorrowRequestArchive
+from app.utils.archive import CLOSED_STATUSES, archive_closed, archive_state
+
+async def count_eligible(after_days: int) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=after_days)
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count(BorrowRequest.id)).where(
+            BorrowRequest.status.in_(CLOSED_STATUSES),
+            BorrowRequest.created_at < cutoff,
+            or_(BorrowRequest.returned_at.is_(None), BorrowRequest.returned_at < cutoff)
+        ))
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--after-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=float, default=0, help="Nghỉ giữa các lô để nhường database cho request")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm số phiếu sẽ được lưu trữ")
+    args = parser.parse_args()
+    if args.after_days <= 0:
+        sys.exit("❌ ARCHIVE_AFTER_DAYS / --after-days phải > 0")
+
+    if args.dry_run:
+        print(f"{await count_eligible(args.after_days):,} phiếu đã đóng cũ hơn {args.after_days} ngày")
+    else:
+        started = time.perf_counter()
+        moved = await archive_closed(AsyncSessionLocal, args.after_days, args.batch_size, pause=args.pause_ms / 1000)
+        async with AsyncSessionLocal() as db:
+            remaining = await db.scalar(select(func.count(BorrowRequest.id)))
+            archived = await db.scalar(select(func.count(BorrowRequestArchive.id)))
+        print(
+            f"✅ Đã lưu trữ {moved:,} phiếu trong {time.perf_counter() - started:.1f}s "
+            f"(lô lâu nhất {archive_state.max_batch_ms:.0f} ms); "
+            f"borrow_requests còn {remaining:,}, bảng lưu trữ {archived:,}"
+        )
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark lưu trữ phiếu đã đóng: độ trễ (median) của các danh sách phiếu mượn thường dùng trước và sau khi
+chuyển phiếu đã trả / từ chối cũ hơn --after-days ngày sang bảng lưu trữ, thời gian lưu trữ và lô lâu nhất
+(thời gian giữ khóa), rồi độ trễ khi hỏi khoảng ngày cũ (đọc cả bảng lưu trữ).
+
+Dùng dữ liệu của scripts/generate_data.py (SQLite tạm hoặc DATABASE_URL); database cần đã chạy migration.
+Script chuyển dữ liệu thật sang bảng lưu trữ: sinh lại dữ liệu với --reset để đo lại.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/generate_data.py --scale medium --days 1095 --reset
+    python scripts/migrate.py
+    python scripts/bench_archive.py --after-days 365
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+# Dùng chung database mặc định và bước đăng nhập với load test
+from loadtest import prepare
+
+import httpx
+from sqlalchemy import func, select
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.borrow import BorrowRequest, BorrowRequestArchive
+from app.utils.archive import archive_closed, archive_state
+
+# (tên, url, dùng token độc giả?) - các trang mặc định của giao diện, không hỏi khoảng ngày
+HOT_SCENARIOS = [
+    ("admin_list", "/api/borrows?page=1&page_size=20", False),
+    ("admin_page_50", "/api/borrows?page=50&page_size=20", False),
+    ("admin_returned", "/api/borrows?status_filter=returned&page_size=20", False),
+    ("admin_summary", "/api/borrows?view=summary&page_size=50", False),
+    ("reader_list", "/api/borrows?page_size=10", True),
+]
+HISTORY_SCENARIOS = [
+    ("history_admin", "/api/borrows?date_from=2000-01-01&page_size=20", False),
+    ("history_cursor", "/api/borrows?date_from=2000-01-01&cursor=&page_size=20", False),
+    ("history_reader", "/api/borrows?date_from=2000-01-01&page_size=10", True),
+]
+
+async def table_sizes():
+    async with AsyncSessionLocal() as db:
+        hot = await db.scalar(select(func.count(BorrowRequest.id)))
+        archived = await db.scalar(select(func.count(BorrowRequestArchive.id)))
+    return hot, archived
+
+async def measure(client, scenarios, admin, reader, runs: int) -> dict:
+    results = {}
+    for name, url, as_reader in scenarios:
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = await client.get(url, headers=reader if as_reader else admin)
+            response.raise_for_status()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--after-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=1)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--reader-password", default="reader123")
+    args = parser.parse_args()
+
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        ctx = await prepare(client, args, random.Random(1))
+        admin, reader = ctx.admin, ctx.readers[0]
+
+        hot, archived = await table_sizes()
+        print(f"Trước: borrow_requests {hot:,}, bảng lưu trữ {archived:,}")
+        before = await measure(client, HOT_SCENARIOS, admin, reader, args.runs)
+
+        started = time.perf_counter()
+        moved = await archive_closed(AsyncSessionLocal, args.after_days, args.batch_size)
+        elapsed = time.perf_counter() - started
+        hot, archived = await table_sizes()
+        print(
+            f"Lưu trữ {moved:,} phiếu (> {args.after_days} ngày, lô {args.batch_size}) trong {elapsed:.1f}s, "
+            f"lô lâu nhất {archive_state.max_batch_ms:.0f} ms"
+        )
+        print(f"Sau: borrow_requests {hot:,}, bảng lưu trữ {archived:,}")
+        after = await measure(client, HOT_SCENARIOS, admin, reader, args.runs)
+        history = await measure(client, HISTORY_SCENARIOS, admin, reader, args.runs)
+
+    print(f"\n{'kịch bản':<18} {'trước (ms)':>11} {'sau (ms)':>10}")
+    for name, _, _ in HOT_SCENARIOS:
+        print(f"{name:<18} {before[name]:>11.1f} {after[name]:>10.1f}")
+    for name, _, _ in HISTORY_SCENARIOS:
+        print(f"{name:<18} {'-':>11} {history[name]:>10.1f}")
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
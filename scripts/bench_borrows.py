@@ -0,0 +1,149 @@
+"""
+Kiểm tra hồi quy số câu SQL và độ trễ của GET /api/borrows trên dữ liệu lớn
+(mặc định 500k phiếu mượn, 2 sách mỗi phiếu, SQLite tạm).
+Script thoát với mã 1 nếu một kịch bản vượt quá ngân sách số câu SQL hoặc độ trễ.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/bench_borrows.py
+    python scripts/bench_borrows.py --requests 100000 --max-queries 6 --max-ms 200
+    python scripts/bench_borrows.py --reuse
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_borrows.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, insert, select
+from app.database import engine, async_engine, Base
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.utils.auth import create_access_token
+
+NUM_USERS = 1000
+NUM_BOOKS = 5000
+
+def seed(num_requests: int, batch_size: int = 20000):
+    """Sinh dữ liệu bằng insert theo batch"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    statuses = list(BorrowStatus)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": i + 1,
+                "username": f"user{i}",
+                "email": f"user{i}@ptit.edu.vn",
+                "password_hash": "x",
+                "full_name": f"Độc giả {i}",
+                "role": UserRole.admin if i == 0 else UserRole.user,
+                "is_active": True,
+            }
+            for i in range(NUM_USERS)
+        ])
+        conn.execute(insert(Book.__table__), [
+            {"id": i + 1, "title": f"Sách {i}", "isbn": f"bench-{i}", "quantity": 100, "available_quantity": 100}
+            for i in range(NUM_BOOKS)
+        ])
+        for offset in range(0, num_requests, batch_size):
+            ids = range(offset + 1, min(offset + batch_size, num_requests) + 1)
+            conn.execute(insert(BorrowRequest.__table__), [
+                {"id": i, "user_id": rng.randint(1, NUM_USERS), "status": rng.choice(statuses)}
+                for i in ids
+            ])
+            conn.execute(insert(BorrowItem.__table__), [
+                {"request_id": i, "book_id": rng.randint(1, NUM_BOOKS), "quantity": 1}
+                for i in ids for _ in range(2)
+            ])
+    print(f"Đã sinh {num_requests} phiếu mượn trong {time.perf_counter() - started:.1f}s")
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+async def measure(client, counter, url, headers, runs):
+    best = None
+    queries = 0
+    for _ in range(runs):
+        counter.count = 0
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        response.raise_for_status()
+        queries = counter.count
+        best = elapsed if best is None else min(best, elapsed)
+    return best, queries, response.json()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-queries", type=int, default=6, help="Ngân sách số câu SQL mỗi request")
+    parser.add_argument("--max-ms", type=float, default=None, help="Ngân sách độ trễ (ms), bỏ qua nếu không đặt")
+    parser.add_argument("--reuse", action="store_true", help="Dùng lại dữ liệu đã sinh")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        seed(args.requests)
+
+    from main import app
+
+    with engine.connect() as conn:
+        user_id = conn.scalar(select(BorrowRequest.user_id).where(BorrowRequest.user_id > 1).limit(1))
+    admin = {"Authorization": "Bearer " + create_access_token({"sub": "user0", "user_id": 1, "role": "admin"})}
+    user = {"Authorization": "Bearer " + create_access_token({"sub": "user", "user_id": user_id, "role": "user"})}
+    deep_page = max(1, args.requests // 20 // 2)
+
+    counter = QueryCounter()
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Lượt đầu để nạp cache principal, không tính vào kết quả
+        await client.get("/api/borrows?page_size=1", headers=admin)
+        await client.get("/api/borrows?page_size=1", headers=user)
+
+        first = (await client.get("/api/borrows?page_size=20&cursor=", headers=admin)).json()
+        scenarios = [
+            ("admin trang 1", "/api/borrows?page_size=20", admin),
+            ("admin trang sâu", f"/api/borrows?page_size=20&page={deep_page}", admin),
+            ("admin status", "/api/borrows?page_size=20&status_filter=pending", admin),
+            ("admin tìm độc giả", "/api/borrows?page_size=20&search=user12", admin),
+            ("admin cursor", f"/api/borrows?page_size=20&cursor={first['next_cursor']}", admin),
+            ("user trang 1", "/api/borrows?page_size=100", user),
+        ]
+        print(f"\n{'kịch bản':<20} {'ms':>8} {'SQL':>5} {'items':>6}")
+        for name, url, headers in scenarios:
+            elapsed, queries, body = await measure(client, counter, url, headers, args.runs)
+            print(f"{name:<20} {elapsed:>8.1f} {queries:>5} {len(body['items']):>6}")
+            if queries > args.max_queries:
+                failures.append(f"{name}: {queries} câu SQL > {args.max_queries}")
+            if args.max_ms is not None and elapsed > args.max_ms:
+                failures.append(f"{name}: {elapsed:.1f}ms > {args.max_ms}ms")
+
+    if failures:
+        print("\n❌ Vượt ngân sách:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ Tất cả kịch bản nằm trong ngân sách")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark thông lượng duyệt / trả sách: từng phiếu (PUT /{id}/approve, /{id}/return)
+so với thao tác hàng loạt (POST /bulk/approve, /bulk/return).
+Kết quả là số phiếu xử lý mỗi giây (req/s) cho từng cách, trên SQLite tạm.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/bench_bulk.py
+    python scripts/bench_bulk.py --requests 5000 --batch-size 500
+    DATABASE_URL=mysql+pymysql://... python scripts/bench_bulk.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_bulk.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import insert
+from app.database import engine, Base
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.utils.auth import create_access_token
+
+NUM_BOOKS = 200
+
+def seed(num_requests: int):
+    """Sinh phiếu chờ duyệt, mỗi phiếu 1-3 đầu sách; tồn kho đủ cho tất cả"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "id": 1, "username": "admin", "email": "admin@ptit.edu.vn",
+            "password_hash": "x", "role": UserRole.admin, "is_active": True
+        }])
+        conn.execute(insert(Book.__table__), [
+            {"id": i + 1, "title": f"Sách {i}", "isbn": f"bulk-{i}", "quantity": num_requests * 3,
+             "available_quantity": num_requests * 3}
+            for i in range(NUM_BOOKS)
+        ])
+        conn.execute(insert(BorrowRequest.__table__), [
+            {"id": i + 1, "user_id": 1, "status": BorrowStatus.pending}
+            for i in range(num_requests)
+        ])
+        conn.execute(insert(BorrowItem.__table__), [
+            {"request_id": i + 1, "book_id": book_id, "quantity": 1}
+            for i in range(num_requests)
+            for book_id in rng.sample(range(1, NUM_BOOKS + 1), rng.randint(1, 3))
+        ])
+
+async def run_single(client, headers, ids, action):
+    for request_id in ids:
+        response = await client.put(
+            f"/api/borrows/{request_id}/{action}", headers=headers,
+            json={} if action == "approve" else None
+        )
+        response.raise_for_status()
+
+async def run_bulk(client, headers, ids, action, batch_size):
+    for offset in range(0, len(ids), batch_size):
+        response = await client.post(
+            f"/api/borrows/bulk/{action}", headers=headers,
+            json={"request_ids": ids[offset:offset + batch_size]}
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body["failed"]:
+            raise RuntimeError(f"{action}: {body['failed']} phiếu lỗi, vd {body['results'][0]}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from main import app
+
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "admin", "user_id": 1, "role": "admin"})}
+    ids = list(range(1, args.requests + 1))
+    transport = httpx.ASGITransport(app=app)
+
+    print(f"\n{'cách':<12} {'thao tác':<10} {'giây':>8} {'req/s':>10}")
+    results = {}
+    for mode in ("từng phiếu", "hàng loạt"):
+        seed(args.requests)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            for action in ("approve", "return"):
+                started = time.perf_counter()
+                if mode == "từng phiếu":
+                    await run_single(client, headers, ids, action)
+                else:
+                    await run_bulk(client, headers, ids, action, args.batch_size)
+                elapsed = time.perf_counter() - started
+                results[(mode, action)] = args.requests / elapsed
+                print(f"{mode:<12} {action:<10} {elapsed:>8.2f} {results[(mode, action)]:>10.0f}")
+
+    for action in ("approve", "return"):
+        speedup = results[("hàng loạt", action)] / results[("từng phiếu", action)]
+        print(f"{action}: hàng loạt nhanh hơn {speedup:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
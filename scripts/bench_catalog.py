@@ -0,0 +1,102 @@
+"""
+Benchmark đọc lặp catalogue: so sánh response đầy đủ, response từ cache dùng chung
+và revalidate bằng If-None-Match (304) cho GET /api/books và GET /api/books/{id}.
+Mỗi dòng là thời gian trung bình mỗi request và số câu SQL mỗi request.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/bench_catalog.py
+    python scripts/bench_catalog.py --books 100000 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_catalog.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, insert
+from app.database import engine, async_engine, Base, AsyncSessionLocal
+from app.models.book import Book
+from app.utils.catalog import book_list_cache
+from app.utils.search import build_book_search_text
+from app.utils.stats import recompute_counters
+
+def seed(num_books: int, batch_size: int = 10000):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    description = "Mô tả chi tiết nội dung cuốn sách. " * 40
+    with engine.begin() as conn:
+        for offset in range(0, num_books, batch_size):
+            conn.execute(insert(Book.__table__), [
+                {
+                    "title": f"Sách {i}", "author": f"Tác giả {i % 100}", "isbn": f"cat-{i}",
+                    "category": f"Danh mục {i % 10}", "description": description,
+                    "quantity": 10, "available_quantity": 10,
+                    "search_text": build_book_search_text(f"Sách {i}", f"Tác giả {i % 100}", f"cat-{i}"),
+                }
+                for i in range(offset, min(offset + batch_size, num_books))
+            ])
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+async def measure(client, counter, url, requests, headers=None, clear_cache=False):
+    counter.count = 0
+    elapsed = 0.0
+    for _ in range(requests):
+        if clear_cache:
+            book_list_cache.clear()
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers or {})
+        elapsed += time.perf_counter() - started
+        if response.status_code not in (200, 304):
+            response.raise_for_status()
+    return elapsed / requests * 1000, counter.count / requests, response.status_code
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.books)
+    from main import app
+    # Tạo bộ đếm và phiên bản bộ sưu tập như khi app khởi động
+    async with AsyncSessionLocal() as db:
+        await recompute_counters(db)
+
+    counter = QueryCounter()
+    list_url = "/api/books?page_size=20&category=Danh%20m%E1%BB%A5c%203"
+    detail_url = "/api/books/42"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        list_etag = (await client.get(list_url)).headers["etag"]
+        detail_etag = (await client.get(detail_url)).headers["etag"]
+        scenarios = [
+            ("list: không cache", list_url, None, True),
+            ("list: cache chung", list_url, None, False),
+            ("list: 304", list_url, {"If-None-Match": list_etag}, True),
+            ("detail: 200", detail_url, None, False),
+            ("detail: 304", detail_url, {"If-None-Match": detail_etag}, False),
+        ]
+        print(f"\n{'kịch bản':<20} {'ms/req':>8} {'SQL/req':>8} {'HTTP':>5}")
+        for name, url, headers, clear_cache in scenarios:
+            ms, queries, code = await measure(client, counter, url, args.requests, headers, clear_cache)
+            print(f"{name:<20} {ms:>8.2f} {queries:>8.1f} {code:>5}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
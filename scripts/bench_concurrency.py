@@ -0,0 +1,124 @@
+"""
+Benchmark độ trễ khi tăng số client song song.
+Chạy app trong cùng process (ASGI transport) trên một database SQLite riêng,
+đo p50/p95/p99 của các endpoint đọc với số client tăng dần.
+Nếu handler chặn event loop thì p99 sẽ tăng tuyến tính theo số client.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/bench_concurrency.py
+    python scripts/bench_concurrency.py --clients 1,10,50,100 --requests 20 --books 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from app.database import SessionLocal, engine, Base
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.utils.auth import get_password_hash, create_access_token
+
+def seed(num_books: int, num_requests: int) -> str:
+    """Tạo dữ liệu benchmark, trả về token admin"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        admin = User(
+            username="bench_admin",
+            email="bench_admin@ptit.edu.vn",
+            password_hash=get_password_hash("bench"),
+            role=UserRole.admin,
+            is_active=True
+        )
+        db.add(admin)
+        db.flush()
+        db.bulk_insert_mappings(Book, [
+            {
+                "title": f"Sách benchmark {i}",
+                "author": f"Tác giả {i % 100}",
+                "isbn": f"bench-{i}",
+                "category": f"Danh mục {i % 10}",
+                "quantity": 10,
+                "available_quantity": 10
+            }
+            for i in range(num_books)
+        ])
+        db.bulk_insert_mappings(BorrowRequest, [
+            {"id": i + 1, "user_id": admin.id, "status": BorrowStatus.pending}
+            for i in range(num_requests)
+        ])
+        db.bulk_insert_mappings(BorrowItem, [
+            {"request_id": i + 1, "book_id": (i % num_books) + 1, "quantity": 1}
+            for i in range(num_requests)
+        ])
+        db.commit()
+        return create_access_token({"sub": admin.username, "user_id": admin.id, "role": "admin"})
+    finally:
+        db.close()
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_level(app, url: str, headers: dict, clients: int, requests_per_client: int):
+    latencies = []
+
+    async def worker(client: httpx.AsyncClient):
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rps": len(latencies) / elapsed,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,5,10,25,50,100")
+    parser.add_argument("--requests", type=int, default=20, help="Số request mỗi client")
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--borrows", type=int, default=2000)
+    args = parser.parse_args()
+
+    token = seed(args.books, args.borrows)
+    from main import app
+
+    endpoints = [
+        ("/api/books?search=benchmark&page_size=20", {}),
+        ("/api/borrows?page_size=20", {"Authorization": f"Bearer {token}"}),
+    ]
+    for url, headers in endpoints:
+        print(f"\n{url}")
+        print(f"{'clients':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        for clients in [int(c) for c in args.clients.split(",")]:
+            stats = await run_level(app, url, headers, clients, args.requests)
+            print(f"{clients:>8} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} {stats['rps']:>9.0f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark fan-out Server-Sent Events (app/utils/events.py) trong một worker: mở --connections kết nối nhàn rỗi
+(generator của /api/events, không qua socket), đo bộ nhớ mỗi kết nối, rồi phát --events sự kiện số lượng sách
+và đo thời gian publish (phía request ghi) và thời gian tới khi mọi kết nối đã nhận sự kiện.
+Sự kiện phiếu mượn chỉ tới chủ phiếu và admin nên số frame mỗi kết nối nhận được ít hơn.
+
+Không cần database. Chi phí socket / uvicorn của mỗi kết nối thật không được tính.
+
+Usage:
+    python scripts/bench_events.py
+    python scripts/bench_events.py --connections 10000 --events 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.events import BOOK_EVENT, BORROW_EVENT, TOPICS, EventBus
+
+class Delivery:
+    """Đếm số kết nối còn chờ sự kiện hiện tại"""
+
+    def __init__(self):
+        self.remaining = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count: int):
+        self.remaining = count
+        self.done.clear()
+
+    def received(self):
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.done.set()
+
+async def consume(stream, delivery: Delivery):
+    async for frame in stream:
+        for _ in range(frame.count(b"\nevent: ")):
+            delivery.received()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--admins", type=int, default=10, help="Số kết nối admin (nhận mọi sự kiện phiếu mượn)")
+    args = parser.parse_args()
+
+    bus = EventBus(history=1000, heartbeat=0)
+    topics = set(TOPICS.values())
+    delivery = Delivery()
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tasks = [
+        asyncio.create_task(consume(bus.stream(index + 1, index < args.admins, topics), delivery))
+        for index in range(args.connections)
+    ]
+    # Chờ mọi kết nối gửi xong frame retry và đứng chờ sự kiện
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    idle = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(
+        f"{bus.connections:,} kết nối nhàn rỗi: {idle / 1024 / 1024:.1f} MB "
+        f"(~{idle / max(bus.connections, 1) / 1024:.1f} KB / kết nối)"
+    )
+
+    publish_us, delivery_ms = [], []
+    for number in range(args.events):
+        # Sự kiện phiếu mượn của user 1 chỉ tới chủ phiếu (kết nối đầu) và các kết nối admin
+        delivery.expect(max(args.admins, 1) if number % 2 else args.connections)
+        started = time.perf_counter()
+        if number % 2:
+            bus.publish(BORROW_EVENT, {"id": number, "user_id": 1, "status": "approved"}, user_id=1)
+        else:
+            bus.publish(BOOK_EVENT, {"id": number, "quantity": 5, "available_quantity": 3})
+        publish_us.append((time.perf_counter() - started) * 1_000_000)
+        await delivery.done.wait()
+        # Chờ cả các kết nối không nhận sự kiện quay lại trạng thái chờ
+        await asyncio.sleep(0)
+        delivery_ms.append((time.perf_counter() - started) * 1000)
+
+    book, borrow = delivery_ms[0::2], delivery_ms[1::2]
+    print(f"publish: median {statistics.median(publish_us):.1f} µs, max {max(publish_us):.1f} µs")
+    print(f"sự kiện sách tới mọi kết nối: median {statistics.median(book):.1f} ms, max {max(book):.1f} ms")
+    if borrow:
+        print(f"sự kiện phiếu mượn tới chủ phiếu / admin: median {statistics.median(borrow):.1f} ms, max {max(borrow):.1f} ms")
+    print(f"kết nối nhận reset: {bus.resets}")
+
+    bus.stop()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
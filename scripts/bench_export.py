@@ -0,0 +1,98 @@
+"""
+Kiểm tra export dạng stream: xuất lịch sử mượn trả với số phiếu tăng dần và đo thời gian,
+số dòng/giây và bộ nhớ Python cấp phát cao nhất (tracemalloc) trong lúc stream.
+Bộ nhớ đỉnh phải gần như không đổi khi số dòng tăng (SQLite tạm).
+
+Usage:
+    python scripts/bench_export.py
+    python scripts/bench_export.py --sizes 100000,1000000 --format ndjson
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_export.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app.database import engine, Base
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.routers.exports import export_borrows
+
+NUM_USERS = 1000
+NUM_BOOKS = 5000
+
+def seed(num_requests: int, batch_size: int = 20000):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    statuses = list(BorrowStatus)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": i + 1, "username": f"user{i}", "email": f"user{i}@ptit.edu.vn", "password_hash": "x",
+                "full_name": f"Độc giả {i}", "role": UserRole.user, "is_active": True,
+            }
+            for i in range(NUM_USERS)
+        ])
+        conn.execute(insert(Book.__table__), [
+            {"id": i + 1, "title": f"Sách {i}", "isbn": f"exp-{i}", "quantity": 100, "available_quantity": 100}
+            for i in range(NUM_BOOKS)
+        ])
+        for offset in range(0, num_requests, batch_size):
+            ids = range(offset + 1, min(offset + batch_size, num_requests) + 1)
+            conn.execute(insert(BorrowRequest.__table__), [
+                {"id": i, "user_id": rng.randint(1, NUM_USERS), "status": rng.choice(statuses)}
+                for i in ids
+            ])
+            conn.execute(insert(BorrowItem.__table__), [
+                {"request_id": i, "book_id": rng.randint(1, NUM_BOOKS), "quantity": 1}
+                for i in ids for _ in range(2)
+            ])
+
+async def consume(fmt: str):
+    response = await export_borrows(format=fmt, status_filter=None, date_from=None, date_to=None, current_user=None)
+    size = lines = 0
+    async for chunk in response.body_iterator:
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    return size, lines
+
+async def run_export(fmt: str):
+    """Lượt 1 đo thời gian, lượt 2 đo bộ nhớ (tracemalloc làm chậm cấp phát nên không đo chung)"""
+    started = time.perf_counter()
+    size, lines = await consume(fmt)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    await consume(fmt)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, lines, peak
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,500000", help="Số phiếu mượn, cách nhau bởi dấu phẩy")
+    parser.add_argument("--format", default="csv", choices=["csv", "ndjson"])
+    args = parser.parse_args()
+
+    print(f"{'phiếu':>10} {'dòng':>10} {'MB':>8} {'giây':>7} {'dòng/s':>10} {'RAM đỉnh MB':>12}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        seed(size)
+        elapsed, total_bytes, lines, peak = await run_export(args.format)
+        print(
+            f"{size:>10,} {lines:>10,} {total_bytes / 1e6:>8.1f} {elapsed:>7.1f} "
+            f"{lines / elapsed:>10,.0f} {peak / 1e6:>12.2f}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Benchmark job quét quá hạn: thời gian và số câu SQL của một lần quét theo số phiếu vừa quá hạn.
+Bỏ mọi cờ is_overdue, quét lần đầu (toàn bộ phiếu đang mượn đã quá hạn), quét lại khi không có gì thay đổi,
+rồi dời "hôm nay" thêm từng khoảng ngày để chỉ một phần nhỏ phiếu vừa quá hạn. Chi phí một lần quét
+phải tăng theo số phiếu được gắn cờ, không theo tổng số phiếu trong lịch sử.
+
+Dùng dữ liệu của scripts/generate_data.py (SQLite tạm hoặc DATABASE_URL); database cần đã chạy migration.
+
+Usage:
+    python scripts/generate_data.py --scale medium --reset
+    python scripts/migrate.py
+    python scripts/bench_overdue.py --batch-size 500
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+# Dùng chung database mặc định và cách đếm câu SQL với load test
+from loadtest import QueryCounter
+
+from sqlalchemy import func, select, update
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.borrow import BorrowRequest, BorrowStatus
+from app.utils.overdue import sweep_overdue
+from app.utils.stats import recompute_counters
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.OVERDUE_SWEEP_BATCH_SIZE)
+    parser.add_argument("--days", default="1,7,30", help="Dời ngày quét thêm các khoảng này (ngày)")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        total = await db.scalar(select(func.count(BorrowRequest.id)))
+        active = await db.scalar(select(func.count(BorrowRequest.id)).where(BorrowRequest.status == BorrowStatus.approved))
+        await db.execute(update(BorrowRequest).values(is_overdue=False))
+        await db.commit()
+        await recompute_counters(db)
+    print(f"{total:,} phiếu, {active:,} đang mượn, lô {args.batch_size}")
+    print(f"{'lần quét':<28} {'gắn cờ':>8} {'ms':>10} {'SQL':>6}")
+
+    counter = QueryCounter()
+
+    async def run(label: str, today: date):
+        before = counter.count
+        started = time.perf_counter()
+        flagged = await sweep_overdue(AsyncSessionLocal, args.batch_size, today)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label:<28} {flagged:>8,} {elapsed:>10.1f} {counter.count - before:>6}")
+
+    today = date.today()
+    await run("lần đầu (tồn đọng)", today)
+    await run("không thay đổi", today)
+    for days in [int(value) for value in args.days.split(",")]:
+        await run(f"+{days} ngày", today + timedelta(days=days))
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
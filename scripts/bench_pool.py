@@ -0,0 +1,86 @@
+"""
+Benchmark chọn kích thước connection pool: với cùng số client song song, chạy một tổ hợp endpoint đọc
+nặng database (danh sách/chi tiết phiếu mượn, chi tiết sách, wishlist, dashboard) với từng pool_size
+(max_overflow=0) và ghi req/s, p50/p99, số lần phải chờ connection, thời gian chờ và timeout.
+Pool đủ lớn khi tăng tiếp không còn làm tăng req/s; lớn hơn chỉ tốn connection của MySQL.
+
+Dùng dữ liệu của scripts/generate_data.py (SQLite tạm hoặc DATABASE_URL). Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/generate_data.py --scale small --reset
+    python scripts/bench_pool.py
+    DATABASE_URL=mysql+pymysql://root:pw@localhost/library_load python scripts/bench_pool.py --sizes 2,5,10,20 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Dùng chung database mặc định, bước đăng nhập và cách đo với load test
+from loadtest import SCENARIOS, prepare, run_scenario
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.utils.metrics import instrument_engine, pool_monitors
+
+MIX = ("borrows_admin", "borrow_detail", "book_detail", "wishlist", "dashboard", "me")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,2,5,10,20", help="Các pool_size cần thử")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500, help="Số request mỗi pool_size")
+    parser.add_argument("--timeout", type=float, default=settings.DB_POOL_TIMEOUT, help="pool_timeout (giây)")
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--reader-password", default="reader123")
+    args = parser.parse_args()
+
+    # Câu SQL chậm là do tải nhân tạo, không ghi log
+    settings.SLOW_QUERY_MS = 0
+    from main import app
+    builds = [build for name, _, build, _ in SCENARIOS if name in MIX]
+
+    def mixed(ctx):
+        return ctx.rng.choice(builds)(ctx)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+        ctx = await prepare(client, args, random.Random(args.seed))
+        print(f"{args.concurrency} client song song, {args.requests} request mỗi cấu hình ({', '.join(MIX)})")
+        print(f"{'pool':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'lỗi':>5} {'chờ':>6} {'chờ TB ms':>10} {'timeout':>8} {'dùng tối đa':>12}")
+        for size in [int(value) for value in args.sizes.split(",")]:
+            bench_engine = create_async_engine(
+                settings.ASYNC_DATABASE_URL, pool_size=size, max_overflow=0, pool_timeout=args.timeout,
+                pool_pre_ping=settings.DB_POOL_PRE_PING
+            )
+            name = f"bench-{size}"
+            instrument_engine(bench_engine.sync_engine, name)
+            AsyncSessionLocal.configure(bind=bench_engine)
+            try:
+                await run_scenario(client, ctx, "GET", mixed, args.concurrency, args.concurrency, None)
+                monitor = pool_monitors[name]
+                before = monitor.stats()
+                stats = await run_scenario(client, ctx, "GET", mixed, args.concurrency, args.requests, None)
+                after = monitor.stats()
+            finally:
+                AsyncSessionLocal.configure(bind=async_engine)
+                await bench_engine.dispose()
+
+            waits = after["waits"] - before["waits"]
+            wait_ms = (after["avg_wait_ms"] * after["waits"] - before["avg_wait_ms"] * before["waits"]) / waits if waits else 0.0
+            print(
+                f"{size:>5} {stats['rps']:>8.0f} {stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>5} "
+                f"{waits:>6} {wait_ms:>10.1f} {after['timeouts'] - before['timeouts']:>8} {after['max_checked_out']:>12}"
+            )
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+So sánh response đầy đủ và rút gọn (view=summary / fields=) của GET /api/books và GET /api/borrows:
+kích thước payload, thời gian mỗi request và số câu SQL (SQLite tạm, cache danh sách sách được xóa
+trước mỗi request để đo cả phần truy vấn và serialize).
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/bench_projection.py
+    python scripts/bench_projection.py --books 50000 --page-size 100 --runs 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_projection.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, insert
+from app.database import engine, async_engine, Base, AsyncSessionLocal
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.utils.auth import create_access_token
+from app.utils.catalog import book_list_cache
+from app.utils.search import build_book_search_text
+from app.utils.stats import recompute_counters
+
+NUM_USERS = 200
+ITEMS_PER_REQUEST = 5
+
+def seed(num_books: int, num_requests: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(13)
+    description = "Mô tả chi tiết nội dung cuốn sách. " * 40
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": i + 1, "username": f"user{i}", "email": f"user{i}@ptit.edu.vn", "password_hash": "x",
+                "full_name": f"Độc giả {i}", "role": UserRole.admin if i == 0 else UserRole.user, "is_active": True,
+            }
+            for i in range(NUM_USERS)
+        ])
+        conn.execute(insert(Book.__table__), [
+            {
+                "id": i + 1, "title": f"Sách {i}", "author": f"Tác giả {i % 100}", "isbn": f"proj-{i}",
+                "category": f"Danh mục {i % 10}", "description": description,
+                "quantity": 10, "available_quantity": 10,
+                "search_text": build_book_search_text(f"Sách {i}", f"Tác giả {i % 100}", f"proj-{i}"),
+            }
+            for i in range(num_books)
+        ])
+        conn.execute(insert(BorrowRequest.__table__), [
+            {"id": i + 1, "user_id": rng.randint(2, NUM_USERS), "status": rng.choice(list(BorrowStatus)), "note": description}
+            for i in range(num_requests)
+        ])
+        conn.execute(insert(BorrowItem.__table__), [
+            {"request_id": i + 1, "book_id": rng.randint(1, num_books), "quantity": 1}
+            for i in range(num_requests) for _ in range(ITEMS_PER_REQUEST)
+        ])
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+async def measure(client, counter, url, headers, runs):
+    counter.count = 0
+    elapsed = 0.0
+    for _ in range(runs):
+        book_list_cache.clear()
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        elapsed += time.perf_counter() - started
+        response.raise_for_status()
+    return elapsed / runs * 1000, counter.count / runs, len(response.content)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    seed(args.books, args.requests)
+    from main import app
+    async with AsyncSessionLocal() as db:
+        await recompute_counters(db)
+
+    admin = {"Authorization": "Bearer " + create_access_token({"sub": "user0", "user_id": 1, "role": "admin"})}
+    books = f"/api/books?page_size={args.page_size}"
+    borrows = f"/api/borrows?page_size={args.page_size}"
+    scenarios = [
+        ("books: đầy đủ", books),
+        ("books: summary", books + "&view=summary"),
+        ("books: fields", books + "&fields=title,available_quantity"),
+        ("borrows: đầy đủ", borrows),
+        ("borrows: summary", borrows + "&view=summary"),
+        ("borrows: fields", borrows + "&fields=status,item_count"),
+    ]
+
+    counter = QueryCounter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Lượt đầu để nạp cache principal, không tính vào kết quả
+        await client.get("/api/borrows?page_size=1", headers=admin)
+        print(f"\n{'kịch bản':<18} {'ms/req':>8} {'SQL/req':>8} {'bytes':>10}")
+        for name, url in scenarios:
+            ms, queries, size = await measure(client, counter, url, admin, args.runs)
+            print(f"{name:<18} {ms:>8.2f} {queries:>8.1f} {size:>10,}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
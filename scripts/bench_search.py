@@ -0,0 +1,109 @@
+"""
+Benchmark tìm kiếm sách trên catalogue tổng hợp (mặc định 1 triệu cuốn).
+Mỗi dòng là thời gian (tốt nhất sau --runs lần) của count + 1 trang, giống get_books.
+So sánh cách cũ (ILIKE '%term%' trên title/author/isbn) với full-text index
+(FTS5 trên SQLite, FULLTEXT trên MySQL) dùng trong GET /api/books?search=.
+
+Usage:
+    python scripts/bench_search.py
+    python scripts/bench_search.py --books 200000 --runs 5
+    DATABASE_URL=mysql+pymysql://... python scripts/bench_search.py --reuse
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_search.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, or_, select
+from app.database import engine, Base
+from app.models.book import Book
+from app.utils.search import apply_book_search, build_book_search_text
+
+WORDS = [
+    "Lập", "trình", "Python", "cơ", "bản", "nâng", "cao", "Cấu", "trúc", "dữ", "liệu",
+    "giải", "thuật", "Mạng", "máy", "tính", "Toán", "học", "Vật", "lý", "đại", "cương",
+    "Kinh", "tế", "vĩ", "mô", "Trí", "tuệ", "nhân", "tạo", "Hệ", "điều", "hành",
+    "An", "toàn", "thông", "tin", "Xác", "suất", "thống", "kê", "Tiếng", "Anh", "Việt",
+    "Lịch", "sử", "Đảng", "Triết", "Điện", "tử", "Viễn", "Kỹ", "thuật", "phần", "mềm",
+]
+SURNAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Vũ", "Đặng", "Bùi", "Đỗ", "Ngô"]
+GIVEN = ["Văn An", "Thị Bình", "Đức Cường", "Thu Dung", "Quang Huy", "Minh Khôi", "Thanh Hà"]
+CATEGORIES = ["Công nghệ thông tin", "Toán học", "Vật lý", "Kinh tế", "Ngoại ngữ", "Lý luận"]
+
+QUERIES = ["python", "lap trinh", "Giải thuật", "nguyen van", "kinh te vi mo", "978-604-5"]
+
+def generate(num_books: int, batch_size: int = 10000):
+    """Sinh catalogue tổng hợp bằng insert theo batch"""
+    Base.metadata.drop_all(bind=engine, tables=[Book.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Book.__table__])
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, num_books, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, num_books)):
+                title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+                author = f"{rng.choice(SURNAMES)} {rng.choice(GIVEN)}"
+                isbn = f"978-604-{i // 100000}-{i % 100000:05d}"
+                rows.append({
+                    "title": title,
+                    "author": author,
+                    "isbn": isbn,
+                    "category": rng.choice(CATEGORIES),
+                    "quantity": 5,
+                    "available_quantity": 5,
+                    "search_text": build_book_search_text(title, author, isbn),
+                })
+            conn.execute(insert(Book.__table__), rows)
+    print(f"Đã sinh {num_books} sách trong {time.perf_counter() - started:.1f}s")
+
+def time_endpoint(conn, filtered, page, runs: int):
+    """Thời gian tốt nhất cho một lượt như get_books: đếm tổng + lấy 1 trang"""
+    best = None
+    total = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        total = conn.scalar(select(func.count()).select_from(filtered.subquery()))
+        conn.execute(page).all()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--reuse", action="store_true", help="Dùng lại dữ liệu đã sinh")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        generate(args.books)
+
+    table = Book.__table__
+    print(f"\n{'query':<16} {'ILIKE ms':>10} {'index ms':>10} {'ILIKE count':>12} {'index count':>12}")
+    with engine.connect() as conn:
+        for term in QUERIES:
+            pattern = f"%{term}%"
+            legacy = select(table.c.id).where(or_(
+                table.c.title.ilike(pattern),
+                table.c.author.ilike(pattern),
+                table.c.isbn.ilike(pattern)
+            ))
+            indexed, rank = apply_book_search(select(table.c.id), term, engine.dialect.name, table)
+
+            legacy_ms, legacy_count = time_endpoint(conn, legacy, legacy.limit(args.page_size), args.runs)
+            page = indexed.order_by(rank, table.c.id) if rank is not None else indexed
+            index_ms, index_count = time_endpoint(conn, indexed, page.limit(args.page_size), args.runs)
+            print(f"{term:<16} {legacy_ms:>10.1f} {index_ms:>10.1f} {legacy_count:>12} {index_count:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Microbenchmark trang 100 phiếu mượn / 100 sách: đường hiện tại (ORM + selectinload, model Pydantic,
+validate response_model rồi serialize) so với đường nhanh FAST_LIST_RESPONSES (Core select -> dict -> orjson).
+Đo riêng phần nạp dữ liệu, phần serialize và cả request qua app; kiểm tra hai đường cho cùng JSON.
+
+Cần thêm package: pip install httpx (orjson tùy chọn, không có thì dùng json chuẩn)
+
+Usage:
+    python scripts/bench_serialization.py
+    python scripts/bench_serialization.py --runs 200 --page-size 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_serialization.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+from app.config import settings
+from app.database import engine, Base, AsyncSessionLocal
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.schemas.borrow import BorrowListResponse
+from app.utils import serialization
+from app.utils.auth import create_access_token
+from app.utils.catalog import book_list_cache
+from app.utils.serialization import dump_json
+from app.utils.stats import recompute_counters
+
+NUM_USERS = 200
+NUM_BOOKS = 2000
+NUM_REQUESTS = 1000
+ITEMS_PER_REQUEST = 3
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(11)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": i + 1, "username": f"user{i}", "email": f"user{i}@ptit.edu.vn", "password_hash": "x",
+                "full_name": f"Độc giả {i}", "role": UserRole.admin if i == 0 else UserRole.user, "is_active": True,
+            }
+            for i in range(NUM_USERS)
+        ])
+        conn.execute(insert(Book.__table__), [
+            {
+                "id": i + 1, "title": f"Sách {i}", "author": f"Tác giả {i % 100}", "isbn": f"ser-{i}",
+                "category": f"Danh mục {i % 10}", "description": "Mô tả sách. " * 10,
+                "quantity": 10, "available_quantity": 10,
+            }
+            for i in range(NUM_BOOKS)
+        ])
+        conn.execute(insert(BorrowRequest.__table__), [
+            {"id": i + 1, "user_id": rng.randint(2, NUM_USERS), "status": rng.choice(list(BorrowStatus)), "note": "Ghi chú"}
+            for i in range(NUM_REQUESTS)
+        ])
+        conn.execute(insert(BorrowItem.__table__), [
+            {"request_id": i + 1, "book_id": rng.randint(1, NUM_BOOKS), "quantity": 1}
+            for i in range(NUM_REQUESTS) for _ in range(ITEMS_PER_REQUEST)
+        ])
+
+async def timed(runs, func):
+    started = time.perf_counter()
+    for _ in range(runs):
+        result = await func()
+    return (time.perf_counter() - started) / runs * 1000, result
+
+async def micro(runs: int, page_size: int):
+    """Nạp dữ liệu và serialize một trang phiếu mượn, không qua HTTP"""
+    from app.routers.borrows import borrow_responses
+    adapter = TypeAdapter(BorrowListResponse)
+    ids = list(range(NUM_REQUESTS, NUM_REQUESTS - page_size, -1))
+
+    async with AsyncSessionLocal() as db:
+        async def load_orm():
+            loaded = (await db.scalars(
+                select(BorrowRequest).options(
+                    selectinload(BorrowRequest.items).selectinload(BorrowItem.book),
+                    selectinload(BorrowRequest.user)
+                ).where(BorrowRequest.id.in_(ids))
+            )).all()
+            by_id = {request.id: request for request in loaded}
+            return [by_id[request_id] for request_id in ids]
+
+        async def load_core():
+            return await borrow_responses(db, ids)
+
+        orm_ms, requests = await timed(runs, load_orm)
+        core_ms, rows = await timed(runs, load_core)
+
+    async def serialize_current():
+        # Giống FastAPI với response_model: dựng model từ ORM, validate lại theo response_model rồi dump
+        model = BorrowListResponse(items=requests, page_size=page_size)
+        validated = adapter.validate_python(model.model_dump())
+        return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False).encode()
+
+    async def serialize_fast():
+        return dump_json({"items": rows, "page_size": page_size})
+
+    current_ms, current_body = await timed(runs, serialize_current)
+    fast_ms, fast_body = await timed(runs, serialize_fast)
+    same = json.loads(current_body)["items"] == json.loads(fast_body)["items"]
+    return [
+        ("nạp dữ liệu", orm_ms, core_ms),
+        ("serialize", current_ms, fast_ms),
+    ], same
+
+async def end_to_end(runs: int, page_size: int):
+    """Cả request qua app, bật/tắt FAST_LIST_RESPONSES"""
+    from main import app
+    admin = {"Authorization": "Bearer " + create_access_token({"sub": "user0", "user_id": 1, "role": "admin"})}
+    urls = [
+        ("GET /api/borrows", f"/api/borrows?page_size={page_size}"),
+        ("GET /api/books", f"/api/books?page_size={page_size}"),
+    ]
+    results = []
+    same = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/borrows?page_size=1", headers=admin)
+        for name, url in urls:
+            timings, bodies = [], []
+            for fast in (False, True):
+                settings.FAST_LIST_RESPONSES = fast
+
+                async def request():
+                    book_list_cache.clear()
+                    response = await client.get(url, headers=admin)
+                    response.raise_for_status()
+                    return response.json()
+
+                ms, body = await timed(runs, request)
+                timings.append(ms)
+                bodies.append(body)
+            same = same and bodies[0] == bodies[1]
+            results.append((name, *timings))
+    return results, same
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    seed()
+    async with AsyncSessionLocal() as db:
+        await recompute_counters(db)
+
+    micro_rows, micro_same = await micro(args.runs, args.page_size)
+    http_rows, http_same = await end_to_end(args.runs, args.page_size)
+
+    print(f"\nSerializer: {'orjson' if serialization.orjson is not None else 'json'}, trang {args.page_size} dòng")
+    print(f"{'bước':<20} {'hiện tại ms':>12} {'nhanh ms':>10} {'x':>6}")
+    for name, current, fast in micro_rows + http_rows:
+        print(f"{name:<20} {current:>12.2f} {fast:>10.2f} {current / fast:>6.1f}")
+
+    if not (micro_same and http_same):
+        print("\n❌ Hai đường cho JSON khác nhau")
+        sys.exit(1)
+    print("\n✅ Hai đường cho cùng JSON")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark thời gian khởi động worker: so sánh kiểm tra schema kiểu cũ (create_all, kiểm tra từng bảng)
+với kiểm tra phiên bản trong schema_migrations, và đo thời gian import app / vào lifespan / tới khi /ready = 200
+của một process mới (median của --runs lần, mỗi lần một process riêng).
+
+Dùng dữ liệu của scripts/generate_data.py (SQLite tạm hoặc DATABASE_URL); database cần đã chạy migration.
+
+Usage:
+    python scripts/generate_data.py --scale small --reset
+    python scripts/migrate.py
+    python scripts/bench_startup.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Thêm thư mục gốc vào path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Dùng chung database mặc định với load test
+import loadtest  # noqa: F401
+
+from sqlalchemy import create_engine
+from app.config import settings
+from app.database import AsyncSessionLocal, Base, async_engine, pool_options
+from app.migrations import current_version
+from app.utils.stats import ensure_counters, recompute_counters
+
+# Chạy trong process con: import app, vào lifespan rồi chờ các bước khởi động chạy nền xong
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from main import app
+from app.utils.startup import readiness
+imported = time.perf_counter()
+
+async def run():
+    async with app.router.lifespan_context(app):
+        serving = time.perf_counter()
+        while not readiness.finished:
+            await asyncio.sleep(0.001)
+        ready = time.perf_counter()
+    return serving, ready
+
+serving, ready = asyncio.run(run())
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "serving_ms": (serving - started) * 1000,
+    "ready_ms": (ready - started) * 1000,
+    "ready": readiness.ready,
+    "errors": readiness.errors,
+}}))
+"""
+
+def time_check(check, runs: int) -> float:
+    """Median (ms) của một lần kiểm tra schema trên engine mới (như worker vừa khởi động, chưa có connection)"""
+    samples = []
+    for _ in range(runs):
+        engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            check(conn)
+        samples.append((time.perf_counter() - started) * 1000)
+        engine.dispose()
+    return statistics.median(samples)
+
+async def time_counters(step, runs: int) -> float:
+    """Median (ms) của bước nạp bộ đếm dashboard lúc khởi động"""
+    samples = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await step(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    await async_engine.dispose()
+    return statistics.median(samples)
+
+def time_process(runs: int) -> dict:
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=ROOT)], cwd=ROOT, env=os.environ,
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    if not all(result["ready"] for result in results):
+        print(f"⚠️ Worker không sẵn sàng: {results[-1]['errors']} (đã chạy python scripts/migrate.py chưa?)")
+    return {key: statistics.median(result[key] for result in results) for key in ("import_ms", "serving_ms", "ready_ms")}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Database: {settings.DATABASE_URL}, median của {args.runs} lần")
+    legacy = time_check(lambda conn: Base.metadata.create_all(conn), args.runs)
+    version = time_check(current_version, args.runs)
+    print(f"Kiểm tra schema: create_all {legacy:.1f} ms, phiên bản schema_migrations {version:.1f} ms")
+
+    legacy = asyncio.run(time_counters(recompute_counters, args.runs))
+    ensure = asyncio.run(time_counters(ensure_counters, args.runs))
+    print(f"Bộ đếm dashboard: đếm lại mọi bảng {legacy:.1f} ms, chỉ kiểm tra đã khởi tạo {ensure:.1f} ms")
+
+    process = time_process(args.runs)
+    print(
+        f"Process mới: import {process['import_ms']:.0f} ms, nhận request sau {process['serving_ms']:.0f} ms, "
+        f"/ready sau {process['ready_ms']:.0f} ms"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Kiểm tra query plan của các câu SQL mà API thực sự chạy: gọi lần lượt các endpoint trong app/routers
+(đọc, phân trang con trỏ, lọc, và các thao tác ghi: tạo / duyệt / trả phiếu, wishlist, sách, độc giả),
+ghi lại mọi câu SELECT / UPDATE / DELETE theo route, rồi chạy EXPLAIN (MySQL) hoặc EXPLAIN QUERY PLAN (SQLite)
+với đúng tham số đã dùng. Thoát mã 1 nếu có câu quét toàn bảng (MySQL type=ALL, SQLite "SCAN <bảng>")
+hoặc phải sắp xếp ngoài index (MySQL "Using filesort", SQLite "USE TEMP B-TREE FOR ORDER BY / GROUP BY"),
+trừ các trường hợp có chủ đích trong ALLOWED.
+
+Plan phụ thuộc kích thước bảng nên cần bộ dữ liệu lớn (mặc định yêu cầu ít nhất --min-borrows phiếu).
+Các lần đọc lịch sử chỉ chạm bảng lưu trữ khi đã lưu trữ phiếu (scripts/archive_borrows.py).
+Script ghi dữ liệu (tạo phiếu, sách...): sinh lại dữ liệu với --reset nếu cần số liệu load test sạch.
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/generate_data.py --scale medium --reset
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --verbose
+    DATABASE_URL=mysql+pymysql://root:pw@localhost/library_load python scripts/check_query_plans.py
+"""
+import argparse
+import asyncio
+import random
+import re
+import sys
+from datetime import date, timedelta
+
+# Dùng chung database mặc định và bước đăng nhập với load test
+from loadtest import prepare
+
+import httpx
+from sqlalchemy import event
+from app.config import settings
+from app.database import Base, async_engine, engine
+from app.utils.metrics import current_request_stats
+
+# Quét toàn bảng / sắp xếp ngoài index có chủ đích:
+# (route hoặc None = mọi route, bảng hoặc "sort", đoạn có trong câu SQL hoặc None, lý do)
+ALLOWED = [
+    (None, "library_stats", None, "Bảng bộ đếm chỉ có vài dòng"),
+    ("/api/books", "books", None, "Trang không lọc, không ORDER BY: đọc tuần tự và dừng ở OFFSET + LIMIT"),
+    ("/api/books", "sort", "MATCH", "Kết quả tìm kiếm sắp theo độ liên quan / gom facet: chỉ trên các dòng khớp"),
+    ("/api/books/categories", "sort", None, "Nạp registry danh mục khi cache trống (GROUP BY trên toàn catalogue)"),
+    ("/api/users", "users", "LIKE", "Tìm theo username/email/họ tên với LIKE '%...%' không dùng được index"),
+    ("/api/borrows", "users", "LIKE", "Admin tìm phiếu theo thông tin độc giả (LIKE '%...%')"),
+    ("/api/borrows", "sort", "LIKE", "Gộp phiếu của các độc giả khớp tìm kiếm rồi sắp theo ngày tạo"),
+    ("/api/export/borrows", "borrow_requests", None, "Export đọc toàn bộ lịch sử theo thứ tự id"),
+    ("/api/export/borrows", "borrow_requests_archive", None, "Export lịch sử đã lưu trữ theo thứ tự id"),
+    ("/api/borrows/summary", "sort", "BORROW_REQUESTS_ARCHIVE", "Gom theo trạng thái các phiếu đã lưu trữ của một độc giả (vài chục dòng)"),
+    ("/api/borrows/summary/{user_id}", "sort", "BORROW_REQUESTS_ARCHIVE", "Như trên, cho admin xem một độc giả"),
+    ("/api/export/books", "books", None, "Export toàn bộ catalogue theo thứ tự id"),
+    ("/api/export/users", "users", None, "Export toàn bộ tài khoản theo thứ tự id"),
+]
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE FOR (?:(?:LAST TERM|RIGHT PART) OF )?(?:ORDER BY|GROUP BY)")
+EXPLAINED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+class StatementRecorder:
+    """Ghi lại các câu SQL (kèm tham số của lần chạy đầu) theo route của request đang xử lý"""
+
+    def __init__(self):
+        self.statements = {}
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = current_request_stats()
+        if executemany or stats is None or not statement.lstrip().upper().startswith(EXPLAINED):
+            return
+        self.statements.setdefault((stats.route, statement), parameters)
+
+def explain(conn, statement: str, parameters):
+    """Trả về (các dòng plan dạng text, danh sách (bảng hoặc "sort", chi tiết) vi phạm)"""
+    tables = set(Base.metadata.tables)
+    problems = []
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        lines = [row[3] for row in rows]
+        for detail in lines:
+            scan = SQLITE_SCAN.match(detail)
+            if scan and scan.group(1) in tables:
+                problems.append((scan.group(1), detail))
+            elif SQLITE_SORT.search(detail):
+                problems.append(("sort", detail))
+        return lines, problems
+
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+    lines = []
+    for row in rows:
+        extra = row.get("Extra") or ""
+        lines.append(f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} {extra}".strip())
+        if row.get("type") == "ALL" and row.get("table") in tables:
+            problems.append((row["table"], lines[-1]))
+        if "Using filesort" in extra:
+            problems.append(("sort", lines[-1]))
+    return lines, problems
+
+def allowed_reason(route: str, kind: str, statement: str):
+    for allowed_route, allowed_kind, fragment, reason in ALLOWED:
+        if (allowed_route in (None, route) and allowed_kind == kind
+                and (fragment is None or fragment in statement.upper())):
+            return reason
+    return None
+
+async def next_cursor(client, url: str, headers: dict):
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return response.headers.get("x-next-cursor") or response.json().get("next_cursor")
+
+async def run_calls(client: httpx.AsyncClient, calls):
+    """Chạy tuần tự; request lỗi thì dừng vì các câu SQL của route đó không được kiểm tra"""
+    for method, url, headers, kwargs in calls:
+        response = await client.request(method, url, headers=headers, **kwargs)
+        if response.status_code >= 400:
+            sys.exit(f"❌ {method} {url}: {response.status_code} {response.text[:200]}")
+
+async def exercise(client: httpx.AsyncClient, ctx):
+    """Gọi các endpoint theo đúng các đường truy cập mà giao diện dùng"""
+    admin, reader = ctx.admin, ctx.readers[0]
+    borrow_id = ctx.borrow_ids[0]
+    # Sách còn đủ để duyệt các phiếu tạo bên dưới
+    available = []
+    for candidate in ctx.book_ids:
+        if (await client.get(f"/api/books/{candidate}")).json()["available_quantity"] >= 3:
+            available.append(candidate)
+        if len(available) == 2:
+            break
+    book_id, other_book_id = available
+    due = (date.today() + timedelta(days=14)).isoformat()
+    calls = [
+        ("GET", "/api/books?page=3&page_size=20", {}, {}),
+        ("GET", "/api/books?category=CNTT&page_size=20", {}, {}),
+        ("GET", "/api/books?search=lap trinh&facets=true&page_size=20", {}, {}),
+        ("GET", "/api/books?view=summary&page_size=50", {}, {}),
+        ("GET", "/api/books/categories?with_counts=true", {}, {}),
+        ("GET", f"/api/books/{book_id}", {}, {}),
+        ("GET", "/api/borrows?page=2&page_size=20", admin, {}),
+        ("GET", "/api/borrows?status_filter=pending&page_size=20", admin, {}),
+        ("GET", "/api/borrows?search=reader1&page_size=20", admin, {}),
+        ("GET", "/api/borrows?page_size=20", reader, {}),
+        ("GET", "/api/borrows?status_filter=approved&page_size=20", reader, {}),
+        ("GET", "/api/borrows?view=summary&page_size=20", admin, {}),
+        ("GET", "/api/borrows/overdue?page_size=20", admin, {}),
+        ("GET", "/api/borrows/summary", reader, {}),
+        ("GET", f"/api/borrows/summary/{ctx.rng.randint(2, 50)}", admin, {}),
+        ("GET", f"/api/borrows/{borrow_id}", admin, {}),
+        ("GET", "/api/wishlist", reader, {}),
+        ("GET", "/api/users?page=2&page_size=20", admin, {}),
+        ("GET", "/api/users?search=reader&page_size=20", admin, {}),
+        ("GET", f"/api/users/{ctx.rng.randint(2, 50)}", admin, {}),
+        ("GET", "/api/stats/dashboard", admin, {}),
+        ("GET", "/api/auth/me", reader, {}),
+        ("GET", "/api/export/borrows?format=ndjson&status_filter=returned", admin, {}),
+        ("GET", "/api/export/books?format=ndjson", admin, {}),
+        ("GET", "/api/export/users?format=ndjson", admin, {}),
+        ("POST", "/api/wishlist", reader, {"json": {"book_id": book_id, "quantity": 1}}),
+        ("PUT", f"/api/wishlist/{book_id}", reader, {"json": {"quantity": 1}}),
+        ("DELETE", f"/api/wishlist/{book_id}", reader, {}),
+        ("PUT", f"/api/books/{book_id}", admin, {"json": {"description": "Kiểm tra query plan"}}),
+    ]
+    await run_calls(client, calls)
+
+    # Phân trang con trỏ: trang thứ hai dùng điều kiện keyset
+    for url, headers in [
+        ("/api/books?cursor=&page_size=20", {}),
+        ("/api/borrows?cursor=&page_size=20", admin),
+        ("/api/borrows?cursor=&page_size=5", reader),
+        ("/api/borrows/overdue?cursor=&page_size=20", admin),
+        ("/api/borrows?date_from=2000-01-01&cursor=&page_size=20", admin),
+        ("/api/users?cursor=&page_size=20", admin),
+    ]:
+        cursor = await next_cursor(client, url, headers)
+        if cursor:
+            (await client.get(url.replace("cursor=", f"cursor={cursor}"), headers=headers)).raise_for_status()
+
+    # Khoảng ngày cũ: đọc cả bảng lưu trữ (nếu đã chạy scripts/archive_borrows.py)
+    await run_calls(client, [
+        ("GET", "/api/borrows?date_from=2000-01-01&page_size=20", admin, {}),
+        ("GET", "/api/borrows?date_from=2000-01-01&status_filter=returned&page=3&page_size=20", admin, {}),
+        ("GET", "/api/borrows?date_from=2000-01-01&page_size=20", reader, {}),
+        ("GET", f"/api/export/borrows?format=ndjson&date_to={date.today() - timedelta(days=180)}", admin, {}),
+    ])
+
+    # Vòng đời phiếu mượn: tạo, sửa, duyệt, trả, từ chối, xóa, thao tác hàng loạt
+    async def create():
+        response = await client.post("/api/borrows", headers=reader, json={
+            "due_date": due, "items": [{"book_id": book_id, "quantity": 1}]
+        })
+        response.raise_for_status()
+        return response.json()["id"]
+
+    first, second, third = await create(), await create(), await create()
+    steps = [
+        ("PUT", f"/api/borrows/{first}", reader, {"json": {"due_date": due, "items": [{"book_id": other_book_id, "quantity": 1}]}}),
+        ("PUT", f"/api/borrows/{first}/approve", admin, {"json": {}}),
+        ("PUT", f"/api/borrows/{first}/return", admin, {"json": {}}),
+        ("PUT", f"/api/borrows/{second}/reject", admin, {"json": {"admin_note": "Kiểm tra"}}),
+        ("DELETE", f"/api/borrows/{second}", admin, {}),
+        ("POST", "/api/borrows/bulk/approve", admin, {"json": {"request_ids": [third]}}),
+        ("POST", "/api/borrows/bulk/return", admin, {"json": {"request_ids": [third]}}),
+    ]
+    await run_calls(client, steps)
+
+async def collect(args):
+    # Câu chậm là do tải nhân tạo, không ghi log
+    settings.SLOW_QUERY_MS = 0
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://plans", timeout=300) as client:
+        ctx = await prepare(client, args, random.Random(args.seed))
+        borrows = sum(ctx.dataset.get("borrows_by_status", {}).values())
+        if borrows < args.min_borrows:
+            sys.exit(
+                f"❌ Chỉ có {borrows} phiếu mượn (< {args.min_borrows}), plan trên bảng nhỏ không đáng tin: "
+                "python scripts/generate_data.py --scale medium --reset"
+            )
+        recorder = StatementRecorder()
+        await exercise(client, ctx)
+    await async_engine.dispose()
+    return recorder.statements
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-borrows", type=int, default=100_000, help="Số phiếu mượn tối thiểu của bộ dữ liệu")
+    parser.add_argument("--verbose", action="store_true", help="In plan của mọi câu SQL")
+    parser.add_argument("--readers", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--reader-password", default="reader123")
+    args = parser.parse_args()
+
+    statements = asyncio.run(collect(args))
+    failures = allowed = 0
+    with engine.connect() as conn:
+        for (route, statement), parameters in sorted(statements.items(), key=lambda item: item[0]):
+            lines, problems = explain(conn, statement, parameters)
+            reasons = [allowed_reason(route, kind, statement) for kind, _ in problems]
+            bad = [problem for problem, reason in zip(problems, reasons) if reason is None]
+            failures += bool(bad)
+            allowed += bool(problems) and not bad
+            if bad or args.verbose:
+                print(f"\n{'❌' if bad else '✅'} {route}\n   {' '.join(statement.split())[:300]}")
+                for line in lines:
+                    print(f"     {line}")
+                for (kind, detail), reason in zip(problems, reasons):
+                    label = "Sắp xếp ngoài index" if kind == "sort" else f"Quét toàn bảng {kind}"
+                    print(f"   -> {label}: {detail}" + (f" (có chủ đích: {reason})" if reason else ""))
+    engine.dispose()
+
+    print(f"\n{len(statements)} câu SQL trên {len({route for route, _ in statements})} route ({engine.dialect.name}), "
+          f"{allowed} câu quét/sắp xếp có chủ đích (ALLOWED), {failures} câu vi phạm")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Sinh dữ liệu giả lập ở quy mô tùy chọn: độc giả, sách, wishlist và phiếu mượn ở mọi trạng thái
+(kèm approved_at/due_date/returned_at hợp lệ), ghi bằng insert nhiều dòng theo lô.
+Tồn kho khớp với dữ liệu: available_quantity = quantity - số cuốn trong các phiếu đang mượn (approved).
+Bộ đếm dashboard được đối chiếu lại sau khi sinh.
+
+Tài khoản: admin / admin123 (tạo nếu chưa có), độc giả reader<id> / reader123.
+Không có --reset thì dữ liệu được thêm vào sau dữ liệu hiện có.
+Mặc định ghi vào SQLite tạm (cùng file với scripts/loadtest.py); đặt DATABASE_URL để dùng MySQL.
+
+Usage:
+    python scripts/generate_data.py --scale small --reset
+    python scripts/generate_data.py --scale medium --books 200000 --seed 42
+    DATABASE_URL=mysql+pymysql://root:pw@localhost/library_load python scripts/generate_data.py --scale large --reset
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+LOAD_DB = os.path.join(tempfile.gettempdir(), "library_ptit_load.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{LOAD_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, func, insert, select, update
+from app.database import engine, Base, AsyncSessionLocal, async_engine
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.wishlist import Wishlist
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.models.stats import LibraryStat
+from app.utils.auth import get_password_hash
+from app.utils.search import build_book_search_text
+from app.utils.stats import BOOKS_VERSION, recompute_counters
+
+SCALES = {
+    "small": {"users": 200, "books": 2_000, "requests": 5_000},
+    "medium": {"users": 5_000, "books": 50_000, "requests": 200_000},
+    "large": {"users": 50_000, "books": 1_000_000, "requests": 5_000_000},
+}
+
+# Tỉ lệ trạng thái phiếu mượn
+STATUS_WEIGHTS = {
+    BorrowStatus.returned: 50,
+    BorrowStatus.approved: 20,
+    BorrowStatus.pending: 15,
+    BorrowStatus.rejected: 10,
+    BorrowStatus.need_edit: 5,
+}
+
+CATEGORIES = [
+    "Công nghệ thông tin", "Toán học", "Vật lý", "Kinh tế", "Ngoại ngữ",
+    "Điện tử viễn thông", "Văn học", "Lịch sử", "Triết học", "Kỹ năng mềm",
+]
+TITLE_WORDS = [
+    "Lập trình", "Cơ sở dữ liệu", "Mạng máy tính", "Giải tích", "Đại số", "Xác suất", "Kinh tế học",
+    "Tiếng Anh", "Điện tử", "Tín hiệu", "Hệ điều hành", "Trí tuệ nhân tạo", "Học máy", "An toàn thông tin",
+    "Quản trị", "Marketing", "Lịch sử", "Văn học", "Triết học", "Kỹ năng",
+]
+TITLE_SUFFIXES = ["cơ bản", "nâng cao", "ứng dụng", "thực hành", "đại cương", "chuyên sâu", "nhập môn"]
+FAMILY_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+GIVEN_NAMES = ["An", "Bình", "Chi", "Dũng", "Hà", "Hải", "Hương", "Khánh", "Linh", "Minh", "Nam", "Phương", "Quân", "Trang"]
+
+def max_id(conn, model) -> int:
+    return conn.scalar(select(func.coalesce(func.max(model.id), 0)))
+
+def insert_batches(conn, table, rows, batch_size: int) -> int:
+    """Insert nhiều dòng theo lô từ một iterator (không giữ toàn bộ dữ liệu trong bộ nhớ)"""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+def generate(
+    users: int,
+    books: int,
+    requests: int,
+    wishlist_per_user: int = 3,
+    max_items: int = 3,
+    days: int = 365,
+    seed: int = 1,
+    reset: bool = False,
+    batch_size: int = 10_000
+) -> Dict[str, int]:
+    """Sinh dữ liệu và trả về số dòng đã tạo theo bảng"""
+    rng = random.Random(seed)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    created: Dict[str, int] = {}
+
+    with engine.begin() as conn:
+        user_offset, book_offset, request_offset = max_id(conn, User), max_id(conn, Book), max_id(conn, BorrowRequest)
+        if not conn.scalar(select(User.id).where(User.username == "admin")):
+            conn.execute(insert(User.__table__), [{
+                "username": "admin", "email": "admin@ptit.edu.vn", "password_hash": get_password_hash("admin123"),
+                "full_name": "Administrator", "role": UserRole.admin, "is_active": True,
+            }])
+            user_offset = max_id(conn, User)
+
+    # Mọi độc giả dùng chung một hash để không tốn thời gian bcrypt cho từng tài khoản
+    reader_hash = get_password_hash("reader123")
+    user_ids = list(range(user_offset + 1, user_offset + users + 1))
+    book_ids = list(range(book_offset + 1, book_offset + books + 1))
+    quantities = {book_id: rng.randint(1, 20) for book_id in book_ids}
+    outstanding: Dict[int, int] = {}
+
+    def user_rows():
+        for user_id in user_ids:
+            name = f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}"
+            yield {
+                "id": user_id, "username": f"reader{user_id}", "email": f"reader{user_id}@ptit.edu.vn",
+                "password_hash": reader_hash, "full_name": name, "phone": f"09{rng.randint(0, 99_999_999):08d}",
+                "role": UserRole.user, "is_active": rng.random() > 0.02,
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+            }
+
+    def book_rows():
+        for book_id in book_ids:
+            title = f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_SUFFIXES)} {book_id}"
+            author = f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}"
+            isbn = f"978-{book_id:010d}"
+            yield {
+                "id": book_id, "title": title, "author": author, "isbn": isbn,
+                "category": rng.choice(CATEGORIES), "description": f"Giáo trình {title.lower()}.",
+                "quantity": quantities[book_id], "available_quantity": quantities[book_id],
+                "search_text": build_book_search_text(title, author, isbn),
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+            }
+
+    def wishlist_rows():
+        for user_id in user_ids:
+            for book_id in rng.sample(book_ids, min(wishlist_per_user, len(book_ids))):
+                yield {"user_id": user_id, "book_id": book_id, "quantity": 1}
+
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    items: List[dict] = []
+
+    def request_rows():
+        for request_id in range(request_offset + 1, request_offset + requests + 1):
+            status = rng.choices(statuses, weights)[0]
+            chosen = rng.sample(book_ids, min(rng.randint(1, max_items), len(book_ids)))
+            if status == BorrowStatus.approved:
+                if any(outstanding.get(book_id, 0) >= quantities[book_id] for book_id in chosen):
+                    # Hết sách: coi như phiếu đã trả để tồn kho không âm
+                    status = BorrowStatus.returned
+                else:
+                    for book_id in chosen:
+                        outstanding[book_id] = outstanding.get(book_id, 0) + 1
+            items.extend({"request_id": request_id, "book_id": book_id, "quantity": 1} for book_id in chosen)
+
+            created_at = now - timedelta(seconds=rng.randint(3600, days * 86400))
+            approved_at = returned_at = None
+            if status in (BorrowStatus.approved, BorrowStatus.returned):
+                approved_at = min(now, created_at + timedelta(hours=rng.randint(1, 48)))
+            if status == BorrowStatus.returned:
+                returned_at = min(now, approved_at + timedelta(days=rng.randint(1, 30)))
+            admin_note = None
+            if status == BorrowStatus.rejected:
+                admin_note = "Sách đang được bảo trì"
+            elif status == BorrowStatus.need_edit:
+                admin_note = "Vui lòng giảm số lượng sách"
+            yield {
+                "id": request_id, "user_id": rng.choice(user_ids), "status": status, "admin_note": admin_note,
+                "created_at": created_at, "approved_at": approved_at, "returned_at": returned_at,
+                "due_date": (created_at + timedelta(days=rng.choice([7, 14, 21, 30]))).date(),
+            }
+
+    def flush_items(conn):
+        if items:
+            conn.execute(insert(BorrowItem.__table__), items)
+            created["borrow_items"] = created.get("borrow_items", 0) + len(items)
+            items.clear()
+
+    with engine.begin() as conn:
+        created["users"] = insert_batches(conn, User.__table__, user_rows(), batch_size)
+        created["books"] = insert_batches(conn, Book.__table__, book_rows(), batch_size)
+        created["wishlist"] = insert_batches(conn, Wishlist.__table__, wishlist_rows(), batch_size)
+
+    # Mỗi lô phiếu mượn một giao dịch (kèm items của lô đó)
+    created["borrow_requests"] = 0
+    rows = request_rows()
+    while created["borrow_requests"] < requests:
+        with engine.begin() as conn:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            conn.execute(insert(BorrowRequest.__table__), batch)
+            created["borrow_requests"] += len(batch)
+            flush_items(conn)
+
+    with engine.begin() as conn:
+        reserved = [{"book_id": book_id, "taken": taken} for book_id, taken in outstanding.items()]
+        for offset in range(0, len(reserved), batch_size):
+            conn.execute(
+                update(Book.__table__)
+                .where(Book.__table__.c.id == bindparam("book_id"))
+                .values(available_quantity=Book.__table__.c.available_quantity - bindparam("taken")),
+                reserved[offset:offset + batch_size]
+            )
+    created.setdefault("borrow_items", 0)
+    return created
+
+async def refresh_counters():
+    """Đối chiếu bộ đếm dashboard và tăng phiên bản bộ sưu tập (ETag danh sách sách)"""
+    async with AsyncSessionLocal() as db:
+        await recompute_counters(db)
+        await db.execute(
+            update(LibraryStat).where(LibraryStat.name == BOOKS_VERSION).values(value=LibraryStat.value + 1)
+        )
+        await db.commit()
+    await async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int, help="Ghi đè số độc giả của --scale")
+    parser.add_argument("--books", type=int, help="Ghi đè số sách của --scale")
+    parser.add_argument("--requests", type=int, help="Ghi đè số phiếu mượn của --scale")
+    parser.add_argument("--wishlist-per-user", type=int, default=3)
+    parser.add_argument("--max-items", type=int, default=3, help="Số đầu sách tối đa mỗi phiếu")
+    parser.add_argument("--days", type=int, default=365, help="Dữ liệu trải trong N ngày gần nhất")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--reset", action="store_true", help="Xóa toàn bộ bảng trước khi sinh (mất dữ liệu hiện có)")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for name in scale:
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+
+    started = time.perf_counter()
+    created = generate(
+        scale["users"], scale["books"], scale["requests"],
+        wishlist_per_user=args.wishlist_per_user, max_items=args.max_items, days=args.days,
+        seed=args.seed, reset=args.reset, batch_size=args.batch_size
+    )
+    asyncio.run(refresh_counters())
+    elapsed = time.perf_counter() - started
+
+    total = sum(created.values())
+    print(f"✅ Đã sinh {total:,} dòng trong {elapsed:.1f}s ({total / elapsed:,.0f} dòng/s)")
+    for table, count in created.items():
+        print(f"   {table:<16} {count:>12,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Import sách hàng loạt từ file CSV (có dòng tiêu đề) hoặc NDJSON, cùng pipeline với POST /api/books/import:
+parse -> validate -> gộp trùng ISBN -> upsert theo lô, commit sau mỗi lô.
+
+Cột/trường: title (bắt buộc), author, isbn, category, description, quantity, cover_image.
+Sau mỗi lô, số bản ghi đã xong được ghi vào file checkpoint; chạy lại cùng lệnh sau khi lỗi
+sẽ tiếp tục từ lô kế tiếp. Checkpoint bị xóa khi import xong.
+
+Usage:
+    python scripts/import_books.py books.csv
+    python scripts/import_books.py dump.ndjson --batch-size 5000 --errors errors.ndjson
+    python scripts/import_books.py books.csv --on-conflict skip --restart
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.utils.book_import import CONFLICT_MODES, import_books, import_format
+from app.utils.cache import invalidation_bus
+from app.utils.catalog import invalidate_catalog
+
+def read_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+def write_checkpoint(path: str, row: int):
+    # Ghi file tạm rồi đổi tên để checkpoint không bị hỏng nếu process dừng giữa chừng
+    with open(path + ".tmp", "w") as f:
+        f.write(str(row))
+    os.replace(path + ".tmp", path)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Mặc định theo phần mở rộng của file")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    parser.add_argument("--on-conflict", choices=CONFLICT_MODES, default="update")
+    parser.add_argument("--checkpoint", help="File checkpoint (mặc định: <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Bỏ checkpoint cũ, import lại từ đầu")
+    parser.add_argument("--errors", help="Ghi mọi bản ghi lỗi ra file NDJSON")
+    args = parser.parse_args()
+
+    try:
+        fmt = import_format(args.path, args.format)
+    except HTTPException as exc:
+        parser.error(exc.detail)
+    checkpoint = args.checkpoint or args.path + ".checkpoint"
+    start_row = 0 if args.restart else read_checkpoint(checkpoint)
+    if start_row:
+        print(f"↻ Tiếp tục sau bản ghi {start_row:,} (checkpoint {checkpoint})")
+
+    errors_file = open(args.errors, "a" if start_row else "w", encoding="utf-8") if args.errors else None
+    started = time.perf_counter()
+
+    def on_progress(report):
+        write_checkpoint(checkpoint, report.last_row)
+        elapsed = time.perf_counter() - started
+        print(
+            f"\r  bản ghi {report.last_row:>12,} | thêm {report.inserted:>10,} | cập nhật {report.updated:>10,} "
+            f"| lỗi {report.failed:>8,} | {report.processed / elapsed:>9,.0f} bản ghi/s",
+            end="", flush=True
+        )
+
+    def on_error(error):
+        if errors_file is not None:
+            errors_file.write(error.model_dump_json() + "\n")
+
+    await invalidation_bus.start()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            async with AsyncSessionLocal() as db:
+                report = await import_books(
+                    db, stream, fmt, args.batch_size,
+                    on_conflict=args.on_conflict,
+                    start_row=start_row,
+                    on_progress=on_progress,
+                    on_error=on_error if errors_file is not None else None
+                )
+    finally:
+        # Xóa cache catalogue của các worker (qua CACHE_BROADCAST_URL) cho các lô đã commit
+        await invalidate_catalog()
+        await invalidation_bus.stop()
+        await async_engine.dispose()
+        if errors_file is not None:
+            errors_file.close()
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    elapsed = time.perf_counter() - started
+    print(f"\n\n✅ Xong {report.processed:,} bản ghi trong {elapsed:.1f}s")
+    print(f"   Thêm mới: {report.inserted:,}")
+    print(f"   Cập nhật: {report.updated:,}")
+    print(f"   Bỏ qua (ISBN đã có): {report.skipped:,}")
+    print(f"   Trùng ISBN trong lô: {report.duplicates:,}")
+    print(f"   Lỗi: {report.failed:,}")
+    for error in report.errors[:20]:
+        print(f"   - bản ghi {error.row} ({error.isbn or '-'}): {error.detail}")
+    if report.failed and errors_file is None and report.errors:
+        print("   (dùng --errors để ghi toàn bộ lỗi ra file)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,15 +11,16 @@ import os
 # Thêm thư mục gốc vào path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import SessionLocal, engine, Base
+from app.database import SessionLocal, engine
+from app.migrations import upgrade
 from app.models.user import User, UserRole
 from app.models.book import Book
 from app.utils.auth import get_password_hash
 
 def init_database():
-    """Tạo tất cả tables"""
-    Base.metadata.create_all(bind=engine)
-    print("✅ Đã tạo các tables trong database")
+    """Tạo / nâng cấp tables bằng migration (giống python scripts/migrate.py)"""
+    ran = upgrade(engine)
+    print(f"✅ Database đã ở phiên bản mới nhất (đã chạy {len(ran)} migration)")
 
 def create_admin():
     """Tạo tài khoản admin mặc định"""
@@ -0,0 +1,267 @@
+"""
+Load test các endpoint thật trong app/routers: với mỗi kịch bản, chạy --requests request
+bằng --concurrency client song song và ghi throughput, p50/p95/p99, tỉ lệ lỗi và số câu SQL
+trung bình mỗi request. Kết quả ghi ra JSON (kèm commit, database, cấu hình) để so sánh giữa các commit.
+
+Mặc định chạy app trong cùng process (ASGI transport) trên database của scripts/generate_data.py
+(SQLite tạm, hoặc DATABASE_URL, vd MySQL local). --base-url để bắn vào server đang chạy
+(khi đó không đếm được số câu SQL). Tài khoản: admin / admin123, độc giả reader<id> / reader123.
+Các kịch bản ghi (tạo phiếu mượn, thêm wishlist) làm thay đổi dữ liệu: sinh lại dữ liệu với --reset
+trước mỗi lần đo để so sánh được, hoặc dùng --read-only.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/generate_data.py --scale small --reset
+    python scripts/loadtest.py --output results/$(git rev-parse --short HEAD).json
+    python scripts/loadtest.py --concurrency 50 --requests 500 --only books_list,borrows_admin
+    python scripts/loadtest.py --compare results/old.json --output results/new.json
+    python scripts/loadtest.py --base-url http://localhost:8000 --read-only
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+LOAD_DB = os.path.join(tempfile.gettempdir(), "library_ptit_load.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{LOAD_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import sqlalchemy
+from sqlalchemy import event
+from app.config import settings
+from app.database import async_engine
+
+SEARCH_TERMS = ["lap trinh", "co so du lieu", "giai tich", "mang may tinh", "tieng anh", "hoc may", "nang cao"]
+
+class Context:
+    """Token và id mẫu lấy qua API trước khi đo"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.admin = {}
+        self.readers = []
+        self.book_ids = []
+        self.borrow_ids = []
+        self.dataset = {}
+
+    def reader(self):
+        return self.rng.choice(self.readers)
+
+def borrow_body(ctx: Context) -> dict:
+    books = ctx.rng.sample(ctx.book_ids, min(2, len(ctx.book_ids)))
+    return {
+        "due_date": (date.today() + timedelta(days=14)).isoformat(),
+        "items": [{"book_id": book_id, "quantity": 1} for book_id in books],
+    }
+
+# (tên, method, hàm dựng request, ghi dữ liệu?) - mỗi hàm trả về (url, headers, kwargs của httpx)
+SCENARIOS = [
+    ("books_list", "GET", lambda ctx: (f"/api/books?page={ctx.rng.randint(1, 50)}&page_size=20", {}, {}), False),
+    ("books_summary", "GET", lambda ctx: (f"/api/books?page={ctx.rng.randint(1, 50)}&page_size=50&view=summary", {}, {}), False),
+    ("books_search", "GET", lambda ctx: (f"/api/books?search={ctx.rng.choice(SEARCH_TERMS)}&page_size=20", {}, {}), False),
+    ("book_detail", "GET", lambda ctx: (f"/api/books/{ctx.rng.choice(ctx.book_ids)}", {}, {}), False),
+    ("categories", "GET", lambda ctx: ("/api/books/categories?with_counts=true", {}, {}), False),
+    ("borrows_admin", "GET", lambda ctx: (f"/api/borrows?page={ctx.rng.randint(1, 50)}&page_size=20", ctx.admin, {}), False),
+    ("borrows_pending", "GET", lambda ctx: ("/api/borrows?status_filter=pending&page_size=20", ctx.admin, {}), False),
+    ("borrows_reader", "GET", lambda ctx: ("/api/borrows?page_size=20", ctx.reader(), {}), False),
+    ("borrow_detail", "GET", lambda ctx: (f"/api/borrows/{ctx.rng.choice(ctx.borrow_ids)}", ctx.admin, {}), False),
+    ("wishlist", "GET", lambda ctx: ("/api/wishlist", ctx.reader(), {}), False),
+    ("users", "GET", lambda ctx: (f"/api/users?page={ctx.rng.randint(1, 20)}&page_size=20", ctx.admin, {}), False),
+    ("dashboard", "GET", lambda ctx: ("/api/stats/dashboard", ctx.admin, {}), False),
+    ("me", "GET", lambda ctx: ("/api/auth/me", ctx.reader(), {}), False),
+    ("wishlist_add", "POST", lambda ctx: ("/api/wishlist", ctx.reader(), {"json": {"book_id": ctx.rng.choice(ctx.book_ids), "quantity": 1}}), True),
+    ("borrow_create", "POST", lambda ctx: ("/api/borrows", ctx.reader(), {"json": borrow_body(ctx)}), True),
+]
+
+class QueryCounter:
+    """Đếm số câu SQL của engine async trong lúc chạy một kịch bản (chỉ khi chạy trong process)"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def prepare(client: httpx.AsyncClient, args, rng: random.Random) -> Context:
+    """Đăng nhập admin và một nhóm độc giả, lấy id sách / phiếu mượn mẫu"""
+    ctx = Context(rng)
+    ctx.admin = await login(client, args.admin_user, args.admin_password)
+
+    users = (await client.get("/api/users?page_size=100", headers=ctx.admin)).json()
+    usernames = [user["username"] for user in users if user["is_active"] and user["username"].startswith("reader")]
+    for username in usernames[:args.readers]:
+        ctx.readers.append(await login(client, username, args.reader_password))
+
+    books = (await client.get("/api/books?page_size=100&fields=id")).json()["items"]
+    ctx.book_ids = [book["id"] for book in books]
+    borrows = (await client.get("/api/borrows?page_size=100&fields=id", headers=ctx.admin)).json()["items"]
+    ctx.borrow_ids = [borrow["id"] for borrow in borrows]
+    # Quy mô dữ liệu (bộ đếm dashboard) để chỉ so sánh các lần chạy trên cùng bộ dữ liệu
+    ctx.dataset = (await client.get("/api/stats/dashboard", headers=ctx.admin)).json()
+    if not (ctx.readers and ctx.book_ids and ctx.borrow_ids):
+        sys.exit("❌ Thiếu dữ liệu, chạy trước: python scripts/generate_data.py --scale small --reset")
+    return ctx
+
+async def run_scenario(client, ctx: Context, method: str, build, concurrency: int, total: int, counter):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            url, headers, kwargs = build(ctx)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    queries_before = counter.count if counter else 0
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "method": method,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "queries_per_request": round((counter.count - queries_before) / len(latencies), 2) if counter else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_compare(results: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nSo với {baseline_path} (commit {baseline.get('commit')}):")
+    if baseline.get("dataset") != results.get("dataset"):
+        print("⚠️ Bộ dữ liệu khác với lần chạy trước, kết quả không so sánh trực tiếp được")
+    print(f"{'kịch bản':<18} {'req/s':>16} {'p95 ms':>18} {'SQL/req':>14}")
+    for name, current in results["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if old is None:
+            continue
+
+        def delta(key, fmt):
+            if old[key] is None or current[key] is None:
+                return "-"
+            change = f" ({(current[key] - old[key]) / old[key] * 100:+.0f}%)" if old[key] else ""
+            return f"{current[key]:{fmt}}{change}"
+
+        print(f"{name:<18} {delta('rps', '.0f'):>16} {delta('p95_ms', '.1f'):>18} {delta('queries_per_request', '.1f'):>14}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10, help="Số client song song")
+    parser.add_argument("--requests", type=int, default=200, help="Số request mỗi kịch bản")
+    parser.add_argument("--warmup", type=int, default=20, help="Số request khởi động mỗi kịch bản (không tính)")
+    parser.add_argument("--only", help="Chỉ chạy các kịch bản này, cách nhau bởi dấu phẩy")
+    parser.add_argument("--read-only", action="store_true", help="Bỏ qua các kịch bản ghi dữ liệu")
+    parser.add_argument("--readers", type=int, default=20, help="Số độc giả đăng nhập để luân phiên")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-url", help="Bắn vào server đang chạy thay vì chạy app trong process")
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--reader-password", default="reader123")
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--compare", help="File JSON của lần chạy trước để so sánh")
+    args = parser.parse_args()
+
+    scenarios = [scenario for scenario in SCENARIOS if not (args.read_only and scenario[3])]
+    if args.only:
+        names = set(args.only.split(","))
+        unknown = names - {scenario[0] for scenario in SCENARIOS}
+        if unknown:
+            parser.error(f"Kịch bản không tồn tại: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario[0] in names]
+
+    rng = random.Random(args.seed)
+    counter = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from main import app
+        counter = QueryCounter()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "database": None if args.base_url else async_engine.dialect.name,
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "config": {
+            "concurrency": args.concurrency, "requests": args.requests, "warmup": args.warmup, "seed": args.seed,
+            "fast_list_responses": settings.FAST_LIST_RESPONSES,
+        },
+        "endpoints": {},
+    }
+    async with client:
+        ctx = await prepare(client, args, rng)
+        results["dataset"] = ctx.dataset
+        print(f"{'kịch bản':<18} {'req':>6} {'lỗi':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8}")
+        for name, method, build, _ in scenarios:
+            if args.warmup:
+                await run_scenario(client, ctx, method, build, args.concurrency, args.warmup, None)
+            stats = await run_scenario(client, ctx, method, build, args.concurrency, args.requests, counter)
+            results["endpoints"][name] = stats
+            queries = "-" if stats["queries_per_request"] is None else f"{stats['queries_per_request']:.1f}"
+            print(
+                f"{name:<18} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>8.0f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {queries:>8}"
+            )
+    if not args.base_url:
+        await async_engine.dispose()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Đã ghi {args.output}")
+    if args.compare:
+        print_compare(results, args.compare)
+    if any(stats["errors"] for stats in results["endpoints"].values()):
+        print("\n⚠️ Có request lỗi (xem cột lỗi)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""
+Chạy migration schema (app/migrations) cho database trong .env / DATABASE_URL.
+App không tự tạo/kiểm tra bảng khi khởi động, nên cần chạy script này khi cài mới và mỗi lần cập nhật code
+(trước khi khởi động lại các worker).
+
+Usage:
+    python scripts/migrate.py              # chạy mọi migration chưa áp dụng
+    python scripts/migrate.py status       # phiên bản hiện tại và các migration còn thiếu
+    python scripts/migrate.py upgrade --to 1
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.migrations import MIGRATIONS, LATEST_VERSION, applied_versions, upgrade
+
+def status():
+    with engine.connect() as conn:
+        done = set(applied_versions(conn))
+    print(f"Phiên bản hiện tại: {max(done) if done else 'chưa có'} / mới nhất: {LATEST_VERSION}")
+    for version, description, _ in MIGRATIONS:
+        print(f"  {'✅' if version in done else '⏳'} {version:04d} {description}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--to", type=int, help="Chỉ chạy tới phiên bản này")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status()
+        return
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+    ran = upgrade(engine, args.to)
+    if ran:
+        print(f"✅ Đã chạy {len(ran)} migration ({', '.join(f'{v:04d}' for v in ran)}) trong {time.perf_counter() - started:.1f}s")
+    else:
+        print("ℹ️ Schema đã ở phiên bản mới nhất")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Script tính lại dữ liệu tìm kiếm cho bảng books khi index bị lệch (vd sửa trực tiếp title/author/isbn
+trong database, bỏ qua ứng dụng).
+Nâng cấp database cũ (chưa có cột search_text) chỉ cần chạy python scripts/migrate.py (migration v0006).
+- Tính lại search_text cho toàn bộ sách theo từng batch
+- Tạo FULLTEXT index (MySQL) hoặc bảng FTS5 + trigger (SQLite) nếu chưa có, nạp lại bảng FTS5
+
+Usage:
+    python scripts/rebuild_search_index.py [--batch-size 5000]
+"""
+import argparse
+import os
+import sys
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+from app.database import engine
+from app.migrations.v0006_book_search_text import BACKFILL_BATCH_SIZE, backfill_search_text, ensure_search_index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if "search_text" not in {column["name"] for column in inspect(engine).get_columns("books")}:
+        sys.exit("❌ Chưa có cột books.search_text, chạy python scripts/migrate.py trước")
+    with engine.begin() as conn:
+        total = backfill_search_text(conn, args.batch_size, only_missing=False)
+        ensure_search_index(conn)
+    print(f"✅ Đã cập nhật search_text cho {total} sách")
@@ -0,0 +1,38 @@
+"""
+Job đối chiếu bộ đếm dashboard (bảng library_stats).
+Đếm lại số sách, độc giả và phiếu mượn theo trạng thái từ các bảng gốc, ghi đè bộ đếm
+và in ra các bộ đếm bị lệch. Ứng dụng tự chạy job này khi khởi động và mỗi
+STATS_CHECK_INTERVAL giây; script dùng khi cần chạy tay (vd sau khi import dữ liệu trực tiếp vào DB).
+
+Usage:
+    python scripts/recompute_stats.py
+"""
+import asyncio
+import os
+import sys
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, Base, AsyncSessionLocal, async_engine
+from app.models.stats import LibraryStat
+from app.utils.stats import recompute_counters, read_counters
+
+async def main():
+    Base.metadata.create_all(bind=engine, tables=[LibraryStat.__table__])
+    async with AsyncSessionLocal() as db:
+        drift = await recompute_counters(db)
+        counters, checked_at = await read_counters(db)
+    await async_engine.dispose()
+
+    for name, value in counters.items():
+        print(f"{name:<20} {value:>10}")
+    if drift:
+        print("\n⚠️  Đã sửa các bộ đếm bị lệch:")
+        for name, (stored, actual) in drift.items():
+            print(f"   {name}: {stored} -> {actual}")
+    else:
+        print("\n✅ Bộ đếm khớp với dữ liệu")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Stress test duyệt phiếu đồng thời: chứng minh không bán vượt số sách.
+Tạo vài đầu sách có số lượng nhỏ và nhiều phiếu chờ duyệt tranh nhau cùng các sách đó,
+sau đó gửi đồng thời các yêu cầu duyệt (mỗi phiếu được duyệt 2 lần song song, thêm một lần
+qua POST /bulk/approve theo lô) và trả sách (đơn lẻ và hàng loạt). Một nhóm phiếu chờ duyệt khác
+được duyệt đồng thời với sửa phiếu (PUT) và xóa phiếu (DELETE): phiếu vừa được duyệt không được
+quay về pending hay bị xóa khi vẫn đang giữ sách.
+Cuối cùng đối chiếu available_quantity với tổng số sách của các phiếu đang được duyệt
+và bộ đếm dashboard với số phiếu thật theo trạng thái.
+Thoát với mã 1 nếu phát hiện sai lệch.
+
+Cần thêm package: pip install httpx
+
+Usage:
+    python scripts/stress_inventory.py
+    python scripts/stress_inventory.py --requests 500 --contested 200 --concurrency 50
+    DATABASE_URL=mysql+pymysql://... python scripts/stress_inventory.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "library_ptit_stress.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+# Thêm thư mục gốc vào path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import insert, select
+from app.database import engine, Base, AsyncSessionLocal
+from app.models.user import User, UserRole
+from app.models.book import Book
+from app.models.borrow import BorrowRequest, BorrowItem, BorrowStatus
+from app.utils.auth import create_access_token
+from app.utils.stats import recompute_counters
+
+def seed(num_books: int, copies: int, num_requests: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "id": 1, "username": "admin", "email": "admin@ptit.edu.vn",
+            "password_hash": "x", "role": UserRole.admin, "is_active": True
+        }])
+        conn.execute(insert(Book.__table__), [
+            {"id": i + 1, "title": f"Sách {i}", "isbn": f"stress-{i}", "quantity": copies, "available_quantity": copies}
+            for i in range(num_books)
+        ])
+        conn.execute(insert(BorrowRequest.__table__), [
+            {"id": i + 1, "user_id": 1, "status": BorrowStatus.pending}
+            for i in range(num_requests)
+        ])
+        items = []
+        for i in range(num_requests):
+            # Mỗi phiếu mượn 1-3 đầu sách, mỗi đầu 1-2 cuốn
+            for book_id in rng.sample(range(1, num_books + 1), rng.randint(1, min(3, num_books))):
+                items.append({"request_id": i + 1, "book_id": book_id, "quantity": rng.randint(1, 2)})
+        conn.execute(insert(BorrowItem.__table__), items)
+
+def verify(num_books: int, copies: int) -> list:
+    """Đối chiếu tồn kho với các phiếu đang ở trạng thái approved"""
+    with engine.connect() as conn:
+        borrowed = Counter()
+        rows = conn.execute(
+            select(BorrowItem.book_id, BorrowItem.quantity)
+            .join(BorrowRequest, BorrowRequest.id == BorrowItem.request_id)
+            .where(BorrowRequest.status == BorrowStatus.approved)
+        )
+        for book_id, quantity in rows:
+            borrowed[book_id] += quantity
+        errors = []
+        for book_id, available in conn.execute(select(Book.id, Book.available_quantity)):
+            if available < 0:
+                errors.append(f"Sách {book_id}: available_quantity âm ({available})")
+            if available != copies - borrowed[book_id]:
+                errors.append(
+                    f"Sách {book_id}: available={available}, mong đợi {copies - borrowed[book_id]}"
+                )
+        return errors
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--contested", type=int, default=100, help="Số phiếu vừa duyệt vừa sửa / xóa đồng thời")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.books, args.copies, args.requests + args.contested)
+    from main import app
+    async with AsyncSessionLocal() as db:
+        await recompute_counters(db)
+
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "admin", "user_id": 1, "role": "admin"})}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes = Counter()
+
+    async def call(client, method, url, json=None):
+        async with semaphore:
+            response = await client.request(method, url, headers=headers, json=json)
+            action = url.split("/api/borrows/", 1)[1].lstrip("0123456789/") or f"{method.lower()}"
+            outcomes[(action, response.status_code)] += 1
+            return response
+
+    def bulk_batches(ids, size=10):
+        ids = list(ids)
+        random.shuffle(ids)
+        return [ids[offset:offset + size] for offset in range(0, len(ids), size)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=60) as client:
+        # Mỗi phiếu được duyệt hai lần song song
+        ids = list(range(1, args.requests + 1)) * 2
+        random.shuffle(ids)
+        await asyncio.gather(*(
+            call(client, "PUT", f"/api/borrows/{i}/approve", json={}) for i in ids
+        ), *(
+            call(client, "POST", "/api/borrows/bulk/approve", json={"request_ids": batch})
+            for batch in bulk_batches(range(1, args.requests + 1))
+        ))
+        # Trả một nửa số phiếu đã duyệt, đồng thời duyệt lại (phải bị từ chối)
+        ids = list(range(1, args.requests + 1, 2))
+        await asyncio.gather(*(
+            call(client, "PUT", f"/api/borrows/{i}/return") for i in ids
+        ), *(
+            call(client, "PUT", f"/api/borrows/{i}/approve", json={}) for i in ids
+        ), *(
+            call(client, "POST", "/api/borrows/bulk/return", json={"request_ids": batch})
+            for batch in bulk_batches(ids)
+        ))
+        # Duyệt đồng thời với sửa và xóa các phiếu chờ duyệt còn lại
+        ids = list(range(args.requests + 1, args.requests + args.contested + 1))
+        edit = {"items": [{"book_id": 1, "quantity": 1}]}
+        await asyncio.gather(*(
+            call(client, "PUT", f"/api/borrows/{i}/approve", json={}) for i in ids
+        ), *(
+            call(client, "PUT", f"/api/borrows/{i}", json=edit) for i in ids
+        ), *(
+            call(client, "DELETE", f"/api/borrows/{i}") for i in ids[::2]
+        ))
+
+    for (action, code), count in sorted(outcomes.items()):
+        print(f"{action:<12} HTTP {code}: {count}")
+
+    errors = verify(args.books, args.copies)
+    async with AsyncSessionLocal() as db:
+        drift = await recompute_counters(db)
+    errors += [f"Bộ đếm {name}: {stored}, thực tế {actual}" for name, (stored, actual) in drift.items()]
+    if any(code >= 500 for (_, code) in outcomes):
+        errors.append("Có request lỗi 5xx")
+    if errors:
+        print("\n❌ Sai lệch:")
+        for error in errors:
+            print(f"   {error}")
+        sys.exit(1)
+    print("\n✅ Không có bán vượt: available_quantity và bộ đếm khớp với các phiếu mượn")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -24,7 +24,7 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_username (username),
     INDEX idx_email (email),
-    INDEX idx_role (role)
+    INDEX idx_role_created (role, created_at)
 );
 
 -- ============================================
@@ -40,11 +40,13 @@ CREATE TABLE IF NOT EXISTS books (
     quantity INT DEFAULT 0,
     available_quantity INT DEFAULT 0,
     cover_image VARCHAR(255),
+    search_text TEXT,  -- title + author + isbn đã bỏ dấu (ứng dụng tự cập nhật)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_title (title),
     INDEX idx_category (category),
-    INDEX idx_isbn (isbn)
+    INDEX idx_isbn (isbn),
+    FULLTEXT INDEX ft_books_search (search_text)
 );
 
 -- ============================================
@@ -74,9 +76,12 @@ CREATE TABLE IF NOT EXISTS borrow_requests (
     approved_at TIMESTAMP NULL,
     due_date DATE NULL,
     returned_at TIMESTAMP NULL,
+    is_overdue BOOLEAN NOT NULL DEFAULT FALSE,
     FOREIGN KEY (user_id) REFERENCES users(id),
-    INDEX idx_user_id (user_id),
-    INDEX idx_status (status),
+    INDEX idx_user_status_created (user_id, status, created_at),
+    INDEX idx_user_created (user_id, created_at),
+    INDEX idx_status_created (status, created_at),
+    INDEX idx_overdue (status, is_overdue, due_date),
     INDEX idx_created_at (created_at)
 );
 
@@ -89,7 +94,50 @@ CREATE TABLE IF NOT EXISTS borrow_items (
     book_id INT NOT NULL,
     quantity INT DEFAULT 1,
     FOREIGN KEY (request_id) REFERENCES borrow_requests(id) ON DELETE CASCADE,
-    FOREIGN KEY (book_id) REFERENCES books(id)
+    FOREIGN KEY (book_id) REFERENCES books(id),
+    INDEX idx_request_id (request_id),
+    INDEX idx_book_id (book_id)
+);
+
+-- ============================================
+-- Bảng lưu trữ phiếu đã đóng (trả / từ chối) lâu ngày
+-- Cùng cột và id với borrow_requests / borrow_items, do job lưu trữ chuyển sang
+-- ============================================
+CREATE TABLE IF NOT EXISTS borrow_requests_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    status ENUM('pending', 'approved', 'rejected', 'returned', 'need_edit') NOT NULL,
+    note TEXT,
+    admin_note TEXT,
+    created_at TIMESTAMP NULL,
+    approved_at TIMESTAMP NULL,
+    due_date DATE NULL,
+    returned_at TIMESTAMP NULL,
+    is_overdue BOOLEAN NOT NULL DEFAULT FALSE,
+    archived_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    INDEX idx_archive_user_created (user_id, created_at),
+    INDEX idx_archive_created_at (created_at)
+);
+
+CREATE TABLE IF NOT EXISTS borrow_items_archive (
+    id INT PRIMARY KEY,
+    request_id INT NOT NULL,
+    book_id INT NOT NULL,
+    quantity INT DEFAULT 1,
+    FOREIGN KEY (request_id) REFERENCES borrow_requests_archive(id) ON DELETE CASCADE,
+    FOREIGN KEY (book_id) REFERENCES books(id),
+    INDEX idx_archive_request_id (request_id)
+);
+
+-- ============================================
+-- Bảng Library Stats (Bộ đếm cho dashboard)
+-- Được ứng dụng khởi tạo và đối chiếu định kỳ
+-- ============================================
+CREATE TABLE IF NOT EXISTS library_stats (
+    name VARCHAR(50) PRIMARY KEY,
+    value INT NOT NULL DEFAULT 0,
+    checked_at TIMESTAMP NULL
 );
 
 -- ============================================